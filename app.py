@@ -1,14 +1,35 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify,
+                   Response, send_file, stream_with_context, stream_template, after_this_request,
+                   has_request_context)
+from markupsafe import Markup
 from extensions import db, login_manager
-from models import User, Case
-from flask_login import login_user, login_required, logout_user, current_user
+from models import User, Case, CaseTombstone, DATE_SHADOW_COLUMNS, get_table_version
+from pagination import keyset_paginate, cursor_for, order_clauses
+from cache import TTLCache, SizedLRUCache
+from search import apply_search, install_search
+from stats import case_statistics
+from db_pool import engine_options, pool_timing, server_timing_header, is_serverless
+from assets import init_assets, gzip_stream
+import events
+import history
+import offline_sync
+import overdue_worker
+import metrics
+from export_data import iter_csv, export_xlsx_file, CSV_MIMETYPE, XLSX_MIMETYPE
+from deadlines import (parse_date, is_date_overdue, overdue_class, evaluate_cases,
+                       STAGE_COMPLETE, DUE_SOON_DAYS, DEADLINE_FIELDS)
+from flask_login import UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-from dateutil import parser
-from sqlalchemy.pool import NullPool
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
 from urllib.parse import quote_plus
-import re
+from datetime import date, datetime, timedelta
 import os
+import hashlib
+import hmac
+import atexit
+import threading
 
 # Load environment variables from .env file for local development
 from dotenv import load_dotenv
@@ -68,47 +89,118 @@ def get_database_url():
     )
 
 # Database Configuration
-# Use NullPool for serverless/transaction mode as per Supabase best practices
-app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'poolclass': NullPool,  # Required for Supabase Transaction Mode Pooler
-}
+# NullPool on serverless (Supabase best practice for Transaction Mode), a
+# bounded pre-pinged pool for gunicorn / desktop; override with DB_POOL_MODE
+#
+# Offline mode (desktop): every request is served from a local SQLite replica
+# and offline_sync.SyncWorker reconciles it with the remote in the background
+OFFLINE_MODE = os.environ.get('OFFLINE_MODE') == '1'
+if OFFLINE_MODE:
+    try:
+        app.config['SYNC_REMOTE_URL'] = get_database_url()
+    except ValueError:
+        app.config['SYNC_REMOTE_URL'] = None  # Local-only until a remote is configured
+    app.config['SYNC_INTERVAL'] = int(os.environ.get('SYNC_INTERVAL', '30'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = offline_sync.local_database_url(os.environ.get('OFFLINE_DB_PATH'))
+else:
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Dashboard total ("dari N data"):
+#   exact    - COUNT(*), cached for CASE_COUNT_TTL seconds
+#   estimate - Postgres planner estimate (pg_class.reltuples) once the table
+#              has at least CASE_COUNT_ESTIMATE_MIN rows, exact below that
+app.config['CASE_COUNT_MODE'] = os.environ.get('CASE_COUNT_MODE', 'exact')
+app.config['CASE_COUNT_TTL'] = int(os.environ.get('CASE_COUNT_TTL', '60'))
+app.config['CASE_COUNT_ESTIMATE_MIN'] = int(os.environ.get('CASE_COUNT_ESTIMATE_MIN', '100000'))
+# Seconds /stats and the dashboard summary card are served from memory
+app.config['STATS_CACHE_TTL'] = int(os.environ.get('STATS_CACHE_TTL', '60'))
+
+# Seconds a logged-in user's identity is served from memory. Writes to the
+# user table clear this process's copy; other workers catch up within the TTL.
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', '300'))
+# gzip HTML pages in the app; turn off behind a proxy that compresses already
+app.config['GZIP_RESPONSES'] = os.environ.get('GZIP_RESPONSES', '1') == '1'
+# Live change feed (/events). LISTEN needs a session-mode connection, so on
+# Supabase point EVENTS_LISTEN_URL at the session pooler (port 5432) rather
+# than the transaction pooler (6543). Streams are closed after
+# EVENTS_MAX_SECONDS; browsers reconnect and resume by Last-Event-ID.
+app.config['EVENTS_LISTEN_URL'] = os.environ.get('EVENTS_LISTEN_URL') or app.config['SQLALCHEMY_DATABASE_URI']
+app.config['EVENTS_MAX_SECONDS'] = int(os.environ.get('EVENTS_MAX_SECONDS', '300'))
+# Each open stream holds a worker thread; past this many per process /events
+# answers 204 so the remaining threads stay free for page loads and edits.
+# Keep it below gunicorn's --threads (see Procfile).
+app.config['EVENTS_MAX_SUBSCRIBERS'] = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', '8'))
+# Memory cap of the rendered dashboard row cache, per worker process
+app.config['ROW_CACHE_MAX_BYTES'] = int(os.environ.get('ROW_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+# Bearer token a Prometheus scraper sends to /metrics (logged-in users need none)
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
 db.init_app(app)
 login_manager.init_app(app)
+# Request/SQL/template timings for /metrics; first, so latency covers the other hooks
+metrics.init_metrics(app)
+# Hashed, precompressed static files once `python assets.py` has been run
+init_assets(app, gzip_responses=app.config['GZIP_RESPONSES'], hashed=not is_serverless())
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
+if OFFLINE_MODE:
+    with app.app_context():
+        offline_sync.enable_wal(db.engine)
 
-def parse_date(date_str):
+@app.after_request
+def add_server_timing(response):
+    """Expose this request's connection-acquire time (see db_pool)"""
+    timing = pool_timing()
+    if timing:
+        response.headers.add('Server-Timing', server_timing_header(timing))
+    return response
+
+class SessionUser(UserMixin):
     """
-    Robust date parser using dateutil.
-    Handles YYYY-MM-DD (ISO) and DD-MM-YYYY formats.
+    Read-only identity behind current_user.
+
+    A plain object rather than a User row, so it can be shared across
+    requests and threads without being bound to any session.
     """
-    if not date_str or not isinstance(date_str, str):
-        return None
-    
+    __slots__ = ('id', 'username')
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+user_cache = TTLCache(maxsize=256, ttl=app.config['USER_CACHE_TTL'])
+
+@login_manager.user_loader
+def load_user(user_id):
+    """Rebuild current_user; no database round trip while cached"""
     try:
-        # Check for ISO format YYYY-MM-DD via regex to avoid ambiguity
-        if isinstance(date_str, str) and re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-            return parser.parse(date_str, yearfirst=True, dayfirst=False)
-            
-        # Fallback: parser is smart enough to handle most formats
-        # dayfirst=True ensures 01/02/2023 is treated as 1st Feb
-        return parser.parse(date_str, dayfirst=True)
-    except (ValueError, TypeError):
+        user_id = int(user_id)
+    except (TypeError, ValueError):
         return None
+    identity = user_cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(select(User.id, User.username).where(User.id == user_id)).first()
+        if row is None:
+            return None
+        identity = SessionUser(row.id, row.username)
+        user_cache.set(user_id, identity)
+    return identity
 
-def is_date_overdue(date_obj, days_limit):
-    if not date_obj:
-        return False
-    # Hitung tanggal deadline: tanggal input + (days_limit - 1) hari
-    # Karena hari input sudah dihitung sebagai hari ke-1
-    deadline = date_obj + timedelta(days=days_limit - 1)
-    # Cek apakah hari ini sudah melewati deadline
-    return datetime.now().date() > deadline.date()
+# Any write to the user table (ORM flush, bulk or Core statement through the
+# session) drops the cached identities, so renames and deletes apply at once
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_cached_user(mapper, connection, target):
+    user_cache.pop(target.id)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _forget_cached_users(orm_execute_state):
+    # Inserts too: offline_sync copies users with INSERT .. ON CONFLICT UPDATE
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name == User.__tablename__:
+            user_cache.clear()
 
 @app.template_filter('check_overdue')
 def check_overdue(value, field_name, kategori_umur='Dewasa'):
@@ -116,36 +208,11 @@ def check_overdue(value, field_name, kategori_umur='Dewasa'):
     Filter to check if a field is overdue.
     Usage: {{ case.spdp | check_overdue('spdp', case.kategori_umur) }}
     Returns: 'overdue-cell' if true, else ''
+
+    The dashboard itself uses deadlines.evaluate_cases, which marks a whole
+    page at once; this filter remains for single values.
     """
-    date_obj = parse_date(value)
-    if not date_obj:
-        return ""
-    
-    # Logic untuk Dewasa (default)
-    limits_dewasa = {
-        'spdp': 25,             # Overdue jika: Hari Ini > (Tgl Input + 24 hari) - SPDP 25 hari kalender
-        'berkas_tahap_1': 6,    # Overdue jika: Hari Ini > (Tgl Input + 5 hari) - Berkas Tahap I 6 hari kalender  
-        'p18_p19': 10,          # Overdue jika: Hari Ini > (Tgl Input + 9 hari) - P-18/P-19 10 hari kalender
-        'p21': 12,              # Overdue jika: Hari Ini > (Tgl Input + 11 hari) - P-21 12 hari kalender
-        'tahap_2': 7            # Overdue jika: Hari Ini > (Tgl Input + 6 hari) - Tahap II 7 hari kalender
-    }
-    
-    # Logic untuk Anak
-    limits_anak = {
-        'spdp': 25,             # SPDP tetap 25 hari
-        'berkas_tahap_1': 3,    # Berkas Tahap I 3 hari kalender
-        'p18_p19': 7,           # P-18/P-19 7 hari kalender
-        'p21': 10,              # P-21 10 hari kalender
-        'tahap_2': 5            # Tahap II 5 hari kalender
-    }
-    
-    # Pilih limits berdasarkan kategori umur
-    limits = limits_anak if kategori_umur == 'Anak' else limits_dewasa
-    
-    limit = limits.get(field_name)
-    if limit and is_date_overdue(date_obj, limit):
-        return "overdue-cell"
-    return ""
+    return overdue_class(value, field_name, kategori_umur)
 
 @app.route('/')
 @login_required
@@ -172,13 +239,319 @@ def logout():
     logout_user()
     return redirect(url_for('login'))
 
+# Dashboard ordering: newest first, id breaks ties so the order is total
+CASE_ORDER = [(Case.created_at, True), (Case.id, True)]
+# sort=urgency: nearest deadline first (only cases that have one)
+URGENCY_ORDER = [(Case.next_deadline, False), (Case.id, False)]
+
+# ?sort=<column>: displayed column -> sort key (stage dates sort by their
+# typed shadow). Every key has a matching composite index (models.Case),
+# the id tie-breaker is appended by case_listing.
+SORTABLE_COLUMNS = {
+    'nama_tersangka': [Case.nama_tersangka],
+    'umur_tersangka': [Case.umur_tersangka],
+    'kategori_umur': [Case.kategori_umur, Case.created_at],
+    'pasal': [Case.pasal, Case.created_at],
+    'jpu': [Case.jpu, Case.created_at],
+    **{field: [getattr(Case, shadow)] for field, shadow in DATE_SHADOW_COLUMNS.items()},
+}
+# ?jpu=, ?kategori_umur=, ?pasal=: exact-match column filters
+COLUMN_FILTERS = ('jpu', 'kategori_umur', 'pasal')
+
+# ?status= values and the query-string keys kept across pagination links
+CASE_STATUSES = ('overdue', 'due_soon', 'complete')
+DASHBOARD_FILTER_ARGS = ('status', 'sort', 'dir', 'q', *COLUMN_FILTERS, 'created_from', 'created_to')
+# Longest ?q= accepted; anything beyond is ignored
+MAX_SEARCH_LENGTH = 200
+# Searches matching more cases than this list newest first instead of by
+# relevance: scoring every match of a very common term costs more than a
+# page is worth, and the user will narrow the query anyway
+SEARCH_RANK_LIMIT = 1000
+
+def filter_cases(query, status, today):
+    """
+    Apply a dashboard status filter using the materialized deadline columns.
+
+    Args:
+        query: Case query to filter
+        status: One of CASE_STATUSES, or None for no filter
+        today: Date the overdue/due_soon windows are relative to
+    """
+    if status == 'overdue':
+        return query.filter(Case.first_deadline < today)
+    if status == 'due_soon':
+        return query.filter(Case.next_deadline.between(today, today + timedelta(days=DUE_SOON_DAYS)))
+    if status == 'complete':
+        return query.filter(Case.current_stage == STAGE_COMPLETE)
+    return query
+
+def _date_arg(value):
+    """Parse a YYYY-MM-DD query argument (None when absent or invalid)"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+def case_listing(args, today):
+    """
+    Build the filtered case query shared by the dashboard and the exports.
+
+    Args:
+        args: Request query-string arguments (?status=, ?sort=, ?dir=, ?q=,
+            ?jpu=, ?kategori_umur=, ?pasal=, ?created_from=, ?created_to=)
+        today: Date the status filters are relative to
+
+    Returns:
+        tuple: (query, order, rank, filters). rank is the ORDER BY clause
+        for search relevance, or None when results are not ranked (no ?q=,
+        or an explicit ?sort=); filters holds the normalized values of
+        DASHBOARD_FILTER_ARGS (None when absent or invalid)
+    """
+    status = args.get('status')
+    if status not in CASE_STATUSES:
+        status = None
+    sort = args.get('sort')
+    if sort != 'urgency' and sort not in SORTABLE_COLUMNS:
+        sort = None
+    direction = args.get('dir') if sort in SORTABLE_COLUMNS and args.get('dir') in ('asc', 'desc') else None
+    q = (args.get('q') or '').strip()[:MAX_SEARCH_LENGTH] or None
+    columns = {name: (args.get(name) or '').strip() or None for name in COLUMN_FILTERS}
+    created_from, created_to = _date_arg(args.get('created_from')), _date_arg(args.get('created_to'))
+
+    query = filter_cases(Case.query, status, today)
+    for name, value in columns.items():
+        if value is not None:
+            query = query.filter(getattr(Case, name) == value)
+    if created_from:
+        query = query.filter(Case.created_at >= created_from)
+    if created_to:
+        # Inclusive: the whole last day
+        query = query.filter(Case.created_at < created_to + timedelta(days=1))
+
+    order = CASE_ORDER
+    rank = None
+    if q:
+        query, rank = apply_search(query, q, db.session)
+    if sort == 'urgency':
+        query = query.filter(Case.next_deadline.isnot(None))
+        order = URGENCY_ORDER
+        rank = None
+    elif sort:
+        descending = direction == 'desc'
+        order = [(column, descending) for column in SORTABLE_COLUMNS[sort]] + [(Case.id, descending)]
+        rank = None
+    return query, order, rank, {
+        'status': status,
+        'sort': sort,
+        'dir': direction,
+        'q': q,
+        **columns,
+        'created_from': created_from.isoformat() if created_from else None,
+        'created_to': created_to.isoformat() if created_to else None,
+    }
+
+@app.template_global()
+def dashboard_url(**params):
+    """Dashboard URL that keeps the current filters; None drops a key"""
+    args = {key: request.args.get(key) for key in DASHBOARD_FILTER_ARGS}
+    args.update(params)
+    return url_for('dashboard', **{key: value for key, value in args.items() if value is not None})
+
+@app.template_global()
+def export_url(endpoint):
+    """Export URL carrying the dashboard's current filters and sort"""
+    args = {key: request.args.get(key) for key in DASHBOARD_FILTER_ARGS}
+    return url_for(endpoint, **{key: value for key, value in args.items() if value})
+
+# Suggestions offered by the ?jpu= / ?pasal= filter inputs
+MAX_FILTER_CHOICES = 500
+filter_choices_cache = TTLCache(maxsize=len(COLUMN_FILTERS), ttl=300)
+
+@app.template_global()
+def filter_choices(name):
+    """Distinct values of a filter column, read from its index and cached"""
+    choices = filter_choices_cache.get(name)
+    if choices is None:
+        column = getattr(Case, name)
+        choices = db.session.scalars(
+            select(column).where(column.isnot(None), column != '')
+            .distinct().order_by(column).limit(MAX_FILTER_CHOICES)
+        ).all()
+        filter_choices_cache.set(name, choices)
+    return choices
+
+# Cached (total, is_approximate) for the dashboard, per worker process.
+# Filtered counts live apart because cell edits move cases between filters
+# without changing the table total.
+case_count_cache = TTLCache(maxsize=1, ttl=app.config['CASE_COUNT_TTL'])
+filtered_count_cache = TTLCache(maxsize=64, ttl=app.config['CASE_COUNT_TTL'])
+
+def _estimate_case_total():
+    """
+    Read the planner's row estimate for "case" (Postgres only).
+
+    Returns:
+        int | None: The estimate, or None when it is unavailable or the table is
+        small enough that an exact COUNT(*) is cheap anyway
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    estimate = db.session.execute(db.text(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('public.\"case\"')"
+    )).scalar()
+    # reltuples is -1 until the table has been vacuumed/analyzed once
+    if estimate is None or estimate < app.config['CASE_COUNT_ESTIMATE_MIN']:
+        return None
+    return int(estimate)
+
+def get_case_total(compute=True, query=None, key='total', defer=False):
+    """
+    Total number of cases for the dashboard, served from a short-lived cache.
+
+    Args:
+        compute: When False only a cached value is returned, never a query
+        query: Filtered Case query to count (default: the whole table)
+        key: Cache key identifying `query`'s filters
+        defer: On a cache miss inside a request, return no total and count
+            once the response has been sent, so the page never waits on
+            COUNT(*); the next request gets the cached value
+
+    Returns:
+        tuple: (total, is_approximate); total is None if it is not available
+    """
+    cache = case_count_cache if query is None else filtered_count_cache
+    cached = cache.get(key)
+    if cached is not None or not compute:
+        return cached or (None, False)
+
+    count_statement = None if query is None else query.order_by(None).statement
+    if defer and has_request_context():
+        _defer_case_count(cache, key, count_statement)
+        return (None, False)
+    return _count_cases(cache, key, count_statement)
+
+def _count_cases(cache, key, statement=None):
+    """Run the count behind get_case_total() and cache it"""
+    try:
+        estimate = None
+        if statement is None and app.config['CASE_COUNT_MODE'] == 'estimate':
+            estimate = _estimate_case_total()
+        if estimate is not None:
+            result = (estimate, True)
+        elif statement is None:
+            result = (db.session.query(func.count(Case.id)).scalar(), False)
+        else:
+            result = (db.session.execute(select(func.count()).select_from(statement.subquery())).scalar(), False)
+    except SQLAlchemyError as e:
+        # The count is decoration; never fail the page because of it
+        print(f"Case count error: {str(e)}")
+        db.session.rollback()
+        return (None, False)
+
+    cache.set(key, result)
+    return result
+
+def _defer_case_count(cache, key, statement):
+    """Count in this worker once the current response has been sent"""
+    def count_after_response():
+        if cache.get(key) is None:  # Another request may have filled it meanwhile
+            with app.app_context():
+                _count_cases(cache, key, statement)
+
+    @after_this_request
+    def schedule_count(response):
+        response.call_on_close(count_after_response)
+        return response
+
+def invalidate_case_caches(membership=True):
+    """
+    Drop cached data derived from the case table after a write.
+
+    Args:
+        membership: False when rows were only edited, not added or removed
+    """
+    filtered_count_cache.clear()
+    filter_choices_cache.clear()
+    if membership:
+        case_count_cache.clear()
+
+# Rendered dashboard cells per case id, stamped with (version, updated_at,
+# created_at, day): a row changes only when it is written or the date moves
+# its overdue colouring, and created_at tells apart a new case that reused
+# a deleted id (SQLite). Stamps catch writes from other workers; local
+# writes also pop their entries to free the memory early.
+row_cache = SizedLRUCache(max_bytes=app.config['ROW_CACHE_MAX_BYTES'])
+
+@app.template_global()
+def case_cells(case, classes, store=True):
+    """
+    The cells of a dashboard row after NO, rendered once per case version.
+
+    Rows not freshly loaded from the database (e.g. the detached scratchpad
+    of apply_cell_edits, whose version is stale) are rendered uncached.
+    With store=False a cached copy is used but a fresh render is not kept.
+    """
+    template = app.jinja_env.get_template('_case_cells.html')
+    state = db.inspect(case)
+    if not state.persistent or state.modified:
+        return Markup(template.render(case=case, classes=classes))
+    stamp = (case.version, case.updated_at, case.created_at, date.today())
+    html = row_cache.get(case.id, stamp=stamp)
+    if html is None:
+        html = Markup(template.render(case=case, classes=classes))
+        if store:
+            row_cache.set(case.id, html, stamp=stamp)
+    return html
+
+# Statistics per (case table version, day): any committed write to "case",
+# from any worker, bumps the version and so invalidates them
+stats_cache = TTLCache(maxsize=4, ttl=app.config['STATS_CACHE_TTL'])
+
+def get_case_statistics(version=None, today=None):
+    """case_statistics() for today, from the cache while the table is unchanged"""
+    version = get_table_version(Case.__tablename__) if version is None else version
+    today = today or date.today()
+    key = (version, today)
+    result = stats_cache.get(key)
+    if result is None:
+        result = case_statistics(db.session, today)
+        stats_cache.set(key, result)
+    return result
+
+@app.route('/cache/stats')
+@login_required
+def cache_stats():
+    """Size and hit rate of this worker's in-process caches"""
+    return jsonify({
+        'user': user_cache.stats(),
+        'case_count': case_count_cache.stats(),
+        'filtered_count': filtered_count_cache.stats(),
+        'filter_choices': filter_choices_cache.stats(),
+        'statistics': stats_cache.stats(),
+        'rows': row_cache.stats(),
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """This worker's request, SQL and template timings in Prometheus text format"""
+    token = app.config['METRICS_TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    scraper = bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+    if not scraper and not current_user.is_authenticated:
+        return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Bearer'})
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     try:
         # Get pagination parameters
         page = request.args.get('page', 1, type=int)
+        show_all = request.args.get('per_page') == 'all'
         per_page = request.args.get('per_page', 10, type=int)
+        after = request.args.get('after')
+        before = request.args.get('before')
         
         # Validate per_page values
         if per_page not in [10, 30, 50, 100]:
@@ -188,20 +561,94 @@ def dashboard():
         if page < 1:
             page = 1
         
-        # Query with pagination
-        pagination = Case.query.order_by(Case.created_at.desc()).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        # Filters and sorts, all answered from indexed columns
+        today = date.today()
+        query, order, rank, filters = case_listing(request.args, today)
+        # Column sort keys may be NULL, which a cursor cannot seek past; those
+        # sorts page by number, walking their composite index
+        cursors = filters['sort'] not in SORTABLE_COLUMNS
+        if any(filters.values()):
+            count_key = ('filtered', *filters.values(), today)
+            count_query = query
+        else:
+            count_key, count_query = 'total', None
+        
+        if show_all:
+            return stream_all_cases(query, order, rank, filters, count_query, count_key)
+        
+        if rank is not None:
+            # Search results by relevance: page numbers only, since a rank
+            # is no stable cursor key
+            total, total_approximate = get_case_total(query=count_query, key=count_key)
+            if total is None or total > SEARCH_RANK_LIMIT:
+                rank = None
+            ranked_order = [rank, Case.id.desc()] if rank is not None else [Case.id.desc()]
+            pagination = query.order_by(*ranked_order).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False,
+                count=False
+            )
+            pagination.total = total
+            row_start = (pagination.page - 1) * pagination.per_page + 1
+            prev_cursor = next_cursor = None
+            keyset_mode = False
+        elif (after or before) and cursors:
+            # Cursor mode: seek from the previous page's boundary row, so
+            # page 500 costs the same as page 1 and needs no COUNT(*)
+            pagination = keyset_paginate(
+                query,
+                order,
+                per_page,
+                after=after,
+                before=before,
+                start=request.args.get('start', 1, type=int)
+            )
+            row_start = pagination.start
+            prev_cursor = pagination.prev_cursor
+            next_cursor = pagination.next_cursor
+            keyset_mode = True
+            # Only show a total we already have; cursor pages never wait on it
+            total, total_approximate = get_case_total(compute=False, query=count_query, key=count_key)
+        else:
+            # Page-number mode, kept so bookmarked ?page= URLs still work.
+            # The total comes from the count cache instead of a COUNT(*) per page.
+            pagination = query.order_by(*order_clauses(order)).paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False,
+                count=False
+            )
+            total, total_approximate = get_case_total(query=count_query, key=count_key, defer=True)
+            items = pagination.items
+            row_start = (pagination.page - 1) * pagination.per_page + 1
+            if total is None or total_approximate:
+                has_next = len(items) == per_page
+            else:
+                has_next = row_start - 1 + len(items) < total
+            # Until the deferred count lands, page links reach one page past this one
+            pagination.total = total if total is not None else row_start - 1 + len(items) + int(has_next)
+            prev_cursor = cursor_for(items[0], order) if cursors and items and pagination.has_prev else None
+            next_cursor = cursor_for(items[-1], order) if cursors and items and has_next else None
+            keyset_mode = False
         
         return render_template('dashboard.html', 
                              cases=pagination.items,
                              pagination=pagination,
-                             per_page=per_page)
+                             per_page=per_page,
+                             row_start=row_start,
+                             prev_cursor=prev_cursor,
+                             next_cursor=next_cursor,
+                             keyset_mode=keyset_mode,
+                             rows=case_rows_with_classes(pagination.items),
+                             total=total,
+                             total_approximate=total_approximate,
+                             stats=get_case_statistics(),
+                             **filters)
     except Exception as e:
         # Log error for debugging
         print(f"Dashboard error: {str(e)}")
+        metrics.record_handled_error('dashboard')
         # Fallback to simple query without pagination
         cases = Case.query.order_by(Case.created_at.desc()).limit(10).all()
         # Create a simple pagination object
@@ -221,7 +668,205 @@ def dashboard():
         return render_template('dashboard.html', 
                              cases=cases,
                              pagination=pagination,
-                             per_page=10)
+                             per_page=10,
+                             row_start=1,
+                             prev_cursor=None,
+                             next_cursor=None,
+                             keyset_mode=False,
+                             rows=case_rows_with_classes(cases),
+                             total=len(cases),
+                             total_approximate=False,
+                             status=None,
+                             sort=None,
+                             q=None)
+
+def case_rows_with_classes(cases):
+    """(case, cell classes) pairs for the dashboard table"""
+    classes = evaluate_cases(cases)
+    return [(case, classes[case.id]) for case in cases]
+
+# ?per_page=all: rows fetched per round trip, and rendered HTML gathered
+# before a chunk is written to the client
+STREAM_BATCH_SIZE = 500
+STREAM_CHUNK_SIZE = 16 * 1024
+
+def iter_case_rows(query, batch_size=STREAM_BATCH_SIZE):
+    """
+    (case, cell classes) pairs of a whole listing, fetched batch by batch.
+
+    yield_per reads from a server-side cursor on Postgres; rendered rows
+    are dropped from the session's (weak) identity map, so memory stays
+    at one batch however many rows there are.
+    """
+    result = db.session.scalars(query.statement, execution_options={'yield_per': batch_size})
+    for batch in result.partitions():
+        yield from case_rows_with_classes(batch)
+
+def buffered(chunks, size=STREAM_CHUNK_SIZE):
+    """Join a template stream's many small strings into chunks of about `size` characters"""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def stream_all_cases(query, order, rank, filters, count_query, count_key):
+    """
+    The dashboard with every matching case on one page (?per_page=all).
+
+    The page is streamed while the rows are fetched and rendered, so the
+    first bytes go out as soon as the header is ready and a 50k-row print
+    view never sits in memory as one string. Rows are not added to the
+    row cache, which would only evict the paged dashboard's entries.
+    """
+    total, total_approximate = get_case_total(query=count_query, key=count_key, defer=rank is None)
+    if rank is not None and total is not None and total <= SEARCH_RANK_LIMIT:
+        ordering = [rank, Case.id.desc()]
+    else:
+        ordering = order_clauses(order)
+    stream = stream_template('dashboard.html',
+                             rows=iter_case_rows(query.order_by(*ordering)),
+                             show_all=True,
+                             pagination=None,
+                             per_page='all',
+                             row_start=1,
+                             prev_cursor=None,
+                             next_cursor=None,
+                             keyset_mode=False,
+                             total=total,
+                             total_approximate=total_approximate,
+                             stats=get_case_statistics(),
+                             **filters)
+    response = Response(buffered(stream), mimetype='text/html')
+    # Streamed responses skip the after_request gzip; compress as we go
+    if app.config['GZIP_RESPONSES'] and request.accept_encodings['gzip']:
+        response.response = gzip_stream(response.response)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+    return response
+
+# /api/cases page sizes
+API_DEFAULT_PER_PAGE = 100
+API_MAX_PER_PAGE = 500
+
+def _api_etag(version):
+    """ETag for an /api/cases response: table version + normalized query string"""
+    args = sorted(request.args.items(multi=True))
+    digest = hashlib.sha1(repr(args).encode('utf-8')).hexdigest()[:16]
+    return f"cases-{version}-{digest}"
+
+@app.route('/api/cases')
+@login_required
+def api_cases():
+    """
+    Read-only JSON listing of cases, newest first.
+
+    Query args:
+        fields: Comma-separated subset of Case.DICT_FIELDS (default: all)
+        kategori_umur, jpu: Exact-match filters
+        per_page: Page size (default 100, max 500)
+        after: next_cursor of the previous page
+
+    Responses carry an ETag derived from the case table version, so an
+    unchanged listing answers If-None-Match with 304 without querying cases.
+    """
+    etag = _api_etag(get_table_version(Case.__tablename__))
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(Case.DICT_FIELDS)
+    unknown = [f for f in fields if f not in Case.DICT_FIELDS]
+    if unknown:
+        return jsonify({'success': False, 'error': f"Unknown field(s): {', '.join(unknown)}"}), 400
+
+    per_page = request.args.get('per_page', API_DEFAULT_PER_PAGE, type=int)
+    per_page = min(max(per_page, 1), API_MAX_PER_PAGE)
+
+    query = Case.query
+    for name in ('kategori_umur', 'jpu'):
+        value = request.args.get(name)
+        if value is not None:
+            query = query.filter(getattr(Case, name) == value)
+
+    # Only the projected columns (plus the cursor keys) are fetched
+    columns = dict.fromkeys(fields + [column.key for column, _ in CASE_ORDER])
+    query = query.with_entities(*(getattr(Case, name) for name in columns))
+    page = keyset_paginate(query, CASE_ORDER, per_page, after=request.args.get('after'))
+
+    response = jsonify({
+        'cases': [{field: row._mapping[field] for field in fields} for row in page.items],
+        'next_cursor': page.next_cursor,
+        'per_page': per_page
+    })
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it each time
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/stats')
+@login_required
+def stats():
+    """
+    Case counts per stage, age category, JPU and deadline state.
+
+    Revalidates like /api/cases: the ETag is the case table version plus
+    the day (overdue counts move at midnight).
+    """
+    today = date.today()
+    version = get_table_version(Case.__tablename__)
+    etag = f"stats-{version}-{today.isoformat()}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = jsonify(dict(get_case_statistics(version, today), date=today.isoformat()))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Rows fetched per cursor round trip by the exports
+EXPORT_BATCH_SIZE = 1000
+
+def export_query():
+    """Case query for an export, honouring the dashboard's filters and ?sort="""
+    query, order, _, filters = case_listing(request.args, date.today())
+    if filters['sort'] is None:
+        # Oldest first, so re-importing the file keeps the register order
+        order = [(column, False) for column, _ in CASE_ORDER]
+    return query.order_by(*order_clauses(order))
+
+def export_filename(extension):
+    return f"perkara_{date.today():%Y%m%d}.{extension}"
+
+@app.route('/export.csv')
+@login_required
+def export_csv():
+    response = Response(
+        stream_with_context(iter_csv(export_query(), EXPORT_BATCH_SIZE)),
+        mimetype=CSV_MIMETYPE
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename("csv")}"'
+    return response
+
+@app.route('/export.xlsx')
+@login_required
+def export_xlsx():
+    # A zip archive cannot be streamed before it is complete, so the
+    # workbook is spooled to a temp file and then sent in chunks
+    return send_file(
+        export_xlsx_file(export_query(), EXPORT_BATCH_SIZE),
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name=export_filename('xlsx')
+    )
 
 @app.route('/add_case', methods=['POST'])
 @login_required
@@ -251,55 +896,357 @@ def add_case():
         # Construct legacy string for backward compat display if needed, or leave empty
         spdp=f"{ket_terima} ({tgl_terima})" if ket_terima else tgl_terima
     )
+    new_case.refresh_derived()
+    if OFFLINE_MODE:
+        # Temporary id until the sync worker pushes the case
+        new_case.id = offline_sync.next_local_id(db.session)
     db.session.add(new_case)
+    db.session.flush()
+    if OFFLINE_MODE:
+        offline_sync.record_insert(db.session, new_case)
+    events.notify_change(db.session, 'insert', [new_case.id])
     db.session.commit()
+    invalidate_case_caches()
     flash('Data berhasil ditambahkan!')
     return redirect(url_for('dashboard'))
 
+# Security: fields the dashboard may edit in place.
+# Allowed: Existing stages + New SPDP fields
+EDITABLE_FIELDS = frozenset([
+    'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan',
+    'spdp_tgl_terima', 'spdp_tgl_polisi', # Allow editing dates via modal
+    'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu' # Allow editing text fields
+])
+# Upper bound on edits accepted by one /update_cells request
+MAX_CELL_EDITS = 500
+
+def _coerce_cell_value(field, value):
+    """Convert an edited cell's text to the column's Python type"""
+    if field == 'umur_tersangka':
+        if value in (None, ''):
+            return None
+        return int(value)
+    return value
+
+# Audit log of cell edits, written behind the request by a background thread
+history_writer = None
+_history_writer_lock = threading.Lock()
+
+def history_write_behind():
+    """
+    Whether cell edit history may be queued for the background writer.
+
+    Not on serverless, where the function is frozen after the response and
+    recycled without running atexit, nor once this process's writer has
+    stopped; the edit then writes its history in its own transaction.
+    """
+    if is_serverless():
+        return False
+    return history_writer is None or history_writer.is_alive()
+
+def record_history(entries):
+    """Queue case_history entries, starting this process's writer on first use"""
+    global history_writer
+    if history_writer is None:
+        with _history_writer_lock:
+            if history_writer is None:
+                writer = history.HistoryWriter(app)
+                writer.start()
+                # Write what is still queued when the worker shuts down
+                atexit.register(writer.stop)
+                history_writer = writer
+    history_writer.record(entries)
+
+def apply_cell_edits(edits):
+    """
+    Validate and apply a list of cell edits in a single transaction.
+
+    The affected cases are read with one SELECT, their derived columns are
+    recomputed in Python, and all changes go out as one bulk UPDATE by
+    primary key. Later edits of the same cell win.
+
+    Args:
+        edits: List of {'id', 'field', 'value'} dicts
+
+    Returns:
+        tuple: (results, cases) where results holds one {'id', 'field',
+        'success', 'error'?, 'status'} dict per edit ('status' is the HTTP
+        status update_cell answers with for that edit) and cases maps the id
+        of every updated case to its detached, up-to-date Case
+    """
+    results = []
+    valid = []
+    for edit in edits:
+        edit = edit if isinstance(edit, dict) else {}
+        case_id, field = edit.get('id'), edit.get('field')
+        result = {'id': case_id, 'field': field, 'success': False}
+        results.append(result)
+        try:
+            case_id = int(case_id)
+        except (TypeError, ValueError):
+            case_id = None
+        if not case_id or not field:
+            result.update(error='Invalid data', status=400)
+        elif field not in EDITABLE_FIELDS:
+            result.update(error='Field not editable', status=403)
+        else:
+            try:
+                value = _coerce_cell_value(field, edit.get('value'))
+            except (TypeError, ValueError):
+                result.update(error='Invalid value', status=400)
+                continue
+            valid.append((result, case_id, field, value))
+
+    if not valid:
+        return results, {}
+
+    cases = {case.id: case for case in
+             db.session.scalars(select(Case).where(Case.id.in_({case_id for _, case_id, _, _ in valid})))}
+    # The loaded rows are only a scratchpad; changes are written set-based below
+    for case in cases.values():
+        db.session.expunge(case)
+
+    changed_fields = {}
+    audit = []
+    changed_at = datetime.now()
+    for result, case_id, field, value in valid:
+        case = cases.get(case_id)
+        if case is None:
+            result.update(error='Case not found', status=404)
+            continue
+        old_value = getattr(case, field)
+        if old_value != value:
+            audit.append(history.history_entry(case_id, field, old_value, value, current_user, changed_at))
+        setattr(case, field, value)
+        changed_fields.setdefault(case_id, set()).add(field)
+        result.update(success=True, status=200)
+
+    if changed_fields:
+        changes = []
+        for case_id, fields in changed_fields.items():
+            case = cases[case_id]
+            case.refresh_derived(fields)
+            columns = set(fields)
+            columns.update(DATE_SHADOW_COLUMNS[f] for f in fields if f in DATE_SHADOW_COLUMNS)
+            if DEADLINE_FIELDS.intersection(fields):
+                columns.update(('current_stage', 'next_deadline', 'first_deadline'))
+            changes.append({'id': case_id, **{c: getattr(case, c) for c in columns}})
+        try:
+            db.session.execute(update(Case), changes)
+            if OFFLINE_MODE:
+                for change in changes:
+                    offline_sync.record_update(db.session, change['id'], change, cases[change['id']].version)
+                audit = offline_sync.record_local_history(db.session, audit)
+            if not history_write_behind():
+                history.write_entries(db.session, audit)
+                audit = []
+            events.notify_change(db.session, 'update', changed_fields)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Cell update error: {str(e)}")
+            for result in results:
+                if result['success']:
+                    result.update(success=False, error='Database error', status=500)
+            return results, {}
+        invalidate_case_caches(membership=False)
+        for case_id in changed_fields:
+            row_cache.pop(case_id)
+        if audit:
+            record_history(audit)
+
+    return results, {case_id: cases[case_id] for case_id in changed_fields}
+
+def _edit_result(result):
+    return {key: value for key, value in result.items() if key != 'status'}
+
+def render_case_row(case, row_number=None):
+    """Render one dashboard <tr> with freshly evaluated cell classes"""
+    return render_template('_case_row.html',
+                           case=case,
+                           classes=evaluate_cases([case])[case.id],
+                           row_number=row_number)
+
+def wants_row_html(data=None):
+    """True when the client asked for re-rendered rows (?render=1 or "render": true)"""
+    if request.args.get('render') == '1':
+        return True
+    return isinstance(data, dict) and bool(data.get('render'))
+
 @app.route('/update_cell', methods=['POST'])
 @login_required
 def update_cell():
     data = request.json
-    case_id = data.get('id')
-    field = data.get('field')
-    value = data.get('value')
-    
-    if not case_id or not field:
+    results, cases = apply_cell_edits([data])
+    result = results[0]
+    if not result['success']:
+        return jsonify({'success': False, 'error': result['error']}), result['status']
+    response = {'success': True}
+    if wants_row_html(data):
+        # Rendered from the in-memory case, no second query
+        response['row'] = render_case_row(next(iter(cases.values())))
+    return jsonify(response)
+
+@app.route('/update_cells', methods=['POST'])
+@login_required
+def update_cells():
+    """Apply a batch of {id, field, value} edits; answers per item"""
+    data = request.get_json(silent=True)
+    edits = data.get('edits') if isinstance(data, dict) else data
+    if not isinstance(edits, list):
         return jsonify({'success': False, 'error': 'Invalid data'}), 400
-        
-    case = Case.query.get(case_id)
-    if not case:
-        return jsonify({'success': False, 'error': 'Case not found'}), 404
-        
-    # Security: Ensure field is allowed
-    # Allowed: Existing stages + New SPDP fields
-    allowed_fields = [
-        'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan',
-        'spdp_tgl_terima', 'spdp_tgl_polisi', # Allow editing dates via modal
-        'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu' # Allow editing text fields
-    ]
-    if field not in allowed_fields:
-        return jsonify({'success': False, 'error': 'Field not editable'}), 403
-        
-    setattr(case, field, value)
-    db.session.commit()
-    return jsonify({'success': True})
+    if len(edits) > MAX_CELL_EDITS:
+        return jsonify({'success': False, 'error': f'Too many edits (max {MAX_CELL_EDITS})'}), 400
+
+    results, cases = apply_cell_edits(edits)
+    response = {
+        'success': all(result['success'] for result in results),
+        'results': [_edit_result(result) for result in results]
+    }
+    if wants_row_html(data):
+        response['rows'] = {case_id: render_case_row(case) for case_id, case in cases.items()}
+    return jsonify(response)
+
+@app.route('/rows')
+@login_required
+def case_rows():
+    """
+    Re-rendered dashboard rows for ?ids=1,2,3 (the change feed's follow-up).
+
+    Returns:
+        {'rows': {id: html}, 'missing': [ids that no longer exist]}
+    """
+    try:
+        ids = {int(i) for i in request.args.get('ids', '').split(',') if i.strip()}
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid ids'}), 400
+    if len(ids) > events.MAX_EVENT_IDS:
+        return jsonify({'success': False, 'error': f'Too many ids (max {events.MAX_EVENT_IDS})'}), 400
+    cases = db.session.scalars(select(Case).where(Case.id.in_(ids))).all() if ids else []
+    classes = evaluate_cases(cases)
+    rows = {case.id: render_template('_case_row.html', case=case, classes=classes[case.id], row_number=None)
+            for case in cases}
+    return jsonify({'rows': rows, 'missing': sorted(ids - set(rows))})
+
+@app.route('/case/<int(signed=True):case_id>/history')
+@login_required
+def case_history(case_id):
+    """Who changed which field of a case and when, newest first (?before= pages)"""
+    before = request.args.get('before', type=int)
+    entries, next_before = history.case_history_page(db.session, case_id, before=before)
+    return render_template('case_history.html',
+                           case=db.session.get(Case, case_id),
+                           case_id=case_id,
+                           entries=entries,
+                           next_before=next_before,
+                           is_first_page=before is None,
+                           field_labels=history.FIELD_LABELS)
+
+@app.route('/events')
+@login_required
+def change_events():
+    """
+    Server-Sent Events stream of case inserts, updates and deletes.
+
+    Each event is {'type': 'insert'|'update'|'delete', 'ids': [...]} or
+    {'type': 'resync'} when the client may have missed changes.
+    """
+    if is_serverless():
+        # Functions are frozen between requests; 204 stops the browser from
+        # reconnecting, leaving the dashboard as it was
+        return '', 204
+    if db.engine.dialect.name == 'postgresql':
+        events.start_listener(app.config['EVENTS_LISTEN_URL'])
+    # The stream never queries; don't hold a pooled connection open with it
+    db.session.remove()
+    stream = events.event_stream(
+        last_event_id=request.headers.get('Last-Event-ID'),
+        max_seconds=app.config['EVENTS_MAX_SECONDS'],
+        max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS'],
+    )
+    if stream is None:
+        # Every stream slot of this worker is taken: the dashboard works
+        # without live updates rather than starving other requests
+        return '', 204
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx: pass events through unbuffered
+    })
 
-@app.route('/delete_case/<int:case_id>', methods=['DELETE'])
+@app.route('/delete_case/<int(signed=True):case_id>', methods=['DELETE'])
 @login_required
 def delete_case(case_id):
-    case = Case.query.get(case_id)
-    if not case:
-        return jsonify({'success': False, 'error': 'Case not found'}), 404
-    
     try:
-        db.session.delete(case)
+        if OFFLINE_MODE:
+            version = db.session.execute(select(Case.version).where(Case.id == case_id)).scalar()
+        # Single DELETE; the row count tells whether the case existed
+        deleted = Case.query.filter_by(id=case_id).delete(synchronize_session=False)
+        if not deleted:
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Case not found'}), 404
+        if OFFLINE_MODE:
+            offline_sync.record_delete(db.session, case_id, version)
+        else:
+            # Lets offline replicas drop the case on their next pull
+            db.session.add(CaseTombstone(case_id=case_id))
+        events.notify_change(db.session, 'delete', [case_id])
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Data berhasil dihapus'})
+        invalidate_case_caches()
+        row_cache.pop(case_id)
+        # The client drops the row itself instead of reloading the page
+        return jsonify({'success': True, 'message': 'Data berhasil dihapus', 'removed': case_id})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.context_processor
+def inject_sync_status():
+    if not OFFLINE_MODE:
+        return {}
+    return {'sync_status': offline_sync.status}
+
+@app.route('/sync/status')
+@login_required
+def sync_status():
+    """Pending local changes, conflicts and the last sync outcome"""
+    if not OFFLINE_MODE:
+        return jsonify({'success': False, 'error': 'Offline mode is disabled'}), 404
+    summary = offline_sync.sync_summary(db.session)
+    if summary['last_sync']:
+        summary['last_sync'] = summary['last_sync'].isoformat(timespec='seconds')
+    return jsonify(summary)
+
+@app.route('/sync/now', methods=['POST'])
+@login_required
+def sync_now():
+    """Wake the sync worker instead of waiting for its next round"""
+    if not OFFLINE_MODE or sync_worker is None:
+        return jsonify({'success': False, 'error': 'Offline mode is disabled'}), 404
+    sync_worker.trigger()
+    return jsonify({'success': True})
+
+# Started by start_sync_worker() in offline mode
+sync_worker = None
+
+def start_sync_worker():
+    """Start background sync with the remote (offline mode with a remote only)"""
+    global sync_worker
+    if not OFFLINE_MODE or not app.config['SYNC_REMOTE_URL'] or sync_worker is not None:
+        return None
+    sync_worker = offline_sync.SyncWorker(
+        app,
+        app.config['SYNC_REMOTE_URL'],
+        interval=app.config['SYNC_INTERVAL'],
+        on_change=invalidate_case_caches,
+    )
+    sync_worker.start()
+    return sync_worker
+
+# Daily overdue digests from inside the web workers (see overdue_worker);
+# every worker runs the loop, the job lock lets one of them do the scan
+if os.environ.get('OVERDUE_SCHEDULER') == '1':
+    overdue_worker.start_scheduler(app)
+
 def create_admin():
     """Create default admin user if not exists"""
     if not User.query.filter_by(username='admin').first():
@@ -314,6 +1261,12 @@ def init_db():
     try:
         with app.app_context():
             db.create_all()
+            if db.engine.dialect.name == 'sqlite':
+                # Postgres gets its search index from scripts/add_search_index.py
+                with db.engine.begin() as conn:
+                    install_search(conn)
+            if OFFLINE_MODE:
+                offline_sync.init_local(db.engine)
             create_admin()
     except Exception as e:
         print(f"DB Init Error: {e}")
@@ -0,0 +1,203 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`python assets.py` (also run by build_exe.py) copies every CSS/JS file under
+static/ to static/dist/ with a content hash in its name, writes .gz copies
+(and .br ones when the optional `brotli` package is installed) next to
+them, and records the names in static/dist/manifest.json.
+
+When the manifest is present, init_assets() makes
+url_for('static', filename='css/style.css') point at the hashed copy and
+serves it with a year-long immutable Cache-Control, in the best encoding
+the browser accepts. A changed file gets a new name, so browsers never need
+to revalidate. Without a build the original files are served as before.
+On Vercel there is no build step (vercel.json's legacy `builds` run none
+and static/dist/ is gitignored), so the app skips the lookup there and
+@vercel/static serves the original files.
+
+init_assets() also gzips dynamic HTML responses; streamed ones can be
+compressed chunk by chunk with gzip_stream().
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+import zlib
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip copies are written without it
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.css', '.js')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Precompressed variants, best first: (Content-Encoding, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# Dynamic responses smaller than this are not worth compressing
+GZIP_MIN_SIZE = 500
+GZIP_LEVEL = 6
+GZIP_MIMETYPES = ('text/html',)
+
+
+def _digest(content):
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def build_assets(static_folder):
+    """
+    Write hashed and precompressed copies of the CSS/JS under static_folder.
+
+    Returns:
+        dict: {original name: hashed name}, both relative to static_folder
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    # Start clean so outdated hashes do not pile up
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for name in sorted(files):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                content = f.read()
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(filename)
+            hashed = f"{DIST_DIR}/{stem}.{_digest(content)}{ext}"
+            target = os.path.join(static_folder, *hashed.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+            # mtime=0 keeps the .gz byte-identical between builds
+            with open(target + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + '.br', 'wb') as f:
+                    f.write(brotli.compress(content, quality=11))
+            manifest[filename] = hashed
+
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """
+    The build manifest, minus entries whose source changed since the build.
+
+    A stale entry would keep serving the old file under its immutable name,
+    so it is dropped (with a warning) and the original is served instead.
+    """
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    current = {}
+    for filename, hashed in manifest.items():
+        try:
+            with open(os.path.join(static_folder, *filename.split('/')), 'rb') as f:
+                fresh = _digest(f.read()) in hashed
+        except OSError:
+            fresh = False
+        if fresh and os.path.exists(os.path.join(static_folder, *hashed.split('/'))):
+            current[filename] = hashed
+        else:
+            print(f"Static asset {filename} changed since the last build; run `python assets.py`")
+    return current
+
+
+def gzip_stream(chunks, level=GZIP_LEVEL):
+    """
+    gzip a streamed response as it is generated.
+
+    Each chunk is flushed (Z_SYNC_FLUSH), so the browser can render what
+    has arrived instead of waiting for the end of the stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _serve_hashed(app, manifest):
+    """Point url_for('static') at the hashed copies and serve them immutable"""
+    hashed_files = set(manifest.values())
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        if filename not in hashed_files:
+            return app.send_static_file(filename)
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.exists(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+
+def init_assets(app, gzip_responses=True, hashed=True):
+    """
+    Serve hashed assets from the manifest and gzip HTML responses.
+
+    Args:
+        hashed: False where no asset build runs (serverless); the original
+            files are then served without looking for a manifest
+
+    Returns:
+        dict: The manifest in use (empty without a build)
+    """
+    manifest = load_manifest(app.static_folder) if hashed else {}
+    if manifest:
+        _serve_hashed(app, manifest)
+
+    if gzip_responses:
+        @app.after_request
+        def gzip_response(response):
+            if (response.status_code != 200
+                    or response.mimetype not in GZIP_MIMETYPES
+                    or response.direct_passthrough
+                    or response.is_streamed
+                    or 'Content-Encoding' in response.headers
+                    or not request.accept_encodings['gzip']):
+                return response
+            data = response.get_data()
+            if len(data) < GZIP_MIN_SIZE:
+                return response
+            response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+            return response
+
+    return manifest
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    for original, hashed in build_assets(folder).items():
+        print(f"{original} -> {hashed}")
@@ -0,0 +1,11 @@
+"""
+Reproducible performance benchmarks.
+
+    python -m benchmarks --sizes 1000,100000 --out results.json
+    python -m benchmarks --sizes 1000 --baseline benchmarks/baseline.json
+    python -m benchmarks.compare results.json benchmarks/baseline.json
+
+generator.py seeds deterministic synthetic cases, runner.py times the
+dashboard, cell edits, overdue checks, import and export at each size,
+and compare.py flags regressions against a stored baseline.
+"""
@@ -0,0 +1,74 @@
+"""
+Compare a benchmark results file with a stored baseline.
+
+    python -m benchmarks.compare results.json benchmarks/baseline.json [--threshold 0.25]
+
+Exits 1 when any scenario's median is slower than the baseline by more than
+the threshold. Scenarios or sizes present in only one file are skipped.
+"""
+import argparse
+import json
+import sys
+
+# Allowed slowdown before a scenario counts as a regression (0.25 = 25%)
+DEFAULT_THRESHOLD = 0.25
+# Differences below this many milliseconds are noise, whatever the ratio
+MIN_DELTA_MS = 1.0
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Median-to-median comparison of every scenario both reports timed.
+
+    Returns:
+        list: [{'size', 'scenario', 'baseline_ms', 'current_ms', 'change', 'regressed'}]
+    """
+    rows = []
+    for size, scenarios in current['results'].items():
+        base_scenarios = baseline['results'].get(size, {})
+        for name, timing in scenarios.items():
+            base = base_scenarios.get(name)
+            if not isinstance(timing, dict) or not isinstance(base, dict):
+                continue
+            current_ms, baseline_ms = timing['median_ms'], base['median_ms']
+            change = (current_ms - baseline_ms) / baseline_ms if baseline_ms else 0.0
+            rows.append({
+                'size': size,
+                'scenario': name,
+                'baseline_ms': baseline_ms,
+                'current_ms': current_ms,
+                'change': round(change, 4),
+                'regressed': change > threshold and current_ms - baseline_ms > MIN_DELTA_MS,
+            })
+    return rows
+
+
+def format_report(rows):
+    lines = [f"{'size':>8}  {'scenario':<20} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for row in rows:
+        flag = '  REGRESSION' if row['regressed'] else ''
+        lines.append(f"{row['size']:>8}  {row['scenario']:<20} {row['baseline_ms']:>8.1f}ms "
+                     f"{row['current_ms']:>8.1f}ms {row['change']:>+8.1%}{flag}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare benchmark results with a baseline')
+    parser.add_argument('current')
+    parser.add_argument('baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    rows = compare(load_results(args.current), load_results(args.baseline), args.threshold)
+    print(format_report(rows))
+    if any(row['regressed'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
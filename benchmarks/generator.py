@@ -0,0 +1,148 @@
+"""
+Deterministic synthetic cases for benchmarks.
+
+Rows are generated in fixed chunks, each from its own seeded RNG, so row i
+is the same whichever sizes a run seeds it in: growing a database from 1k
+to 100k rows yields exactly the rows a direct 100k seed would. Dates are
+relative to an anchor day (default: today), so the overdue/complete mix
+stays realistic whenever the benchmark runs.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import insert
+from import_data import case_row
+from models import Case
+
+# Rows per RNG seed; sizes that are multiples of this seed identical data
+CHUNK_ROWS = 1000
+# Rows per INSERT round trip while seeding
+SEED_BATCH = 5000
+# Share of juvenile (Anak) suspects
+ANAK_SHARE = 0.15
+# Spread of SPDP dates before the anchor day
+HISTORY_DAYS = 3 * 365
+
+FIRST_NAMES = (
+    'Agus', 'Budi', 'Citra', 'Dedi', 'Eka', 'Fajar', 'Gilang', 'Hendra', 'Indra', 'Joko',
+    'Kurniawan', 'Lestari', 'Maya', 'Nur', 'Putri', 'Rahmat', 'Sari', 'Taufik', 'Wahyu', 'Yusuf',
+)
+LAST_NAMES = (
+    'Saputra', 'Pratama', 'Hidayat', 'Santoso', 'Wijaya', 'Kusuma', 'Siregar', 'Nasution',
+    'Simanjuntak', 'Lubis', 'Harahap', 'Setiawan', 'Gunawan', 'Susanto', 'Wibowo',
+)
+# (article, weight): theft, fraud, narcotics and assault dominate
+PASAL_WEIGHTS = (
+    ('Pasal 362 KUHP', 20), ('Pasal 363 KUHP', 15), ('Pasal 378 KUHP', 12), ('Pasal 372 KUHP', 8),
+    ('Pasal 114 UU 35/2009', 14), ('Pasal 112 UU 35/2009', 12), ('Pasal 351 KUHP', 8),
+    ('Pasal 365 KUHP', 4), ('Pasal 480 KUHP', 3), ('Pasal 81 UU 35/2014', 2),
+    ('Pasal 338 KUHP', 1), ('Pasal 340 KUHP', 1),
+)
+JPU_NAMES = tuple(f'{first} {last}, S.H.' for first in FIRST_NAMES[:8] for last in LAST_NAMES[:5])
+NOTE_WORDS = (
+    'tersangka', 'barang', 'bukti', 'saksi', 'penyidik', 'berkas', 'dikembalikan', 'lengkap',
+    'petunjuk', 'pemeriksaan', 'tambahan', 'korban', 'kerugian', 'rupiah', 'diamankan', 'polsek',
+    'polres', 'menunggu', 'hasil', 'laboratorium', 'forensik', 'keterangan', 'ahli', 'sidang',
+)
+ROMAN_MONTHS = ('I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X', 'XI', 'XII')
+
+_PASALS = [pasal for pasal, _ in PASAL_WEIGHTS]
+_PASAL_WEIGHTS = [weight for _, weight in PASAL_WEIGHTS]
+
+# Chance a case has moved on to each later stage, and chance that a stage
+# was reached after its limit (leaving a late date behind it)
+_STAGE_PROGRESS = (('berkas_tahap_1', 0.85, 6), ('p18_p19', 0.75, 10), ('p21', 0.65, 12), ('tahap_2', 0.55, 7))
+_LATE_SHARE = 0.15
+
+
+def _chunk_rng(seed, chunk):
+    return random.Random(seed * 1_000_003 + chunk)
+
+
+def _date_text(day, rng):
+    # Most dates come from the date picker; a few were typed by hand
+    roll = rng.random()
+    if roll < 0.9:
+        return day.strftime('%Y-%m-%d')
+    if roll < 0.97:
+        return day.strftime('%Y-%m-%d') + f' {rng.randrange(8, 17):02d}:{rng.randrange(60):02d}'
+    return day.strftime('%d-%m-%Y')
+
+
+def _case_values(rng, anchor):
+    anak = rng.random() < ANAK_SHARE
+    spdp = anchor - timedelta(days=rng.randrange(HISTORY_DAYS))
+    values = {
+        'nama_tersangka': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+        'umur_tersangka': str(rng.randrange(12, 18) if anak else rng.randrange(18, 70)),
+        'kategori_umur': 'Anak' if anak else 'Dewasa',
+        'pasal': rng.choices(_PASALS, _PASAL_WEIGHTS)[0],
+        'jpu': rng.choice(JPU_NAMES),
+        'spdp_tgl_terima': _date_text(spdp, rng),
+        'spdp_ket_terima': f'Diterima {spdp:%d-%m-%Y}' if rng.random() < 0.5 else None,
+        'spdp_tgl_polisi': _date_text(spdp - timedelta(days=rng.randrange(1, 8)), rng),
+        'spdp_ket_polisi': f'B/{rng.randrange(1, 999)}/{ROMAN_MONTHS[spdp.month - 1]}/{spdp.year}/Reskrim',
+    }
+    day = spdp
+    for field, chance, limit in _STAGE_PROGRESS:
+        if rng.random() >= chance:
+            break
+        late = rng.random() < _LATE_SHARE
+        day = day + timedelta(days=rng.randrange(limit, limit * 3) if late else rng.randrange(1, limit))
+        if day > anchor:
+            break
+        values[field] = _date_text(day, rng)
+    if values.get('tahap_2') and rng.random() < 0.7:
+        values['limpah_pn'] = _date_text(day + timedelta(days=rng.randrange(1, 14)), rng)
+    # Free-text notes: often empty, sometimes several sentences long
+    roll = rng.random()
+    if roll < 0.4:
+        values['keterangan'] = ' '.join(rng.choices(NOTE_WORDS, k=rng.randrange(30, 120)))
+    elif roll < 0.7:
+        values['keterangan'] = ' '.join(rng.choices(NOTE_WORDS, k=rng.randrange(2, 8)))
+    values['created_at'] = datetime.combine(spdp, time(rng.randrange(8, 17), rng.randrange(60)))
+    return values
+
+
+def generate_cases(start, count, seed=1, anchor=None):
+    """
+    Yield full column dicts (see import_data.case_row) for rows start..start+count-1.
+
+    Args:
+        seed: Same seed, same rows
+        anchor: Day the generated history ends on (default: today)
+    """
+    anchor = anchor or date.today()
+    end = start + count
+    for chunk in range(start // CHUNK_ROWS, (end - 1) // CHUNK_ROWS + 1 if count else 0):
+        rng = _chunk_rng(seed, chunk)
+        for index in range(chunk * CHUNK_ROWS, (chunk + 1) * CHUNK_ROWS):
+            values = _case_values(rng, anchor)
+            if start <= index < end:
+                created_at = values.pop('created_at')
+                row = case_row(values)
+                row['created_at'] = created_at
+                yield row
+
+
+def seed_cases(session, total, seed=1, anchor=None, batch_size=SEED_BATCH):
+    """
+    Grow the case table to `total` synthetic rows.
+
+    Returns:
+        int: Rows inserted
+    """
+    existing = session.query(Case).count()
+    batch = []
+    inserted = 0
+    for row in generate_cases(existing, max(total - existing, 0), seed=seed, anchor=anchor):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            session.execute(insert(Case.__table__), batch)
+            session.commit()
+            inserted += len(batch)
+            batch.clear()
+    if batch:
+        session.execute(insert(Case.__table__), batch)
+        session.commit()
+        inserted += len(batch)
+    return inserted
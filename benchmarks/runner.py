@@ -0,0 +1,257 @@
+"""
+Time the hot paths of the app at growing table sizes.
+
+The database is chosen before the app is imported (DATABASE_URL), seeded
+with benchmarks.generator up to each size in turn, and every scenario is
+timed `repeat` times after one warm-up call. Results are written as JSON:
+
+    {"meta": {...}, "results": {"1000": {"dashboard": {"median_ms": ..}}}}
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 1
+# Rows exported to a workbook and imported back per import run
+IMPORT_ROWS = 5000
+# check_overdue calls timed per run (one dashboard page has ~500)
+OVERDUE_CHECKS = 10000
+
+
+def measure(fn, repeat=DEFAULT_REPEAT, warmup=1):
+    """
+    Time fn() `repeat` times after `warmup` untimed calls.
+
+    Returns:
+        dict: median_ms, min_ms, max_ms, runs
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'runs': repeat,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Scenarios:
+    """The timed operations, bound to a logged-in test client"""
+
+    def __init__(self, app, seed):
+        import app as app_module
+        from extensions import db
+
+        self.app = app
+        self.app_module = app_module
+        self.db = db
+        self.rng = random.Random(seed)
+        self.client = app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def _clear_caches(self):
+        self.app_module.invalidate_case_caches()
+        self.app_module.row_cache.clear()
+        self.app_module.stats_cache.clear()
+
+    def _get(self, url):
+        response = self.client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} answered {response.status_code}")
+        response.get_data()
+
+    def dashboard(self):
+        """First dashboard page, 100 rows, caches cold"""
+        self._clear_caches()
+        self._get('/dashboard?per_page=100')
+
+    def dashboard_warm(self):
+        """Same page with every cache warm"""
+        self._get('/dashboard?per_page=100')
+
+    def dashboard_filtered(self):
+        self._clear_caches()
+        self._get('/dashboard?per_page=100&status=overdue&kategori_umur=Anak')
+
+    def dashboard_search(self):
+        self._clear_caches()
+        self._get('/dashboard?per_page=100&q=saputra')
+
+    def update_cell(self):
+        from models import Case
+        max_id = self.db.session.query(self.db.func.max(Case.id)).scalar()
+        case_id = self.rng.randrange(1, max_id + 1)
+        self.client.post('/update_cell', json={
+            'id': case_id, 'field': 'keterangan', 'value': f'benchmark {self.rng.random()}'})
+
+    def check_overdue(self):
+        check = self.app_module.check_overdue
+        values = self._overdue_sample
+        for value, field, kategori in values:
+            check(value, field, kategori)
+
+    def prepare_check_overdue(self):
+        from models import Case
+        rows = self.db.session.query(Case.spdp_tgl_terima, Case.p21, Case.kategori_umur).limit(OVERDUE_CHECKS // 2).all()
+        self._overdue_sample = [
+            (value, field, kategori)
+            for spdp, p21, kategori in rows
+            for value, field in ((spdp, 'spdp'), (p21, 'p21'))
+        ]
+
+    def export_csv(self):
+        self._get('/export.csv')
+
+    def export_xlsx(self):
+        self._get('/export.xlsx')
+
+    def prepare_import(self, size, directory):
+        """Export up to IMPORT_ROWS cases to a workbook the import reads back"""
+        from export_data import export_xlsx_file
+        from models import Case
+        query = self.db.session.query(Case).order_by(Case.id).limit(min(size, IMPORT_ROWS))
+        self._workbook = os.path.join(directory, 'import.xlsx')
+        with export_xlsx_file(query) as source, open(self._workbook, 'wb') as target:
+            target.write(source.read())
+
+    def import_xlsx(self):
+        """Append the prepared workbook, then remove the rows it added"""
+        from import_data import import_excel
+        from models import Case
+        max_id = self.db.session.query(self.db.func.max(Case.id)).scalar()
+        import_excel(self._workbook, mode='append')
+        self.db.session.query(Case).filter(Case.id > max_id).delete(synchronize_session=False)
+        self.db.session.commit()
+
+
+def run_benchmarks(app, sizes, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED, log=print):
+    """
+    Seed up to each size in turn and time every scenario.
+
+    Returns:
+        dict: {str(size): {scenario: measure() result, 'seed_s': seconds}}
+    """
+    from contextlib import redirect_stdout
+    from extensions import db
+    from benchmarks.generator import seed_cases
+
+    results = {}
+    with app.app_context(), tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        scenarios = Scenarios(app, seed)
+        for size in sorted(sizes):
+            started = time.perf_counter()
+            inserted = seed_cases(db.session, size, seed=seed)
+            seeded = time.perf_counter() - started
+            log(f"{size} rows ({inserted} seeded in {seeded:.1f}s)")
+            scenarios.prepare_check_overdue()
+            scenarios.prepare_import(size, directory)
+
+            timings = {'seed_s': round(seeded, 3)}
+            for name in ('dashboard', 'dashboard_warm', 'dashboard_filtered', 'dashboard_search',
+                         'update_cell', 'check_overdue', 'export_csv', 'export_xlsx', 'import_xlsx'):
+                # The export/import helpers report progress on stdout
+                with redirect_stdout(devnull):
+                    timings[name] = measure(getattr(scenarios, name), repeat=repeat)
+                log(f"  {name:<20} {timings[name]['median_ms']:>10.1f} ms")
+            results[str(size)] = timings
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard, edits, overdue checks, import and export')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='comma-separated row counts (default: 1000,100000,1000000)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed runs per scenario')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--database', default='sqlite',
+                        help="'sqlite' (fresh file in a temp dir) or a local PostgreSQL URL")
+    parser.add_argument('--reset', action='store_true',
+                        help='drop and recreate the tables of a PostgreSQL --database first')
+    parser.add_argument('--out', help='write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='compare against this results file; exit 1 on regression')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='allowed slowdown vs the baseline as a fraction (default 0.25)')
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    workdir = tempfile.mkdtemp(prefix='kejaksaan-bench-')
+    if args.database == 'sqlite':
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    else:
+        os.environ['DATABASE_URL'] = args.database
+    os.environ.pop('OFFLINE_MODE', None)
+
+    # Imported only now, so the app binds to the benchmark database
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from app import app, init_db
+    from extensions import db
+    from models import Case
+
+    app.config['TESTING'] = True
+    with app.app_context():
+        if args.reset and args.database != 'sqlite':
+            db.drop_all()
+        init_db()
+        if args.database != 'sqlite' and Case.query.first() and not args.reset:
+            parser.error('the database already has cases; use --reset or an empty database')
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'anchor': date.today().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': dialect,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': run_benchmarks(app, sizes, repeat=args.repeat, seed=args.seed,
+                                  log=lambda line: print(line, file=sys.stderr)),
+    }
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        from benchmarks.compare import compare, format_report, load_results, DEFAULT_THRESHOLD
+        threshold = DEFAULT_THRESHOLD if args.threshold is None else args.threshold
+        rows = compare(report, load_results(args.baseline), threshold)
+        print(format_report(rows), file=sys.stderr)
+        if any(row['regressed'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -65,15 +65,22 @@ def create_desktop_embedded():
     print("📝 Membuat desktop_embedded.py...")
     
     desktop_content = """import webview
+import os
 import sys
 import threading
-from app_embedded import app
+# The desktop app works from a local replica and syncs in the background
+os.environ.setdefault('OFFLINE_MODE', '1')
+from app_embedded import app, init_db, start_sync_worker
 import time
 
 def start_server():
     app.run(port=5000, debug=False, use_reloader=False)
 
 if __name__ == '__main__':
+    # Create the local replica and start syncing it with the remote
+    init_db()
+    start_sync_worker()
+
     # Start Flask in a separate thread
     t = threading.Thread(target=start_server)
     t.daemon = True
@@ -102,6 +109,14 @@ if __name__ == '__main__':
     
     print("✅ desktop_embedded.py berhasil dibuat")
 
+def build_static_assets():
+    """Buat salinan CSS/JS ber-hash + .gz di static/dist (ikut dibundel)"""
+    print("📝 Membuat static/dist (CSS/JS ber-hash)...")
+    from assets import build_assets
+    for original, hashed in build_assets('static').items():
+        print(f"   {original} -> {hashed}")
+    print("✅ static/dist berhasil dibuat")
+
 def create_spec_file():
     """Buat file .spec untuk PyInstaller"""
     print("📝 Membuat kejaksaan.spec...")
@@ -262,6 +277,7 @@ def main():
         sys.exit(1)
     
     create_desktop_embedded()
+    build_static_assets()
     create_spec_file()
     
     # Step 2: Build
@@ -0,0 +1,121 @@
+"""
+Deployment-aware connection pool configuration.
+
+Serverless functions (Vercel) are frozen between invocations, so a pooled
+connection would outlive its socket; they keep NullPool and connect per
+request. Long-running processes (gunicorn, desktop.py) reuse a bounded pool
+of connections instead of paying a fresh TLS handshake to Supabase on every
+request.
+
+Both pools time each connection checkout and record it on `flask.g`, so the
+cost is visible per request (see `pool_timing`).
+"""
+import os
+import time
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+POOL_MODES = ('auto', 'null', 'queue')
+
+# Environment variables set by serverless platforms
+SERVERLESS_ENV_VARS = ('VERCEL', 'AWS_LAMBDA_FUNCTION_NAME')
+
+
+def _request_timing():
+    return g.setdefault('db_pool_timing', {'checkouts': 0, 'connects': 0, 'ms': 0.0})
+
+
+class TimedPoolMixin:
+    """Record how long every checkout (wait + connect + pre-ping) takes"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            if has_app_context():
+                timing = _request_timing()
+                timing['checkouts'] += 1
+                timing['ms'] += (time.perf_counter() - started) * 1000
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+@event.listens_for(TimedNullPool, 'connect')
+@event.listens_for(TimedQueuePool, 'connect')
+def _count_new_connection(dbapi_connection, connection_record):
+    if has_app_context():
+        _request_timing()['connects'] += 1
+
+
+def is_serverless(environ=os.environ):
+    """True on a serverless host (Vercel, AWS Lambda)"""
+    return any(environ.get(name) for name in SERVERLESS_ENV_VARS)
+
+
+def resolve_pool_mode(environ=os.environ):
+    """'null' or 'queue' from DB_POOL_MODE, auto-detecting serverless hosts"""
+    mode = environ.get('DB_POOL_MODE', 'auto').lower()
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {POOL_MODES}, got {mode!r}")
+    if mode == 'auto':
+        mode = 'null' if is_serverless(environ) else 'queue'
+    return mode
+
+
+def engine_options(database_url, environ=os.environ):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the current deployment.
+
+    Args:
+        database_url: Connection string the engine is created for
+        environ: Environment to read DB_POOL_* settings from
+
+    Returns:
+        dict: Engine keyword arguments
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite lives inside its single connection; keep the default pool
+        return {}
+
+    if resolve_pool_mode(environ) == 'null':
+        # Required for Supabase Transaction Mode Pooler on serverless
+        return {'poolclass': TimedNullPool}
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', '5')),
+        # Fail fast instead of queueing requests behind a saturated pool
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', '10')),
+        # Supabase's pooler drops idle client connections; recycle before it does
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', '300')),
+        # Replace connections that died while idle instead of failing the request
+        'pool_pre_ping': True,
+    }
+
+
+def pool_timing():
+    """
+    Connection checkouts made during the current request.
+
+    Returns:
+        dict | None: {'checkouts', 'connects', 'ms'} or None if the request
+        never touched the database
+    """
+    return g.get('db_pool_timing')
+
+
+def server_timing_header(timing):
+    """Format pool timing as a Server-Timing header value"""
+    return (f'db-acquire;dur={timing["ms"]:.1f};'
+            f'desc="{timing["checkouts"]} checkout, {timing["connects"]} new"')
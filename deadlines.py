@@ -0,0 +1,210 @@
+"""
+Deadline rules for the case stages.
+
+The limits are compiled once at import time. `evaluate_cases` then marks a
+whole page of cases in one pass against a single "today" snapshot, so the
+template only reads ready-made CSS classes instead of re-parsing every cell.
+"""
+import re
+from datetime import datetime, timedelta
+from dateutil import parser
+
+OVERDUE_CLASS = 'overdue-cell'
+COMPLETE_CLASS = 'text-success-bold'
+
+# Case.current_stage value once every stage is filled
+STAGE_COMPLETE = 'complete'
+# "Jatuh tempo" window for the dashboard's due_soon filter
+DUE_SOON_DAYS = 3
+
+# Batas waktu per tahap dalam hari kalender. Hari input dihitung sebagai
+# hari ke-1, jadi overdue jika: Hari Ini > (Tgl Input + (batas - 1) hari)
+STAGE_LIMITS = {
+    'Dewasa': {
+        'spdp': 25,             # SPDP 25 hari kalender
+        'berkas_tahap_1': 6,    # Berkas Tahap I 6 hari kalender
+        'p18_p19': 10,          # P-18/P-19 10 hari kalender
+        'p21': 12,              # P-21 12 hari kalender
+        'tahap_2': 7            # Tahap II 7 hari kalender
+    },
+    'Anak': {
+        'spdp': 25,             # SPDP tetap 25 hari
+        'berkas_tahap_1': 3,    # Berkas Tahap I 3 hari kalender
+        'p18_p19': 7,           # P-18/P-19 7 hari kalender
+        'p21': 10,              # P-21 10 hari kalender
+        'tahap_2': 5            # Tahap II 5 hari kalender
+    },
+}
+
+# Stage key -> Case attribute holding that stage's date, in workflow order
+STAGE_FIELDS = {
+    'spdp': 'spdp_tgl_terima',
+    'berkas_tahap_1': 'berkas_tahap_1',
+    'p18_p19': 'p18_p19',
+    'p21': 'p21',
+    'tahap_2': 'tahap_2',
+}
+
+# Case attributes whose change can move the materialized deadline columns
+DEADLINE_FIELDS = frozenset(STAGE_FIELDS.values()) | {'kategori_umur'}
+
+# (stage, days to add to the input date to reach its last allowed day)
+_COMPILED_LIMITS = {
+    kategori: tuple(
+        (stage, timedelta(days=limit - 1))
+        for stage, limit in limits.items() if limit
+    )
+    for kategori, limits in STAGE_LIMITS.items()
+}
+
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# "2025-07-09 10:30" as saved by the date picker modal
+_ISO_DATETIME_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2})(?::(\d{2}))?$')
+
+
+def parse_date(date_str):
+    """
+    Robust date parser using dateutil.
+    Handles YYYY-MM-DD (ISO) and DD-MM-YYYY formats.
+    """
+    if not date_str or not isinstance(date_str, str):
+        return None
+
+    try:
+        # Check for ISO format YYYY-MM-DD via regex to avoid ambiguity.
+        # Same result as parser.parse(date_str, yearfirst=True) without the
+        # cost of dateutil's tokenizer.
+        if _ISO_DATE_RE.match(date_str):
+            year, month, day = date_str.split('-')
+            return datetime(int(year), int(month), int(day))
+
+        # Date picker values go through dateutil below with dayfirst=True,
+        # which reads "YYYY-AA-BB" as day AA / month BB whenever BB <= 12.
+        # Reproduce that directly so the common case skips the tokenizer.
+        match = _ISO_DATETIME_RE.match(date_str)
+        if match:
+            year, first, second, hour, minute, sec = (int(g or 0) for g in match.groups())
+            day, month = (first, second) if second <= 12 else (second, first)
+            return datetime(year, month, day, hour, minute, sec)
+
+        # Fallback: parser is smart enough to handle most formats
+        # dayfirst=True ensures 01/02/2023 is treated as 1st Feb
+        return parser.parse(date_str, dayfirst=True)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def is_date_overdue(date_obj, days_limit):
+    if not date_obj:
+        return False
+    # Hitung tanggal deadline: tanggal input + (days_limit - 1) hari
+    # Karena hari input sudah dihitung sebagai hari ke-1
+    deadline = date_obj + timedelta(days=days_limit - 1)
+    # Cek apakah hari ini sudah melewati deadline
+    return datetime.now().date() > deadline.date()
+
+
+def overdue_class(value, field_name, kategori_umur='Dewasa', today=None):
+    """CSS class for a single stage cell: 'overdue-cell' or ''"""
+    limit = STAGE_LIMITS['Anak' if kategori_umur == 'Anak' else 'Dewasa'].get(field_name)
+    if not limit:
+        return ""
+    date_obj = parse_date(value)
+    if not date_obj:
+        return ""
+    today = today or datetime.now().date()
+    # today > date + (limit - 1) days  <=>  date < today - (limit - 1) days
+    return OVERDUE_CLASS if date_obj.date() < today - timedelta(days=limit - 1) else ""
+
+
+def evaluate_cases(cases, today=None):
+    """
+    Compute the stage cell classes for a page of cases in one pass.
+
+    Args:
+        cases: Iterable of Case rows
+        today: Date snapshot to evaluate against (defaults to today)
+
+    Returns:
+        dict: {case.id: {stage: css class}} for every stage in STAGE_FIELDS.
+        Complete cases get 'text-success-bold' on every stage, others get
+        'overdue-cell' or ''.
+    """
+    today = today or datetime.now().date()
+    cutoffs = {
+        kategori: tuple((stage, today - delta) for stage, delta in limits)
+        for kategori, limits in _COMPILED_LIMITS.items()
+    }
+    parsed = {}
+    results = {}
+
+    for case in cases:
+        values = {stage: getattr(case, field) for stage, field in STAGE_FIELDS.items()}
+
+        if all(values.values()):
+            results[case.id] = dict.fromkeys(STAGE_FIELDS, COMPLETE_CLASS)
+            continue
+
+        classes = dict.fromkeys(STAGE_FIELDS, "")
+        for stage, cutoff in cutoffs['Anak' if case.kategori_umur == 'Anak' else 'Dewasa']:
+            value = values[stage]
+            if not value:
+                continue
+            if value not in parsed:
+                parsed[value] = parse_date(value)
+            date_obj = parsed[value]
+            if date_obj and date_obj.date() < cutoff:
+                classes[stage] = OVERDUE_CLASS
+        results[case.id] = classes
+
+    return results
+
+
+def stage_deadlines(case):
+    """
+    Last on-time day of every filled stage that has a limit.
+
+    Returns:
+        list: [(stage, deadline date)] in workflow order; stages whose date
+        cannot be parsed are left out
+    """
+    limits = dict(_COMPILED_LIMITS['Anak' if case.kategori_umur == 'Anak' else 'Dewasa'])
+    deadlines = []
+    for stage, field in STAGE_FIELDS.items():
+        value = getattr(case, field)
+        date_obj = parse_date(value) if value else None
+        if not date_obj or stage not in limits:
+            continue
+        try:
+            deadlines.append((stage, date_obj.date() + limits[stage]))
+        except OverflowError:
+            continue
+    return deadlines
+
+
+def compute_deadline(case):
+    """
+    Derive the persisted urgency columns of a case.
+
+    Returns:
+        tuple: (current_stage, next_deadline, first_deadline) where
+        current_stage is the last filled stage in workflow order ('complete'
+        once all are filled, None if none is), next_deadline is the last
+        on-time day of that open stage (what due_soon and the urgency sort
+        look at), and first_deadline is the earliest last on-time day of any
+        filled stage. A case shows an overdue cell on the dashboard exactly
+        when first_deadline < today.
+    """
+    values = [(stage, getattr(case, field)) for stage, field in STAGE_FIELDS.items()]
+    if all(value for _, value in values):
+        return STAGE_COMPLETE, None, None
+
+    current_stage = None
+    for stage, value in values:
+        if value:
+            current_stage = stage
+
+    deadlines = stage_deadlines(case)
+    next_deadline = dict(deadlines).get(current_stage)
+    first_deadline = min((deadline for _, deadline in deadlines), default=None)
+    return current_stage, next_deadline, first_deadline
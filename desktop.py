@@ -1,13 +1,20 @@
 import webview
+import os
 import sys
 import threading
-from app import app
+# The desktop app works from a local replica and syncs in the background
+os.environ.setdefault('OFFLINE_MODE', '1')
+from app import app, init_db, start_sync_worker
 import time
 
 def start_server():
     app.run(port=5000, debug=False)
 
 if __name__ == '__main__':
+    # Create the local replica and start syncing it with the remote
+    init_db()
+    start_sync_worker()
+
     # Start Flask in a separate thread
     t = threading.Thread(target=start_server)
     t.daemon = True
@@ -0,0 +1,259 @@
+"""
+Live change feed for open dashboards (Server-Sent Events at /events).
+
+Writers call `notify_change(session, kind, ids)` before committing. On
+Postgres this queues a NOTIFY in the same transaction, so the event goes
+out exactly when (and only if) the change commits, and every process -
+the writer's included - receives it through its LISTEN thread. On other
+databases the event is kept on the session and published to this process
+once the commit succeeds.
+
+Each process fans events out to its SSE subscribers through an in-memory
+ChangeBroker. An open stream holds a worker thread, so the number of
+streams per process is capped (see event_stream). Events only carry case ids; browsers fetch the rows they
+display through /rows, which is served from the row cache.
+"""
+import itertools
+import json
+import os
+import queue
+import select
+import threading
+import time
+from collections import deque
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+CHANNEL = 'case_changes'
+EVENT_KINDS = ('insert', 'update', 'delete')
+# Larger batches are announced as a 'resync' (NOTIFY payloads max 8000 bytes)
+MAX_EVENT_IDS = 500
+# Events kept for clients reconnecting with Last-Event-ID
+REPLAY_SIZE = 256
+# Events buffered per subscriber before a slow client is dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+# Seconds between comment lines that keep proxies from closing the stream
+HEARTBEAT_SECONDS = 15
+# Seconds a LISTEN connection waits before reconnecting after an error
+LISTEN_RETRY_SECONDS = 5
+
+_PENDING_KEY = 'pending_change_events'
+
+
+class ChangeBroker:
+    """Thread-safe fan-out of change events to this process's subscribers"""
+
+    def __init__(self, replay_size=REPLAY_SIZE, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        # Event ids are only comparable within one process lifetime
+        self.prefix = f"{os.getpid()}.{int(time.time())}"
+        self.queue_size = queue_size
+        self._counter = itertools.count(1)
+        self._recent = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, payload):
+        """Number and deliver one event; returns its id"""
+        with self._lock:
+            event_id = f"{self.prefix}-{next(self._counter)}"
+            item = (event_id, payload)
+            self._recent.append(item)
+            for subscriber in list(self._subscribers):
+                if subscriber.qsize() >= self.queue_size:
+                    # Too far behind: end its stream (the spare slot takes the
+                    # sentinel); it gets a resync when it reconnects
+                    self._subscribers.discard(subscriber)
+                    subscriber.put_nowait(None)
+                else:
+                    subscriber.put_nowait(item)
+        return event_id
+
+    def subscribe(self, last_event_id=None, limit=None):
+        """
+        Register a subscriber.
+
+        Args:
+            limit: Refuse the subscriber once this many are registered
+
+        Returns:
+            tuple: (queue, missed) where missed is the list of events after
+            last_event_id, or None when they are no longer known;
+            (None, None) when the limit is reached
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size + 1)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None, None
+            self._subscribers.add(subscriber)
+            missed = []
+            if last_event_id:
+                ids = [event_id for event_id, _ in self._recent]
+                if last_event_id in ids:
+                    missed = list(self._recent)[ids.index(last_event_id) + 1:]
+                else:
+                    missed = None
+        return subscriber, missed
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+broker = ChangeBroker()
+
+
+def change_payload(kind, ids):
+    """The event body: {'type': kind, 'ids': [...]}, or a resync for huge batches"""
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"kind must be one of {EVENT_KINDS}, got {kind!r}")
+    ids = sorted({int(case_id) for case_id in ids})
+    if len(ids) > MAX_EVENT_IDS:
+        return {'type': 'resync'}
+    return {'type': kind, 'ids': ids}
+
+
+def notify_change(session, kind, ids):
+    """Announce a case change once the session's transaction commits"""
+    payload = change_payload(kind, ids)
+    if session.get_bind().dialect.name == 'postgresql':
+        # Delivered by Postgres at COMMIT, dropped on ROLLBACK
+        session.execute(sql_select(func.pg_notify(CHANNEL, json.dumps(payload))))
+    else:
+        session.info.setdefault(_PENDING_KEY, []).append(payload)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    for payload in session.info.pop(_PENDING_KEY, ()):
+        broker.publish(payload)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def format_event(event_id, payload):
+    """One SSE message"""
+    return f"id: {event_id}\nevent: case\ndata: {json.dumps(payload)}\n\n"
+
+
+class EventStream:
+    """The SSE stream of one subscribed client; close() unsubscribes it"""
+
+    def __init__(self, subscriber, missed, max_seconds=None, heartbeat=HEARTBEAT_SECONDS):
+        self.subscriber = subscriber
+        self._messages = self._generate(missed, max_seconds, heartbeat)
+
+    def __iter__(self):
+        return self._messages
+
+    def close(self):
+        # Also covers a response closed before its first message
+        self._messages.close()
+        broker.unsubscribe(self.subscriber)
+
+    def _generate(self, missed, max_seconds, heartbeat):
+        try:
+            yield f"retry: {LISTEN_RETRY_SECONDS * 1000}\n\n"
+            if missed is None:
+                # Events were lost while disconnected: reload the visible rows
+                yield f"event: case\ndata: {json.dumps({'type': 'resync'})}\n\n"
+            for event_id, payload in missed or ():
+                yield format_event(event_id, payload)
+
+            deadline = time.monotonic() + max_seconds if max_seconds else None
+            while deadline is None or time.monotonic() < deadline:
+                timeout = heartbeat if deadline is None else max(0, min(heartbeat, deadline - time.monotonic()))
+                try:
+                    item = self.subscriber.get(timeout=timeout)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield format_event(*item)
+        finally:
+            broker.unsubscribe(self.subscriber)
+
+
+def event_stream(last_event_id=None, max_seconds=None, heartbeat=HEARTBEAT_SECONDS, max_subscribers=None):
+    """
+    Subscribe one client and return its SSE stream.
+
+    Args:
+        last_event_id: Last-Event-ID sent by a reconnecting browser
+        max_seconds: Close the stream after this long (the browser
+            reconnects), so a worker thread is never held indefinitely
+        max_subscribers: Streams this process serves at most; each one
+            holds a worker thread for up to max_seconds
+
+    Returns:
+        EventStream | None: None when max_subscribers streams are open
+    """
+    subscriber, missed = broker.subscribe(last_event_id, limit=max_subscribers)
+    if subscriber is None:
+        return None
+    return EventStream(subscriber, missed, max_seconds, heartbeat)
+
+
+# --- Postgres LISTEN ---
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _listen(url, stop):
+    import psycopg2
+    import psycopg2.extensions
+
+    dsn = make_url(url).set(drivername='postgresql').render_as_string(hide_password=False)
+    reconnecting = False
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            if reconnecting:
+                # Changes made while we were not listening are unknown
+                broker.publish({'type': 'resync'})
+            reconnecting = True
+            while not stop.is_set():
+                if select.select([conn], [], [], HEARTBEAT_SECONDS) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notice = conn.notifies.pop(0)
+                    broker.publish(json.loads(notice.payload))
+        except (psycopg2.Error, OSError, ValueError) as e:
+            print(f"Change feed listener error: {e}")
+            stop.wait(LISTEN_RETRY_SECONDS)
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
+
+
+def start_listener(url):
+    """
+    Start this process's LISTEN thread once (Postgres only).
+
+    Args:
+        url: A session-mode connection; LISTEN does not work through a
+            transaction pooler such as Supabase's port 6543
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            stop = threading.Event()
+            _listener = threading.Thread(target=_listen, args=(url, stop), name='change-feed-listener', daemon=True)
+            _listener.stop = stop
+            _listener.start()
+        return _listener
@@ -0,0 +1,165 @@
+"""
+Write-behind audit log of dashboard cell edits (case_history).
+
+Request handlers hand finished edits to HistoryWriter.record(), which only
+appends to an in-memory queue; a background thread inserts them in batches
+with one executemany per round, so an edit costs no extra round trip.
+
+The queue is bounded: when it is full (the database is slow or down) the
+caller writes its own entries synchronously, so history is never dropped
+to save memory. stop() - registered with atexit - drains the queue before
+the process exits. Entries still queued when a process is killed outright
+are lost; the log is best-effort audit, not a transaction journal.
+
+Where no background thread can be relied on - serverless functions are
+frozen after the response and recycled without a normal exit - the edit
+writes its entries itself with write_entries(), in its own transaction.
+"""
+import queue
+import threading
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import CaseHistory
+
+# Entries inserted per round trip
+BATCH_SIZE = 200
+# Longest an entry waits in the queue before it is written
+FLUSH_SECONDS = 1.0
+# Entries buffered before callers fall back to writing themselves
+MAX_QUEUE = 10000
+# Entries per page of /case/<id>/history
+HISTORY_PAGE_SIZE = 50
+
+# Column headings of the dashboard, for the history view
+FIELD_LABELS = {
+    'nama_tersangka': 'Nama Tersangka',
+    'umur_tersangka': 'Umur',
+    'kategori_umur': 'Kategori',
+    'pasal': 'Pasal',
+    'jpu': 'JPU',
+    'spdp_tgl_terima': 'SPDP (Kejaksaan)',
+    'spdp_tgl_polisi': 'SPDP (Polisi)',
+    'berkas_tahap_1': 'Berkas Tahap I',
+    'p18_p19': 'P-18 / P-19',
+    'p21': 'P-21',
+    'tahap_2': 'Tahap II',
+    'limpah_pn': 'Limpah PN',
+    'keterangan': 'Keterangan',
+}
+
+
+def history_entry(case_id, field, old_value, new_value, user, changed_at):
+    """One case_history row; values are stored as text"""
+    return {
+        'case_id': case_id,
+        'field': field,
+        'old_value': None if old_value is None else str(old_value),
+        'new_value': None if new_value is None else str(new_value),
+        'user_id': getattr(user, 'id', None),
+        'username': getattr(user, 'username', None),
+        'changed_at': changed_at,
+    }
+
+
+def write_entries(session, entries):
+    """Insert case_history entries in the session's current transaction"""
+    if entries:
+        session.execute(insert(CaseHistory), entries)
+
+
+class HistoryWriter(threading.Thread):
+    """Background thread inserting queued case_history rows in batches"""
+
+    def __init__(self, app, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS, max_queue=MAX_QUEUE):
+        super().__init__(name='history-writer', daemon=True)
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.overflowed = 0
+        self._stopped = threading.Event()
+
+    def record(self, entries):
+        """Queue entries for writing; writes them inline if the queue is full"""
+        overflow = []
+        for entry in entries:
+            try:
+                self.queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+        if overflow:
+            self.overflowed += len(overflow)
+            self._write(overflow)
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                write_entries(db.session, batch)
+                db.session.commit()
+                self.written += len(batch)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                print(f"Case history write error, {len(batch)} entries lost: {e}")
+
+    def _take_batch(self, block):
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=self.flush_seconds) if block else self.queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def run(self):
+        while not self._stopped.is_set():
+            batch = self._take_batch(block=True)
+            if batch:
+                self._write(batch)
+                for _ in batch:
+                    self.queue.task_done()
+        self._drain()
+
+    def _drain(self):
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return
+            self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        if self.is_alive():
+            self.queue.join()
+        else:
+            self._drain()
+
+    def stop(self, timeout=10):
+        """Stop the thread after writing what is still queued"""
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+        else:
+            self._drain()
+
+
+def case_history_page(session, case_id, before=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Newest-first history of one case, seeking on ix_case_history_case_id_id.
+
+    Returns:
+        tuple: (entries, next_before) where next_before is the `before`
+        value of the next (older) page, or None on the last page
+    """
+    stmt = select(CaseHistory).where(CaseHistory.case_id == case_id)
+    if before is not None:
+        stmt = stmt.where(CaseHistory.id < before)
+    entries = session.scalars(
+        stmt.order_by(CaseHistory.case_id.desc(), CaseHistory.id.desc()).limit(limit + 1)
+    ).all()
+    next_before = entries[limit - 1].id if len(entries) > limit else None
+    return entries[:limit], next_before
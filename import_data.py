@@ -1,50 +1,299 @@
-import pandas as pd
-from app import app, db
-from models import Case
+"""
+Import data perkara dari file Excel (format FORMAT.xlsx) atau CSV hasil export
+
+Workbook dibaca secara streaming (openpyxl read-only) dan ditulis per batch
+dengan INSERT executemany (atau COPY di PostgreSQL), sehingga pemakaian
+memori tetap kecil walaupun jumlah barisnya ratusan ribu.
+
+Usage:
+    python import_data.py [FILE.xlsx|FILE.csv] [--mode skip|append|upsert] [--batch-size 1000]
+
+Mode:
+    skip    Lewati import jika database sudah berisi data (perilaku lama)
+    append  Tambahkan semua baris sebagai data baru
+    upsert  Perbarui data yang NAMA TERSANGKA + PASAL-nya sama, sisanya ditambahkan
+"""
+import csv
+import io
+import time
+import argparse
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import insert, update, tuple_
+from extensions import db
+from models import Case, DATE_SHADOW_COLUMNS, SERVER_MANAGED_COLUMNS, mark_case_changed
+from deadlines import parse_date, compute_deadline
+
+# Kolom Excel -> field Case. Sepuluh kolom pertama mengikuti FORMAT.xlsx;
+# kolom tambahan sesudahnya opsional (ditulis oleh /export.xlsx supaya data
+# hasil export bisa di-import kembali tanpa kehilangan isi).
+EXCEL_COLUMNS = [
+    ('NO', None),
+    ('NAMA TERSANGKA', 'nama_tersangka'),
+    ('PASAL YANG DISANGKAKAN', 'pasal'),
+    ('SPDP', 'spdp'),
+    ('BERKAS TAHAP I', 'berkas_tahap_1'),
+    ('P-18 / P-19', 'p18_p19'),
+    ('P-21', 'p21'),
+    ('TAHAP II', 'tahap_2'),
+    ('LIMPAH PN', 'limpah_pn'),
+    ('KETERANGAN', 'keterangan'),
+    ('UMUR', 'umur_tersangka'),
+    ('KATEGORI UMUR', 'kategori_umur'),
+    ('JPU', 'jpu'),
+    ('SPDP TGL TERIMA', 'spdp_tgl_terima'),
+    ('SPDP KET TERIMA', 'spdp_ket_terima'),
+    ('SPDP TGL POLISI', 'spdp_tgl_polisi'),
+    ('SPDP KET POLISI', 'spdp_ket_polisi'),
+]
+
+# Free-text columns that FORMAT.xlsx wraps onto the following rows
+CONTINUATION_FIELDS = ('pasal', 'spdp', 'keterangan')
+
+MODES = ('skip', 'append', 'upsert')
+
+# Leading characters that make Excel / LibreOffice read a cell as a formula;
+# export_data.py prefixes such text with FORMULA_ESCAPE
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+FORMULA_ESCAPE = "'"
+
+def unescape_formula(text):
+    """Drop the FORMULA_ESCAPE that export_data.py put before formula-like text"""
+    if text.startswith(FORMULA_ESCAPE) and text[1:].startswith(FORMULA_PREFIXES):
+        return text[1:]
+    return text
+
+def clean(val):
+    """Cell value -> stripped string ('' for empty cells)"""
+    if val is None:
+        return ""
+    if isinstance(val, datetime):
+        # Unambiguous for parse_date: ISO date, or day-first with a time
+        if val.hour or val.minute or val.second:
+            return val.strftime('%d-%m-%Y %H:%M')
+        return val.strftime('%Y-%m-%d')
+    if isinstance(val, float) and val.is_integer():
+        val = int(val)
+    return unescape_formula(str(val).strip())
+
+def _read_rows(path):
+    """Yield the raw rows of an .xlsx (streamed) or .csv file, header first"""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.reader(f)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def iter_excel_cases(excel_file):
+    """
+    Stream case dicts out of a workbook without loading it into memory.
+
+    A row without NAMA TERSANGKA and without NO continues the case above it
+    (FORMAT.xlsx spreads long PASAL and SPDP text over several rows). The
+    export always numbers its rows, so nameless cases survive a round trip.
+    """
+    rows = _read_rows(excel_file)
+    header = next(rows, None) or ()
+    headers = [clean(h).upper() for h in header]
+    columns = [(headers.index(name), field) for name, field in EXCEL_COLUMNS
+               if field and name in headers]
+    no_index = headers.index('NO') if 'NO' in headers else None
+
+    current = None
+    for row in rows:
+        values = {field: clean(row[index]) if index < len(row) else "" for index, field in columns}
+        numbered = no_index is not None and no_index < len(row) and clean(row[no_index])
+        if not any(values.values()):
+            continue
+
+        if values.get('nama_tersangka') or numbered:
+            if current:
+                yield current
+            current = values
+        elif current:
+            for field in CONTINUATION_FIELDS:
+                if values.get(field):
+                    current[field] = f"{current[field]} {values[field]}".strip()
+        # Rows before the first case (e.g. the sub-header) are skipped
+
+    if current:
+        yield current
+
+# Every column an INSERT writes; missing keys default to None
+_ROW_COLUMNS = [column.key for column in Case.__table__.columns
+                if column.key != 'id' and column.key not in SERVER_MANAGED_COLUMNS]
+
+def case_row(values):
+    """
+    Full column dict for one case, including the derived columns.
+
+    Computed on a plain namespace rather than a transient Case, which would
+    cost an ORM instrumentation round trip per spreadsheet row.
+    """
+    row = dict.fromkeys(_ROW_COLUMNS)
+    row.update(values)
+    umur = row.get('umur_tersangka')
+    row['umur_tersangka'] = int(umur) if umur and str(umur).isdigit() else None
+    row['kategori_umur'] = row.get('kategori_umur') or 'Dewasa'
+
+    for source, shadow in DATE_SHADOW_COLUMNS.items():
+        row[shadow] = parse_date(row[source])
+    row['current_stage'], row['next_deadline'], row['first_deadline'] = compute_deadline(SimpleNamespace(**row))
+    row['created_at'] = datetime.now()
+    return row
+
+# Characters with a meaning in COPY's text format, escaped in cell values
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def copy_line(values):
+    """
+    One line of COPY text format: tab-separated, \\N for NULL.
+
+    Backslashes in the data are doubled, so a cell holding a literal \\N
+    or a backslash sequence is loaded as written.
+    """
+    return '\t'.join('\\N' if value is None else str(value).translate(_COPY_ESCAPES)
+                     for value in values) + '\n'
+
+def _copy_rows(rows):
+    """Bulk load with PostgreSQL COPY over the session's connection"""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(copy_line(row[c] for c in columns))
+    buffer.seek(0)
+
+    dbapi_conn = db.session.connection().connection.dbapi_connection
+    with dbapi_conn.cursor() as cursor:
+        cursor.copy_expert(f'COPY "case" ({", ".join(columns)}) FROM STDIN', buffer)
+    # COPY bypasses the ORM, so record the write for the table version
+    mark_case_changed(db.session)
+
+def _insert_rows(rows, use_copy):
+    if not rows:
+        return
+    if use_copy:
+        _copy_rows(rows)
+    else:
+        db.session.execute(insert(Case.__table__), rows)
+
+def _upsert_rows(rows, use_copy):
+    """Update cases matching on (nama_tersangka, pasal), insert the rest"""
+    # A key repeated within the batch is written once, from its last row
+    rows = list({(row['nama_tersangka'], row['pasal']): row for row in rows}.values())
+    keys = {(row['nama_tersangka'], row['pasal']) for row in rows}
+    existing = {}
+    for case in Case.query.filter(tuple_(Case.nama_tersangka, Case.pasal).in_(keys)).order_by(Case.id):
+        existing[(case.nama_tersangka, case.pasal)] = case
+
+    updates, inserts = [], []
+    for row in rows:
+        case = existing.get((row['nama_tersangka'], row['pasal']))
+        if case is None:
+            inserts.append(row)
+            continue
+        # Empty cells never blank out data that is already there
+        for field in (f for _, f in EXCEL_COLUMNS if f):
+            if row.get(field) not in ("", None):
+                setattr(case, field, row[field])
+        case.refresh_derived()
+        updates.append({column.key: getattr(case, column.key) for column in Case.__table__.columns
+                        if column.key != 'created_at' and column.key not in SERVER_MANAGED_COLUMNS})
+
+    # The loaded objects were only used to merge values; write set-based
+    db.session.expunge_all()
+    if updates:
+        db.session.execute(update(Case), updates)
+    _insert_rows(inserts, use_copy)
+    return len(inserts), len(updates)
+
+def import_excel(excel_file='FORMAT.xlsx', mode='skip', batch_size=1000, use_copy=None):
+    """
+    Import cases from an Excel workbook in batches.
+
+    Args:
+        excel_file: Path to the workbook
+        mode: 'skip', 'append' or 'upsert' (see module docstring)
+        batch_size: Rows per INSERT/COPY and per commit
+        use_copy: Use COPY on PostgreSQL (default: yes for append/skip)
+
+    Returns:
+        tuple: (inserted, updated) row counts
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    if use_copy is None:
+        use_copy = mode != 'upsert'
+    use_copy = use_copy and db.engine.dialect.name == 'postgresql'
 
-def import_excel():
-    excel_file = 'FORMAT.xlsx'
     try:
-        df = pd.read_excel(excel_file)
-        
         # Check if DB is empty
-        if Case.query.first():
+        if mode == 'skip' and Case.query.first():
             print("Database already contains data. Skipping import.")
-            return
-
-        print("Importing data from Excel...")
-        for _, row in df.iterrows():
-            # Handle NaN values
-            def clean(val):
-                if pd.isna(val):
-                    return ""
-                return str(val).strip()
-
-            new_case = Case(
-                nama_tersangka=clean(row.get('NAMA TERSANGKA')),
-                pasal=clean(row.get('PASAL YANG DISANGKAKAN')),
-                spdp=clean(row.get('SPDP')),
-                berkas_tahap_1=clean(row.get('BERKAS TAHAP I')),
-                p18_p19=clean(row.get('P-18 / P-19')),
-                p21=clean(row.get('P-21')),
-                tahap_2=clean(row.get('TAHAP II')),
-                limpah_pn=clean(row.get('LIMPAH PN')),
-                keterangan=clean(row.get('KETERANGAN'))
-            )
-            db.session.add(new_case)
-        
-        db.session.commit()
-        print("Import successful!")
-        
+            return 0, 0
+
+        print(f"Importing data from {excel_file} (mode={mode}, batch={batch_size}"
+              f"{', COPY' if use_copy else ''})...")
+        started = time.monotonic()
+        inserted = updated = 0
+        batch = []
+        batch_no = 0
+
+        def flush():
+            nonlocal inserted, updated, batch_no
+            batch_started = time.monotonic()
+            if mode == 'upsert':
+                added, changed = _upsert_rows(batch, use_copy)
+            else:
+                _insert_rows(batch, use_copy)
+                added, changed = len(batch), 0
+            db.session.commit()
+            inserted += added
+            updated += changed
+            batch_no += 1
+            elapsed = time.monotonic() - started
+            print(f"  batch {batch_no}: {len(batch)} baris ({added} baru, {changed} diperbarui) "
+                  f"dalam {time.monotonic() - batch_started:.2f}s; total {inserted + updated}, "
+                  f"{(inserted + updated) / max(elapsed, 1e-6):.0f} baris/detik")
+            batch.clear()
+
+        for values in iter_excel_cases(excel_file):
+            batch.append(case_row(values))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        print(f"Import successful! {inserted} baru, {updated} diperbarui "
+              f"dalam {time.monotonic() - started:.1f}s")
+        return inserted, updated
+
     except FileNotFoundError:
         print(f"File {excel_file} not found.")
     except Exception as e:
+        db.session.rollback()
         print(f"Error during import: {e}")
+    return 0, 0
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Import data perkara dari file Excel')
+    arg_parser.add_argument('excel_file', nargs='?', default='FORMAT.xlsx')
+    arg_parser.add_argument('--mode', choices=MODES, default='skip')
+    arg_parser.add_argument('--batch-size', type=int, default=1000)
+    arg_parser.add_argument('--no-copy', action='store_true', help='Pakai INSERT walaupun di PostgreSQL')
+    args = arg_parser.parse_args()
+
+    from app import app, create_admin
     with app.app_context():
         db.create_all()
         # Create admin here too just in case
-        from app import create_admin
         create_admin()
-        import_excel()
+        import_excel(args.excel_file, args.mode, args.batch_size,
+                     use_copy=False if args.no_copy else None)
@@ -0,0 +1,290 @@
+"""
+Request, SQL and template metrics in Prometheus text format (/metrics).
+
+init_metrics(app) times every request per endpoint, every SQL statement
+(SQLAlchemy engine events), every render_template() call and every new
+database connection, and keeps the totals in process memory. Recording is
+a perf_counter() pair and a locked counter update, so it stays cheap on the
+hot path; nothing is formatted until /metrics is scraped.
+
+Each gunicorn worker keeps its own registry, so a scrape sees the worker
+that answered it. Scrape often enough (or pin a worker) and aggregate with
+sum() / rate() in Prometheus.
+"""
+import bisect
+import threading
+import time
+from flask import g, has_app_context, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'ekejaksaan'
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# SQL statements are mostly sub-millisecond; finer buckets at the low end
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Endpoint label of work done outside a request (background threads, CLI)
+NO_ENDPOINT = 'none'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label tuple"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, one series per label tuple"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (last one is +Inf), sum]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, labels=()):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = (('le', _number(bound)),)
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(round(total, 6))}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    f'{PREFIX}_http_requests_total', 'HTTP requests by endpoint, method and status.',
+    ('endpoint', 'method', 'status')))
+request_seconds = registry.register(Histogram(
+    f'{PREFIX}_http_request_duration_seconds', 'Time from request start to response, by endpoint.',
+    ('endpoint',)))
+sql_statements_total = registry.register(Counter(
+    f'{PREFIX}_sql_statements_total', 'SQL statements executed, by endpoint.', ('endpoint',)))
+sql_seconds = registry.register(Histogram(
+    f'{PREFIX}_sql_statement_duration_seconds', 'SQL statement execution time, by endpoint.',
+    ('endpoint',), buckets=SQL_BUCKETS))
+template_seconds = registry.register(Histogram(
+    f'{PREFIX}_template_render_duration_seconds', 'render_template() time, by template.', ('template',)))
+db_connect_seconds = registry.register(Histogram(
+    f'{PREFIX}_db_connect_duration_seconds', 'Time to open a new database connection.'))
+handled_errors_total = registry.register(Counter(
+    f'{PREFIX}_handled_errors_total', 'Errors caught and answered with a fallback, by endpoint.',
+    ('endpoint',)))
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return NO_ENDPOINT
+
+
+def record_handled_error(endpoint):
+    """Count an exception a view recovered from (it never reaches the 5xx count)"""
+    handled_errors_total.inc((endpoint,))
+
+
+class StatementLog:
+    """
+    Collect the SQL this thread executes while the block runs.
+
+        with StatementLog() as log:
+            client.get('/dashboard')
+        log.statements  # [(endpoint, sql), ...]
+
+    Statements of other threads (e.g. the history writer) are not included.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        with _statement_logs_lock:
+            _statement_logs.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        with _statement_logs_lock:
+            _statement_logs.remove(self)
+        return False
+
+    def __len__(self):
+        return len(self.statements)
+
+
+_statement_logs = []
+_statement_logs_lock = threading.Lock()
+
+
+def request_sql_statements():
+    """SQL statements executed in the current app context so far"""
+    return g.get('sql_statements', 0) if has_app_context() else 0
+
+
+# --- SQL: every engine ---
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _sql_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _sql_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    labels = (_endpoint(),)
+    sql_statements_total.inc(labels)
+    sql_seconds.observe(labels, elapsed)
+    if has_app_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+    if _statement_logs:
+        thread = threading.get_ident()
+        for log in list(_statement_logs):
+            if log._thread == thread:
+                log.statements.append((labels[0], statement))
+
+
+@event.listens_for(Engine, 'handle_error')
+def _sql_failed(exception_context):
+    # after_cursor_execute does not fire for a failed statement
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('metrics_started'):
+        connection.info['metrics_started'].pop()
+
+
+# --- New connections: do_connect fires before the DBAPI connect, the
+# pool's connect event right after it, on the same thread ---
+
+_connecting = threading.local()
+
+
+@event.listens_for(Engine, 'do_connect')
+def _connect_started(dialect, conn_rec, cargs, cparams):
+    _connecting.started = time.perf_counter()
+
+
+@event.listens_for(Pool, 'connect')
+def _connect_finished(dbapi_connection, connection_record):
+    started = getattr(_connecting, 'started', None)
+    if started is not None:
+        _connecting.started = None
+        db_connect_seconds.observe((), time.perf_counter() - started)
+
+
+# --- Templates ---
+
+def _render_started(sender, template, context, **extra):
+    g.setdefault('metrics_renders', []).append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    started = g.get('metrics_renders')
+    if started:
+        template_seconds.observe((template.name or 'string',), time.perf_counter() - started.pop())
+
+
+def init_metrics(app):
+    """
+    Time this app's requests and templates.
+
+    Call before other after_request hooks are registered: hooks run in
+    reverse order, so the latency then includes them (e.g. HTML gzip).
+    """
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            request_seconds.observe((endpoint,), time.perf_counter() - started)
+            requests_total.inc((endpoint, request.method, str(response.status_code)))
+        return response
+
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
@@ -1,6 +1,22 @@
 from extensions import db
 from flask_login import UserMixin
 from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, func, literal_column
+from sqlalchemy.orm import Session
+from deadlines import parse_date, compute_deadline, DEADLINE_FIELDS
+
+# String stage column -> typed shadow column holding the parsed value.
+# The String columns stay the source of truth until cut-over; every write
+# path refreshes the shadow with Case.sync_date_columns().
+DATE_SHADOW_COLUMNS = {
+    'spdp_tgl_terima': 'spdp_tgl_terima_dt',
+    'berkas_tahap_1': 'berkas_tahap_1_dt',
+    'p18_p19': 'p18_p19_dt',
+    'p21': 'p21_dt',
+    'tahap_2': 'tahap_2_dt',
+    'limpah_pn': 'limpah_pn_dt',
+}
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -30,9 +46,58 @@ class Case(db.Model):
     tahap_2 = db.Column(db.String(200))
     limpah_pn = db.Column(db.String(200))
     keterangan = db.Column(db.Text)
+
+    # Typed shadows of the stage dates (see DATE_SHADOW_COLUMNS)
+    spdp_tgl_terima_dt = db.Column(db.DateTime)
+    berkas_tahap_1_dt = db.Column(db.DateTime)
+    p18_p19_dt = db.Column(db.DateTime)
+    p21_dt = db.Column(db.DateTime)
+    tahap_2_dt = db.Column(db.DateTime)
+    limpah_pn_dt = db.Column(db.DateTime)
     
+    # Materialized from the stage dates by refresh_deadline(), so overdue
+    # filters and the urgency sort run as index range scans in SQL
+    current_stage = db.Column(db.String(20))  # Last filled stage, or 'complete'
+    next_deadline = db.Column(db.Date)        # Last on-time day of the current (open) stage
+    first_deadline = db.Column(db.Date)       # Earliest last on-time day of any filled stage
+
     # Metadata
-    created_at = db.Column(db.DateTime, default=datetime.now)
+    # Cursor key of the dashboard and /api/cases, so never NULL (existing
+    # databases: scripts/require_created_at.py)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    # Row version and last write time. These are SQLAlchemy column defaults
+    # (onupdate), not database triggers: they are applied to every INSERT/
+    # UPDATE built from Case or its table (ORM, bulk and Core), but raw SQL
+    # and other clients must set them. The offline replica pulls by
+    # updated_at and pushes edits guarded by version, so writes that skip
+    # them are missed by pulls and slip past the push guard.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=literal_column('version') + 1)
+    updated_at = db.Column(db.DateTime, default=func.now(), server_default=func.now(),
+                           onupdate=func.now())
+
+    __table_args__ = (
+        # Dashboard order; lets keyset pagination seek straight to any page
+        db.Index('ix_case_created_at_id', 'created_at', 'id'),
+        # status=due_soon range and sort=urgency
+        db.Index('ix_case_next_deadline_id', 'next_deadline', 'id'),
+        # status=overdue range (any stage past its limit)
+        db.Index('ix_case_first_deadline_id', 'first_deadline', 'id'),
+        # status=complete, newest first
+        db.Index('ix_case_current_stage_created_at', 'current_stage', 'created_at', 'id'),
+        # Incremental pull of changed rows by the offline replica
+        db.Index('ix_case_updated_at_id', 'updated_at', 'id'),
+        # Dashboard column filters (?jpu=, ?kategori_umur=, ?pasal=) in the
+        # default order, and ?sort= on the same columns
+        db.Index('ix_case_jpu_created_at', 'jpu', 'created_at', 'id'),
+        db.Index('ix_case_kategori_umur_created_at', 'kategori_umur', 'created_at', 'id'),
+        db.Index('ix_case_pasal_created_at', 'pasal', 'created_at', 'id'),
+        # ?sort= on the other displayed columns (stage dates via their shadows)
+        db.Index('ix_case_nama_tersangka_id', 'nama_tersangka', 'id'),
+        db.Index('ix_case_umur_tersangka_id', 'umur_tersangka', 'id'),
+        *(db.Index(f'ix_case_{shadow}_id', shadow, 'id') for shadow in DATE_SHADOW_COLUMNS.values()),
+    )
 
     @property
     def is_complete(self):
@@ -45,19 +110,166 @@ class Case(db.Model):
             self.tahap_2
         ])
 
+    def sync_date_columns(self, fields=None):
+        """
+        Refresh the typed shadow columns from their String sources.
+
+        Args:
+            fields: Source column names to refresh (default: all of them)
+        """
+        for source, shadow in DATE_SHADOW_COLUMNS.items():
+            if fields is None or source in fields:
+                setattr(self, shadow, parse_date(getattr(self, source)))
+
+    def refresh_deadline(self):
+        """Recompute current_stage, next_deadline and first_deadline from the stage dates"""
+        self.current_stage, self.next_deadline, self.first_deadline = compute_deadline(self)
+
+    def refresh_derived(self, fields=None):
+        """
+        Refresh every column derived from the stage fields.
+
+        Args:
+            fields: Names of the columns that changed (default: all of them)
+        """
+        self.sync_date_columns(fields)
+        if fields is None or DEADLINE_FIELDS.intersection(fields):
+            self.refresh_deadline()
+
+    # Keys of to_dict(), also the fields /api/cases can project
+    DICT_FIELDS = (
+        'id', 'nama_tersangka', 'umur_tersangka', 'kategori_umur', 'pasal', 'jpu', 'spdp',
+        'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'limpah_pn', 'keterangan',
+    )
+
     def to_dict(self):
-        return {
-            'id': self.id,
-            'nama_tersangka': self.nama_tersangka,
-            'umur_tersangka': self.umur_tersangka,
-            'kategori_umur': self.kategori_umur,
-            'pasal': self.pasal,
-            'jpu': self.jpu,
-            'spdp': self.spdp,
-            'berkas_tahap_1': self.berkas_tahap_1,
-            'p18_p19': self.p18_p19,
-            'p21': self.p21,
-            'tahap_2': self.tahap_2,
-            'limpah_pn': self.limpah_pn,
-            'keterangan': self.keterangan
-        }
+        return {field: getattr(self, field) for field in self.DICT_FIELDS}
+
+# Columns filled by the onupdate/server defaults above; writers going
+# through SQLAlchemy leave them out (raw SQL must set them itself)
+SERVER_MANAGED_COLUMNS = ('version', 'updated_at')
+
+class CaseTombstone(db.Model):
+    """Deleted case ids, so offline replicas can drop them on their next pull"""
+    __tablename__ = 'case_tombstone'
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=func.now(), server_default=func.now(),
+                           index=True)
+
+class CaseHistory(db.Model):
+    """
+    Append-only audit log of dashboard cell edits (written by history.py).
+
+    No foreign key: the history of a case outlives the case itself.
+    """
+    __tablename__ = 'case_history'
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    case_id = db.Column(db.Integer, nullable=False)
+    field = db.Column(db.String(50), nullable=False)
+    old_value = db.Column(db.Text)
+    new_value = db.Column(db.Text)
+    user_id = db.Column(db.Integer)
+    username = db.Column(db.String(80))
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # /case/<id>/history pages newest first by seeking on this index
+        db.Index('ix_case_history_case_id_id', 'case_id', 'id'),
+    )
+
+class JobState(db.Model):
+    """
+    Progress and lock lease of a background job (see overdue_worker).
+
+    watermark/cursor let a job resume where its last run stopped;
+    locked_until is the lease used where advisory locks are unavailable.
+    """
+    __tablename__ = 'job_state'
+    name = db.Column(db.String(50), primary_key=True)
+    watermark = db.Column(db.String(100))
+    cursor = db.Column(db.String(200))
+    locked_until = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+class OverdueNotice(db.Model):
+    """
+    A case stage that crossed its deadline, queued for the JPU's next digest.
+
+    The case fields are copied so a digest still reads correctly after the
+    case is edited or deleted.
+    """
+    __tablename__ = 'overdue_notice'
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # deadlines.STAGE_FIELDS key
+    deadline = db.Column(db.Date, nullable=False)
+    jpu = db.Column(db.String(200))
+    nama_tersangka = db.Column(db.String(200))
+    kategori_umur = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # One notice per missed stage deadline, however often the scan runs
+        db.UniqueConstraint('case_id', 'stage', 'deadline', name='uq_overdue_notice_case_stage_deadline'),
+        # Unsent notices grouped per JPU for delivery
+        db.Index('ix_overdue_notice_sent_at_jpu', 'sent_at', 'jpu'),
+    )
+
+class TableVersion(db.Model):
+    """
+    Counter bumped by every commit that writes to a tracked table.
+
+    Reading it is a primary-key lookup, which makes it a cheap validator for
+    HTTP caching (ETag) of data derived from the table.
+    """
+    __tablename__ = 'table_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+def get_table_version(name):
+    """Current version of a tracked table (0 before its first write)"""
+    version = db.session.execute(
+        db.select(TableVersion.version).where(TableVersion.name == name)
+    ).scalar()
+    return version or 0
+
+def mark_case_changed(session):
+    """Flag the session's transaction as writing to the case table"""
+    session.info['case_changed'] = True
+
+def _bump_table_version(session, name):
+    result = session.execute(
+        db.update(TableVersion).where(TableVersion.name == name)
+        .values(version=TableVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        session.add(TableVersion(name=name, version=1))
+        session.flush()
+
+# Track writes to "case" from every path: unit-of-work flushes, ORM bulk
+# UPDATE/INSERT/DELETE and Core statements run through the session.
+@event.listens_for(Session, 'after_flush')
+def _track_case_flush(session, flush_context):
+    if any(isinstance(obj, Case) for obj in chain(session.new, session.dirty, session.deleted)):
+        mark_case_changed(session)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_case_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None and table.name == Case.__tablename__:
+            mark_case_changed(orm_execute_state.session)
+
+@event.listens_for(Session, 'before_commit')
+def _bump_case_version(session):
+    # Pending objects are flushed after this hook; flush now to see them
+    session.flush()
+    if session.info.pop('case_changed', False):
+        _bump_table_version(session, Case.__tablename__)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_case_changes(session, previous_transaction):
+    session.info.pop('case_changed', None)
@@ -0,0 +1,464 @@
+"""
+Offline mode for the desktop app.
+
+The desktop build serves every read and write from a local SQLite (WAL)
+replica of `case` and `user`, so the UI runs at local-disk speed and keeps
+working without a connection. A background thread reconciles the replica
+with the remote database:
+
+- push: local writes are queued in `sync_outbox` in the same transaction
+  as the write itself, then replayed on the remote in order. Updates and
+  deletes carry the row version they were based on and only apply if the
+  remote row still has it (optimistic concurrency). Each applied change
+  bumps the remote table_version and notifies the change feed, like a
+  write made through the web app.
+- pull: remote rows changed since the last pull (by `updated_at`, set on
+  every write made through SQLAlchemy, see models.Case) and remote deletes
+  (`case_tombstone`) are copied into the replica. Users are copied in
+  full; the table is tiny.
+
+Cases created offline get negative ids until they are pushed and receive
+their real id; their queued writes and case_history rows are renumbered in
+the same local transaction. On a conflict the remote row wins; the local change is kept
+in `sync_conflict` so nothing typed offline is silently lost.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from sqlalchemy import (MetaData, Table, Column, Integer, String, Text, DateTime, create_engine,
+                        event, select, insert, update, delete, func, tuple_)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models import Case, CaseHistory, User, CaseTombstone, TableVersion, SERVER_MANAGED_COLUMNS
+import events
+import history
+from db_pool import engine_options
+
+DEFAULT_REPLICA_PATH = os.path.join(os.path.expanduser('~'), '.ekejaksaan', 'replica.db')
+
+# Rows copied per round trip when pulling
+PULL_BATCH_SIZE = 500
+# Re-read this much before the watermark: now() is the transaction start
+# time, so a long transaction can commit rows older than ones already pulled
+PULL_OVERLAP = timedelta(minutes=2)
+# Longest wait between attempts while the remote is unreachable
+MAX_BACKOFF_SECONDS = 300
+
+# Bookkeeping tables that only exist in the local replica
+sync_metadata = MetaData()
+
+sync_outbox = Table(
+    'sync_outbox', sync_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('op', String(10), nullable=False),       # insert | update | delete
+    Column('case_id', Integer, nullable=False, index=True),
+    Column('base_version', Integer),                # remote version the change was made on
+    Column('payload', Text),                        # JSON column values
+    Column('created_at', DateTime, default=datetime.now),
+)
+
+sync_state = Table(
+    'sync_state', sync_metadata,
+    Column('key', String(50), primary_key=True),
+    Column('value', String(100)),
+)
+
+sync_conflict = Table(
+    'sync_conflict', sync_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('case_id', Integer, nullable=False),
+    Column('kind', String(20), nullable=False),     # changed_remotely | deleted_remotely
+    Column('local', Text),                          # JSON of the discarded local change
+    Column('remote', Text),                         # JSON of the remote row that won
+    Column('created_at', DateTime, default=datetime.now),
+)
+
+# Case columns a local change writes to the remote
+_PAYLOAD_COLUMNS = [column for column in Case.__table__.columns
+                    if column.key != 'id' and column.key not in SERVER_MANAGED_COLUMNS]
+
+# Last sync outcome, shown on the dashboard
+status = {'online': None, 'last_sync': None, 'last_error': None}
+
+
+def local_database_url(path=None):
+    """SQLite URL of the replica, creating its directory if needed"""
+    path = path or DEFAULT_REPLICA_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return f"sqlite:///{os.path.abspath(path)}"
+
+
+def enable_wal(engine):
+    """Use WAL on the replica so the sync thread never blocks UI reads"""
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
+
+
+def init_local(engine):
+    """Create the sync bookkeeping tables in the replica"""
+    sync_metadata.create_all(engine)
+
+
+def _encode(values):
+    return json.dumps({key: value.isoformat() if isinstance(value, (date, datetime)) else value
+                       for key, value in values.items()})
+
+
+def _decode(payload):
+    values = {}
+    for key, value in json.loads(payload).items():
+        python_type = Case.__table__.c[key].type.python_type
+        if value is not None and python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif value is not None and python_type is date:
+            value = date.fromisoformat(value)
+        values[key] = value
+    return values
+
+
+# --- Recording local writes (called inside the request's transaction) ---
+
+def next_local_id(session):
+    """
+    Negative id for a case created offline; never collides with remote ids,
+    nor with the history left behind by an unpushed case deleted locally
+    """
+    lowest = min(session.execute(select(func.min(Case.id))).scalar() or 0,
+                 session.execute(select(func.min(CaseHistory.case_id))).scalar() or 0)
+    return min(lowest, 0) - 1
+
+
+def record_insert(session, case):
+    """Queue a newly added (and flushed) case for insertion on the remote"""
+    values = {column.key: getattr(case, column.key) for column in _PAYLOAD_COLUMNS}
+    session.execute(insert(sync_outbox).values(op='insert', case_id=case.id, payload=_encode(values)))
+
+
+def record_update(session, case_id, values, base_version):
+    """
+    Queue changed columns of a case.
+
+    Args:
+        values: {column: new value}, derived columns included
+        base_version: Case.version the change was applied on
+    """
+    values = {key: value for key, value in values.items()
+              if key != 'id' and key not in SERVER_MANAGED_COLUMNS}
+    session.execute(insert(sync_outbox).values(
+        op='update', case_id=case_id, base_version=base_version, payload=_encode(values)
+    ))
+
+
+def record_local_history(session, entries):
+    """
+    Write the case_history entries of cases created offline right away.
+
+    They go out in the caller's transaction instead of through the history
+    writer's queue, so push() always finds them when it renumbers the case.
+
+    Returns:
+        list: The remaining entries, for cases that already have their real id
+    """
+    history.write_entries(session, [entry for entry in entries if entry['case_id'] < 0])
+    return [entry for entry in entries if entry['case_id'] >= 0]
+
+
+def record_delete(session, case_id, base_version):
+    """Queue a delete; a case that never reached the remote is just forgotten"""
+    if case_id < 0:
+        session.execute(delete(sync_outbox).where(sync_outbox.c.case_id == case_id))
+        return
+    session.execute(insert(sync_outbox).values(op='delete', case_id=case_id, base_version=base_version))
+
+
+def sync_summary(session):
+    """Pending change and conflict counts plus the last sync outcome"""
+    return dict(
+        status,
+        pending=session.execute(select(func.count()).select_from(sync_outbox)).scalar(),
+        conflicts=session.execute(select(func.count()).select_from(sync_conflict)).scalar(),
+    )
+
+
+# --- Replica helpers ---
+
+def _get_state(key):
+    return db.session.execute(select(sync_state.c.value).where(sync_state.c.key == key)).scalar()
+
+
+def _set_state(key, value):
+    stmt = sqlite_insert(sync_state).values(key=key, value=value)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['key'], set_={'value': value}))
+
+
+def _upsert_local(table, rows):
+    """Copy remote rows into the replica as-is (versions included)"""
+    if not rows:
+        return
+    stmt = sqlite_insert(table).values(rows)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={column.key: stmt.excluded[column.key] for column in table.columns if column.key != 'id'}
+    ))
+
+
+def _record_conflict(case_id, kind, remote_row):
+    local = [
+        {'op': entry.op, 'base_version': entry.base_version,
+         'values': json.loads(entry.payload) if entry.payload else None}
+        for entry in db.session.execute(
+            select(sync_outbox).where(sync_outbox.c.case_id == case_id).order_by(sync_outbox.c.id)
+        )
+    ]
+    db.session.execute(insert(sync_conflict).values(
+        case_id=case_id,
+        kind=kind,
+        local=json.dumps(local),
+        remote=_encode(dict(remote_row)) if remote_row else None,
+    ))
+    # Later queued changes were built on the discarded state
+    db.session.execute(delete(sync_outbox).where(sync_outbox.c.case_id == case_id))
+
+
+# --- Push ---
+
+def _announce_remote_change(conn, kind, case_id):
+    """
+    What the session hooks do for web writes, on the push's Core connection:
+    bump table_version['case'] (conditional GETs, caches) and, on Postgres,
+    NOTIFY the change feed - both commit with the pushed change.
+    """
+    versions = TableVersion.__table__
+    result = conn.execute(update(versions).where(versions.c.name == Case.__tablename__)
+                          .values(version=versions.c.version + 1))
+    if result.rowcount == 0:
+        conn.execute(insert(versions).values(name=Case.__tablename__, version=1))
+    if conn.dialect.name == 'postgresql':
+        payload = json.dumps(events.change_payload(kind, [case_id]))
+        conn.execute(select(func.pg_notify(events.CHANNEL, payload)))
+
+
+def _push_entry(conn, entry):
+    """
+    Replay one outbox entry on the remote.
+
+    Returns:
+        tuple: ('ok',), ('inserted', new_id) or ('conflict', remote row or None)
+    """
+    cases = Case.__table__
+    if entry.op == 'insert':
+        result = conn.execute(insert(cases).values(**_decode(entry.payload)))
+        new_id = result.inserted_primary_key[0]
+        _announce_remote_change(conn, 'insert', new_id)
+        return ('inserted', new_id)
+
+    guard = (cases.c.id == entry.case_id) & (cases.c.version == entry.base_version)
+    if entry.op == 'update':
+        result = conn.execute(update(cases).where(guard).values(**_decode(entry.payload)))
+    else:
+        result = conn.execute(delete(cases).where(guard))
+        if result.rowcount:
+            conn.execute(insert(CaseTombstone.__table__).values(case_id=entry.case_id))
+    if result.rowcount:
+        _announce_remote_change(conn, entry.op, entry.case_id)
+        return ('ok',)
+
+    remote_row = conn.execute(select(cases).where(cases.c.id == entry.case_id)).mappings().first()
+    if entry.op == 'delete' and remote_row is None:
+        return ('ok',)  # Already deleted remotely
+    return ('conflict', remote_row)
+
+
+def push(remote):
+    """
+    Replay queued local writes on the remote, oldest first.
+
+    Returns:
+        tuple: (entries pushed, conflicts)
+    """
+    pushed = conflicts = 0
+    entry_ids = db.session.scalars(select(sync_outbox.c.id).order_by(sync_outbox.c.id)).all()
+    for entry_id in entry_ids:
+        # An earlier conflict or insert in this run may have dropped/remapped it
+        entry = db.session.execute(select(sync_outbox).where(sync_outbox.c.id == entry_id)).first()
+        if entry is None:
+            continue
+
+        with remote.begin() as conn:
+            outcome = _push_entry(conn, entry)
+
+        if outcome[0] == 'conflict':
+            remote_row = outcome[1]
+            _record_conflict(entry.case_id, 'changed_remotely' if remote_row else 'deleted_remotely', remote_row)
+            if remote_row:
+                _upsert_local(Case.__table__, [dict(remote_row)])
+            else:
+                db.session.execute(delete(Case.__table__).where(Case.id == entry.case_id))
+            conflicts += 1
+        else:
+            if outcome[0] == 'inserted':
+                # Swap the temporary negative id for the real one; keep the
+                # local version equal to the remote's fresh row (1)
+                new_id = outcome[1]
+                db.session.execute(update(Case.__table__).where(Case.id == entry.case_id)
+                                   .values(id=new_id, version=Case.__table__.c.version))
+                db.session.execute(update(sync_outbox).where(sync_outbox.c.case_id == entry.case_id)
+                                   .values(case_id=new_id))
+                db.session.execute(update(CaseHistory.__table__)
+                                   .where(CaseHistory.case_id == entry.case_id)
+                                   .values(case_id=new_id))
+            db.session.execute(delete(sync_outbox).where(sync_outbox.c.id == entry.id))
+            pushed += 1
+        db.session.commit()
+    return pushed, conflicts
+
+
+# --- Pull ---
+
+def _pull_cases(conn, pending):
+    cases = Case.__table__
+    watermark = _get_state('case_watermark')
+    since = datetime.fromisoformat(watermark) - PULL_OVERLAP if watermark else None
+    cursor = None
+    pulled = 0
+
+    while True:
+        stmt = select(cases).order_by(cases.c.updated_at, cases.c.id).limit(PULL_BATCH_SIZE)
+        if cursor:
+            stmt = stmt.where(tuple_(cases.c.updated_at, cases.c.id) > tuple_(*cursor))
+        elif since:
+            stmt = stmt.where(cases.c.updated_at >= since)
+        rows = [dict(row) for row in conn.execute(stmt).mappings()]
+        if not rows:
+            break
+
+        local_versions = dict(db.session.execute(
+            select(Case.id, Case.version).where(Case.id.in_([row['id'] for row in rows]))
+        ).all())
+        # Rows with local changes still queued are settled by the next push
+        changed = [row for row in rows
+                   if row['id'] not in pending and local_versions.get(row['id']) != row['version']]
+        _upsert_local(cases, changed)
+        pulled += len(changed)
+
+        last = rows[-1]
+        cursor = (last['updated_at'], last['id'])
+        if last['updated_at'] is not None:
+            _set_state('case_watermark', last['updated_at'].isoformat())
+        db.session.commit()
+    return pulled
+
+
+def _pull_tombstones(conn, pending):
+    tombstones = CaseTombstone.__table__
+    last_id = int(_get_state('tombstone_id') or 0)
+    removed = 0
+
+    while True:
+        rows = conn.execute(
+            select(tombstones.c.id, tombstones.c.case_id)
+            .where(tombstones.c.id > last_id)
+            .order_by(tombstones.c.id)
+            .limit(PULL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        case_ids = [row.case_id for row in rows]
+        for case_id in set(case_ids) & pending:
+            _record_conflict(case_id, 'deleted_remotely', None)
+        result = db.session.execute(delete(Case.__table__).where(Case.id.in_(case_ids)))
+        removed += result.rowcount
+        last_id = rows[-1].id
+        _set_state('tombstone_id', str(last_id))
+        db.session.commit()
+    return removed
+
+
+def _pull_users(conn):
+    users = [dict(row) for row in conn.execute(select(User.__table__)).mappings()]
+    if not users:
+        return
+    db.session.execute(delete(User.__table__).where(User.id.notin_([u['id'] for u in users])))
+    _upsert_local(User.__table__, users)
+    db.session.commit()
+
+
+def pull(remote):
+    """
+    Copy remote changes into the replica.
+
+    Returns:
+        int: Cases inserted, updated or deleted locally
+    """
+    pending = set(db.session.scalars(select(sync_outbox.c.case_id).distinct()))
+    with remote.connect() as conn:
+        _pull_users(conn)
+        changed = _pull_cases(conn, pending)
+        changed += _pull_tombstones(conn, pending)
+    return changed
+
+
+def sync_once(remote):
+    """
+    One push-then-pull round. Must run inside an app context.
+
+    Returns:
+        int: Number of local rows the round changed (0 if nothing happened)
+    """
+    try:
+        pushed, conflicts = push(remote)
+        pulled = pull(remote)
+    except Exception:
+        db.session.rollback()
+        raise
+    return pushed + conflicts + pulled
+
+
+class SyncWorker(threading.Thread):
+    """
+    Background thread running sync_once every `interval` seconds.
+
+    While the remote is unreachable the wait doubles up to
+    MAX_BACKOFF_SECONDS; `trigger()` runs a round immediately.
+    """
+
+    def __init__(self, app, remote_url, interval=30, on_change=None):
+        super().__init__(name='offline-sync', daemon=True)
+        self.app = app
+        self.remote = create_engine(remote_url, **engine_options(remote_url))
+        self.interval = interval
+        self.on_change = on_change
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self):
+        delay = self.interval
+        while not self._stopped.is_set():
+            with self.app.app_context():
+                try:
+                    changed = sync_once(self.remote)
+                except (SQLAlchemyError, OSError) as e:
+                    # Offline (or the remote is failing): keep serving locally
+                    status.update(online=False, last_error=str(e).splitlines()[0])
+                    delay = min(delay * 2, MAX_BACKOFF_SECONDS)
+                else:
+                    status.update(online=True, last_sync=datetime.now(), last_error=None)
+                    delay = self.interval
+                    if changed and self.on_change:
+                        self.on_change()
+            self._wake.wait(delay)
+            self._wake.clear()
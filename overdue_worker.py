@@ -0,0 +1,401 @@
+"""
+Overdue scanner and daily per-JPU digest.
+
+Every filled stage has its own deadline (see deadlines.stage_deadlines),
+and a stage is overdue the day after it. Once a day the scanner walks, stage
+by stage, the cases whose stage deadline passed since its last run: a stage
+deadline falls in that window only if the stage date does, shifted by the
+stage's limits, so each stage is an index range scan over its date shadow
+column in (date, id) keyset chunks. It queues one OverdueNotice per missed
+(case, stage, deadline). Progress is saved in job_state after every chunk,
+so an interrupted run resumes where it stopped. Unsent notices are then grouped
+per JPU and handed to a sender (file or SMTP); a failed delivery stays
+queued for the next run.
+
+Only one process runs a scan at a time: a transaction-scoped Postgres
+advisory lock (works through Supabase's transaction pooler), or a lease in
+job_state on other databases.
+
+Usage:
+    python overdue_worker.py            # run daily at DIGEST_TIME
+    python overdue_worker.py --once     # single run (cron)
+    python overdue_worker.py --once --since 2024-01-01
+
+Inside the web app, OVERDUE_SCHEDULER=1 starts the same loop in a thread of
+every worker; the lock keeps it to one run per day.
+"""
+import argparse
+import json
+import os
+import re
+import smtplib
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import select, update, func, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from extensions import db
+from models import Case, JobState, OverdueNotice, DATE_SHADOW_COLUMNS
+from deadlines import STAGE_FIELDS, STAGE_LIMITS, STAGE_COMPLETE, stage_deadlines
+
+JOB_NAME = 'overdue_scan'
+# pg_try_advisory_xact_lock key of the scan (any constant unique to this job)
+ADVISORY_LOCK_KEY = 0x0DE1A7ED
+# Lease length where advisory locks are unavailable; longer than any run
+LEASE_SECONDS = 30 * 60
+# Cases read per round trip while scanning
+SCAN_CHUNK_SIZE = 500
+# How often the scheduler checks whether today's digest is due
+POLL_SECONDS = 300
+
+# Human-readable stage names for digests
+STAGE_LABELS = {
+    'spdp': 'SPDP',
+    'berkas_tahap_1': 'Berkas Tahap I',
+    'p18_p19': 'P-18 / P-19',
+    'p21': 'P-21',
+    'tahap_2': 'Tahap II',
+}
+
+
+class Digest:
+    """Overdue cases of one JPU, as handed to a sender"""
+
+    def __init__(self, jpu, day, notices):
+        self.jpu = jpu
+        self.day = day
+        self.notices = notices
+
+    @property
+    def subject(self):
+        return f"[E-Kejaksaan] {len(self.notices)} perkara terlambat - {self.jpu or 'Tanpa JPU'} - {self.day:%d-%m-%Y}"
+
+    def body(self):
+        lines = [f"JPU: {self.jpu or '-'}", f"Tanggal: {self.day:%d-%m-%Y}", '']
+        for notice in self.notices:
+            stage = STAGE_LABELS.get(notice.stage) or notice.stage or '-'
+            late = (self.day - notice.deadline).days
+            lines.append(
+                f"- {notice.nama_tersangka or '-'} (#{notice.case_id}, {notice.kategori_umur or 'Dewasa'}): "
+                f"tahap {stage}, batas {notice.deadline:%d-%m-%Y}, terlambat {late} hari"
+            )
+        return '\n'.join(lines) + '\n'
+
+
+class FileSender:
+    """Write each digest to a text file (local stand-in for e-mail)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, digest):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', digest.jpu or 'tanpa_jpu').strip('_').lower() or 'jpu'
+        path = os.path.join(self.directory, f"digest_{digest.day:%Y%m%d}_{slug}.txt")
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(digest.subject + '\n\n' + digest.body() + '\n')
+        return path
+
+
+class SmtpSender:
+    """
+    E-mail each digest.
+
+    Args:
+        recipients: {jpu: address}; JPUs without an entry go to default_to
+    """
+
+    def __init__(self, host, port, sender, default_to, recipients=None, username=None, password=None):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.default_to = default_to
+        self.recipients = recipients or {}
+        self.username = username
+        self.password = password
+
+    def send(self, digest):
+        to = self.recipients.get(digest.jpu, self.default_to)
+        message = EmailMessage()
+        message['Subject'] = digest.subject
+        message['From'] = self.sender
+        message['To'] = to
+        message.set_content(digest.body())
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.username:
+                smtp.starttls()
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+        return to
+
+
+def make_sender(environ=os.environ):
+    """Sender selected by DIGEST_SENDER ('file', the default, or 'smtp')"""
+    kind = environ.get('DIGEST_SENDER', 'file').lower()
+    if kind == 'smtp':
+        return SmtpSender(
+            host=environ.get('SMTP_HOST', 'localhost'),
+            port=int(environ.get('SMTP_PORT', '587')),
+            sender=environ.get('DIGEST_FROM', 'noreply@localhost'),
+            default_to=environ.get('DIGEST_TO', ''),
+            recipients=json.loads(environ.get('JPU_EMAILS', '{}')),
+            username=environ.get('SMTP_USER'),
+            password=environ.get('SMTP_PASSWORD'),
+        )
+    if kind == 'file':
+        return FileSender(environ.get('DIGEST_DIR', 'digests'))
+    raise ValueError(f"DIGEST_SENDER must be 'file' or 'smtp', got {kind!r}")
+
+
+# --- Locking ---
+
+def _job_state(session, name):
+    state = session.get(JobState, name)
+    if state is None:
+        try:
+            state = JobState(name=name)
+            session.add(state)
+            session.commit()
+        except IntegrityError:
+            # Another process created it first
+            session.rollback()
+            state = session.get(JobState, name)
+    return state
+
+
+@contextmanager
+def job_lock(session, name=JOB_NAME, lease_seconds=LEASE_SECONDS):
+    """
+    Hold the job's lock for the duration of the block.
+
+    Yields:
+        bool: True if this process holds the lock, False if another does
+    """
+    engine = session.get_bind()
+    if engine.dialect.name == 'postgresql':
+        # Transaction-scoped, on a connection of its own kept open for the
+        # run: released on rollback even if the process dies
+        with engine.connect() as conn:
+            with conn.begin():
+                yield bool(conn.execute(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))).scalar())
+        return
+
+    _job_state(session, name)
+    now = datetime.now()
+    acquired = session.execute(
+        update(JobState)
+        .where(JobState.name == name)
+        .where((JobState.locked_until.is_(None)) | (JobState.locked_until < now))
+        .values(locked_until=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    session.commit()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            session.rollback()
+            session.execute(update(JobState).where(JobState.name == name).values(locked_until=None)
+                            .execution_options(synchronize_session=False))
+            session.commit()
+
+
+# --- Scan and delivery ---
+
+def _stage_windows():
+    """
+    {stage: (shortest, longest) offset from a stage date to its deadline}
+    over the age categories, for every stage with a limit
+    """
+    windows = {}
+    for stage in STAGE_FIELDS:
+        offsets = [timedelta(days=limits[stage] - 1) for limits in STAGE_LIMITS.values() if limits.get(stage)]
+        if offsets:
+            windows[stage] = (min(offsets), max(offsets))
+    return windows
+
+
+def scan_overdue(session, today, since=None, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Queue a notice for every stage deadline that passed since the last scan.
+
+    Args:
+        today: Stage deadlines before today are overdue
+        since: Re-scan deadlines from this date instead of the watermark
+
+    Returns:
+        int: Notices created
+    """
+    state = _job_state(session, JOB_NAME)
+    if since is not None:
+        start, cursor = since, None
+    else:
+        # watermark: every deadline before it has been scanned
+        start = date.fromisoformat(state.watermark) if state.watermark else today - timedelta(days=1)
+        cursor = json.loads(state.cursor) if state.cursor else None
+
+    windows = _stage_windows()
+    stages = list(windows)
+    if cursor:
+        # Stages before the cursor's were finished before the interruption
+        stages = stages[stages.index(cursor[0]):] if cursor[0] in windows else stages
+
+    stage_columns = [getattr(Case, field) for field in STAGE_FIELDS.values()]
+    created = 0
+    for stage in stages:
+        shortest, longest = windows[stage]
+        shadow = getattr(Case, DATE_SHADOW_COLUMNS[STAGE_FIELDS[stage]])
+        # deadline = stage date + offset, so start <= deadline < today
+        # bounds the stage date for every age category
+        low = datetime.combine(start - longest, datetime.min.time())
+        high = datetime.combine(today - shortest, datetime.min.time())
+        while True:
+            stmt = (
+                select(Case.id, shadow.label('stage_date'), Case.jpu, Case.nama_tersangka,
+                       Case.kategori_umur, Case.current_stage, *stage_columns)
+                .where(shadow >= low, shadow < high)
+                .order_by(shadow, Case.id)
+                .limit(chunk_size)
+            )
+            if cursor and cursor[0] == stage:
+                stmt = stmt.where(tuple_(shadow, Case.id) > tuple_(datetime.fromisoformat(cursor[1]), cursor[2]))
+            rows = session.execute(stmt).all()
+            if not rows:
+                break
+
+            known = set(session.execute(
+                select(OverdueNotice.case_id, OverdueNotice.deadline)
+                .where(OverdueNotice.stage == stage, OverdueNotice.case_id.in_([row.id for row in rows]))
+            ).all())
+            for row in rows:
+                # Complete cases show no overdue stage
+                if row.current_stage == STAGE_COMPLETE:
+                    continue
+                deadline = dict(stage_deadlines(row)).get(stage)
+                if deadline is None or not start <= deadline < today or (row.id, deadline) in known:
+                    continue
+                session.add(OverdueNotice(
+                    case_id=row.id,
+                    stage=stage,
+                    deadline=deadline,
+                    jpu=row.jpu,
+                    nama_tersangka=row.nama_tersangka,
+                    kategori_umur=row.kategori_umur,
+                ))
+                created += 1
+
+            last = rows[-1]
+            cursor = [stage, last.stage_date.isoformat(), last.id]
+            # Notices and progress commit together: a crash loses nothing
+            state.cursor = json.dumps(cursor)
+            session.commit()
+
+    if since is None or not state.watermark or date.fromisoformat(state.watermark) < today:
+        state.watermark = today.isoformat()
+    state.cursor = None
+    session.commit()
+    return created
+
+
+def deliver_digests(session, sender, today):
+    """
+    Send one digest per JPU with unsent notices.
+
+    Returns:
+        tuple: (digests sent, digests failed)
+    """
+    jpus = session.scalars(select(OverdueNotice.jpu).where(OverdueNotice.sent_at.is_(None)).distinct()).all()
+    sent = failed = 0
+    for jpu in jpus:
+        notices = session.scalars(
+            select(OverdueNotice)
+            .where(OverdueNotice.sent_at.is_(None), OverdueNotice.jpu.is_(None) if jpu is None else OverdueNotice.jpu == jpu)
+            .order_by(OverdueNotice.deadline, OverdueNotice.case_id, OverdueNotice.stage)
+        ).all()
+        try:
+            sender.send(Digest(jpu, today, notices))
+        except (OSError, smtplib.SMTPException) as e:
+            print(f"Digest for JPU {jpu!r} failed, kept for the next run: {e}")
+            failed += 1
+            continue
+        now = datetime.now()
+        for notice in notices:
+            notice.sent_at = now
+        session.commit()
+        sent += 1
+    return sent, failed
+
+
+def run_once(session, sender, today=None, since=None):
+    """
+    Scan and deliver under the job lock.
+
+    Returns:
+        dict | None: {'notices', 'sent', 'failed'} or None if another
+        process holds the lock
+    """
+    today = today or date.today()
+    with job_lock(session) as acquired:
+        if not acquired:
+            return None
+        notices = scan_overdue(session, today, since=since)
+        sent, failed = deliver_digests(session, sender, today)
+        return {'notices': notices, 'sent': sent, 'failed': failed}
+
+
+def digest_due(session, now):
+    """True once today's DIGEST_TIME has passed and today has not been scanned"""
+    hour, minute = (int(part) for part in os.environ.get('DIGEST_TIME', '07:00').split(':'))
+    if (now.hour, now.minute) < (hour, minute):
+        return False
+    watermark = session.execute(select(JobState.watermark).where(JobState.name == JOB_NAME)).scalar()
+    return watermark is None or date.fromisoformat(watermark) < now.date()
+
+
+def scheduler_loop(app, sender, stop=None, poll_seconds=POLL_SECONDS):
+    """Run the daily scan whenever it is due, until `stop` is set"""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                if digest_due(db.session, datetime.now()):
+                    result = run_once(db.session, sender)
+                    if result:
+                        print(f"Overdue scan: {result}")
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                print(f"Overdue scan error: {e}")
+        stop.wait(poll_seconds)
+
+
+def start_scheduler(app, sender=None):
+    """Run scheduler_loop in a daemon thread of this process"""
+    thread = threading.Thread(
+        target=scheduler_loop,
+        args=(app, sender or make_sender()),
+        name='overdue-scheduler',
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scan for newly overdue cases and send per-JPU digests')
+    parser.add_argument('--once', action='store_true', help='run one scan and exit')
+    parser.add_argument('--since', type=date.fromisoformat, help='re-scan deadlines from this date (YYYY-MM-DD)')
+    args = parser.parse_args(argv)
+
+    from app import app
+    sender = make_sender()
+    if not args.once:
+        scheduler_loop(app, sender)
+        return
+    with app.app_context():
+        result = run_once(db.session, sender, since=args.since)
+        print('Another worker holds the lock, skipped' if result is None else f"Overdue scan: {result}")
+
+
+if __name__ == '__main__':
+    main()
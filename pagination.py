@@ -0,0 +1,161 @@
+"""
+Keyset (seek) pagination helpers.
+
+OFFSET pagination makes the database walk past every skipped row, so page 500
+costs far more than page 1. Keyset pagination remembers the sort key of the
+last row shown and asks for the rows that come after it, which an index on the
+sort columns answers directly regardless of how deep the page is.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_, tuple_
+
+
+def encode_cursor(values):
+    """Encode a list of sort-key values into an opaque, URL-safe token"""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """
+    Decode a cursor token back into typed values for the given columns.
+
+    Returns:
+        list | None: The sort-key values, or None if the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            return None
+
+        values = []
+        for column, value in zip(columns, payload):
+            if value is None:
+                return None
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            else:
+                value = python_type(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        return None
+
+
+def cursor_for(item, order_by):
+    """Build the cursor token pointing at `item` for the given ordering"""
+    return encode_cursor([getattr(item, column.key) for column, _ in order_by])
+
+
+def order_clauses(order_by, reverse=False):
+    """ORDER BY clauses for an ordering, optionally reversed"""
+    return [
+        column.desc() if descending != reverse else column.asc()
+        for column, descending in order_by
+    ]
+
+
+def _seek_condition(order_by, values, backwards):
+    """WHERE clause selecting rows strictly after (or before) the cursor row"""
+    def goes_lower(descending):
+        # Moving forward through a DESC column means smaller values
+        return descending != backwards
+
+    directions = {goes_lower(descending) for _, descending in order_by}
+    columns = [column for column, _ in order_by]
+
+    if len(directions) == 1:
+        # Uniform direction: a single row-value comparison the index can seek on
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*values)
+        return tuple_(*columns) > tuple_(*values)
+
+    # Mixed directions: expand into (a < x) OR (a = x AND b > y) OR ...
+    clauses = []
+    for i, (column, descending) in enumerate(order_by):
+        equal_prefix = [order_by[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if goes_lower(descending) else column > values[i]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+class KeysetPagination:
+    """
+    Result of a keyset query.
+
+    Exposes the same `items`/`per_page`/`has_prev`/`has_next` attributes as
+    Flask-SQLAlchemy's Pagination, plus cursors for the neighbouring pages.
+    There is no page number or total: neither is needed to fetch the next page.
+    """
+    def __init__(self, items, per_page, has_prev, has_next, prev_cursor, next_cursor, start):
+        self.items = items
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
+        self.start = start
+
+
+def keyset_paginate(query, order_by, per_page, after=None, before=None, start=1):
+    """
+    Fetch one page of `query` using keyset pagination.
+
+    Args:
+        query: Unordered query to paginate (filters already applied)
+        order_by: List of (column, descending) pairs. The columns must be
+            non-nullable and the last one unique (normally the primary key).
+        per_page: Number of rows per page
+        after: Cursor of the last row of the previous page (go forward)
+        before: Cursor of the first row of the next page (go backward)
+        start: 1-based position of the first row, used only for row numbering
+
+    Returns:
+        KeysetPagination
+    """
+    columns = [column for column, _ in order_by]
+    token = after or before
+    values = decode_cursor(token, columns) if token else None
+    backwards = bool(before) and not after and values is not None
+    start = max(start, 1)
+
+    if values is not None:
+        seek_query = query.filter(_seek_condition(order_by, values, backwards))
+    else:
+        seek_query = query
+
+    rows = seek_query.order_by(*order_clauses(order_by, reverse=backwards)).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        if not has_more:
+            # Walked back to the beginning: serve a regular first page so it
+            # always holds a full `per_page` rows and numbering restarts at 1.
+            return keyset_paginate(query, order_by, per_page)
+        rows.reverse()
+        has_prev, has_next = True, True
+        start = max(start, per_page + 1)
+    else:
+        has_prev, has_next = values is not None, has_more
+        if values is None:
+            start = 1
+
+    return KeysetPagination(
+        items=rows,
+        per_page=per_page,
+        has_prev=has_prev,
+        has_next=has_next,
+        prev_cursor=cursor_for(rows[0], order_by) if rows and has_prev else None,
+        next_cursor=cursor_for(rows[-1], order_by) if rows and has_next else None,
+        start=start,
+    )
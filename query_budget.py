@@ -0,0 +1,50 @@
+"""
+SQL statement budgets for tests.
+
+    with query_budget(3, 'dashboard'):
+        client.get('/dashboard')
+
+fails with QueryBudgetExceeded, listing every statement the block ran,
+when it ran more than allowed - so an N+1 (say, a lazy relationship read
+in dashboard.html) breaks the test that exercises the page. Counting uses
+metrics.StatementLog: only this thread's statements are charged, so work
+handed to a background thread (the history writer) is not.
+"""
+from contextlib import contextmanager
+from metrics import StatementLog
+
+# Characters of each statement shown in a failure message
+STATEMENT_PREVIEW = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More SQL statements than the budget allows"""
+
+
+def format_statements(statements):
+    lines = []
+    for number, (endpoint, statement) in enumerate(statements, 1):
+        sql = ' '.join(statement.split())
+        if len(sql) > STATEMENT_PREVIEW:
+            sql = sql[:STATEMENT_PREVIEW] + '...'
+        lines.append(f"  {number}. [{endpoint}] {sql}")
+    return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(limit, label='block'):
+    """
+    Fail if the block executes more than `limit` SQL statements.
+
+    Args:
+        limit: Statements allowed
+        label: Named in the failure message
+
+    Yields:
+        StatementLog: The statements run so far
+    """
+    with StatementLog() as log:
+        yield log
+    if len(log) > limit:
+        raise QueryBudgetExceeded(
+            f"{label}: {len(log)} SQL statements, budget {limit}\n{format_statements(log.statements)}")
@@ -0,0 +1,31 @@
+"""
+Script untuk membuat tabel case_history (riwayat perubahan sel dashboard)
+
+Tabel ini hanya ditambah (append-only) oleh history.py; indeks
+(case_id, id) dipakai halaman /case/<id>/history.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from models import CaseHistory
+
+def add_case_history():
+    """Create case_history and its index if they do not exist yet"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            if inspector.has_table(CaseHistory.__tablename__):
+                print(f"✓ Table '{CaseHistory.__tablename__}' already exists")
+            else:
+                CaseHistory.__table__.create(db.engine)
+                print(f"✓ Created table '{CaseHistory.__tablename__}'")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+
+if __name__ == '__main__':
+    add_case_history()
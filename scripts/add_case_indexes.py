@@ -0,0 +1,51 @@
+"""
+Script untuk membuat index yang dideklarasikan di model Case
+
+Index dibuat hanya jika belum ada. Di PostgreSQL index dibuat dengan
+CREATE INDEX CONCURRENTLY sehingga tabel tetap bisa dibaca/ditulis selama
+proses berjalan (aman dijalankan di production).
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.schema import CreateIndex
+from app import app, db
+from models import Case
+
+def add_case_indexes():
+    """Create any index declared on Case that the database does not have yet"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            existing = {index['name'] for index in inspector.get_indexes('case')}
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            created = 0
+            for index in sorted(Case.__table__.indexes, key=lambda i: i.name):
+                if index.name in existing:
+                    print(f"✓ Index '{index.name}' already exists")
+                    continue
+
+                ddl = str(CreateIndex(index).compile(dialect=db.engine.dialect))
+                if is_postgres:
+                    # CONCURRENTLY cannot run inside a transaction block
+                    ddl = ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)
+                    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                        conn.execute(db.text(ddl))
+                else:
+                    with db.engine.begin() as conn:
+                        conn.execute(db.text(ddl))
+
+                print(f"✓ Created index '{index.name}'")
+                created += 1
+
+            print(f"✓ Done, {created} index(es) created")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+
+if __name__ == '__main__':
+    add_case_indexes()
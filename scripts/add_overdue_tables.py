@@ -0,0 +1,65 @@
+"""
+Script untuk membuat tabel job_state dan overdue_notice (overdue_worker.py)
+
+job_state menyimpan watermark/lease pemindaian, overdue_notice menampung
+perkara terlambat yang belum dikirim dalam ringkasan harian per JPU.
+Tabel overdue_notice versi lama (satu notifikasi per perkara, tanpa kolom
+stage) diubah ke satu notifikasi per tahap.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from models import JobState, OverdueNotice
+
+# Columns copied when an old overdue_notice is rebuilt (SQLite)
+NOTICE_COLUMNS = 'id, case_id, {stage}, deadline, jpu, nama_tersangka, kategori_umur, created_at, sent_at'
+
+def migrate_notice_stage():
+    """Give an overdue_notice created before per-stage notices its stage column"""
+    columns = {col['name'] for col in db.inspect(db.engine).get_columns('overdue_notice')}
+    if 'stage' in columns:
+        print("✓ Column 'stage' already exists")
+        return
+    # The old notices were labelled with the case's current stage
+    with db.engine.begin() as conn:
+        if db.engine.dialect.name == 'postgresql':
+            conn.execute(db.text('ALTER TABLE overdue_notice RENAME COLUMN current_stage TO stage'))
+            conn.execute(db.text("UPDATE overdue_notice SET stage = '' WHERE stage IS NULL"))
+            conn.execute(db.text('ALTER TABLE overdue_notice ALTER COLUMN stage SET NOT NULL'))
+            conn.execute(db.text('ALTER TABLE overdue_notice DROP CONSTRAINT uq_overdue_notice_case_deadline'))
+            conn.execute(db.text('ALTER TABLE overdue_notice ADD CONSTRAINT uq_overdue_notice_case_stage_deadline '
+                                 'UNIQUE (case_id, stage, deadline)'))
+        else:
+            # SQLite cannot drop a constraint: rebuild the table
+            conn.execute(db.text('DROP INDEX IF EXISTS ix_overdue_notice_sent_at_jpu'))
+            conn.execute(db.text('ALTER TABLE overdue_notice RENAME TO overdue_notice_old'))
+            OverdueNotice.__table__.create(conn)
+            target = NOTICE_COLUMNS.format(stage='stage')
+            source = NOTICE_COLUMNS.format(stage="COALESCE(current_stage, '')")
+            conn.execute(db.text(f'INSERT INTO overdue_notice ({target}) SELECT {source} FROM overdue_notice_old'))
+            conn.execute(db.text('DROP TABLE overdue_notice_old'))
+    print("✓ Added column 'stage' to 'overdue_notice'")
+
+def add_overdue_tables():
+    """Create job_state and overdue_notice if they do not exist yet"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            for model in (JobState, OverdueNotice):
+                if inspector.has_table(model.__tablename__):
+                    print(f"✓ Table '{model.__tablename__}' already exists")
+                    if model is OverdueNotice:
+                        migrate_notice_stage()
+                else:
+                    model.__table__.create(db.engine)
+                    print(f"✓ Created table '{model.__tablename__}'")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+
+if __name__ == '__main__':
+    add_overdue_tables()
@@ -0,0 +1,33 @@
+"""
+Script untuk membuat index pencarian teks (parameter ?q= di dashboard)
+
+- PostgreSQL: ekstensi pg_trgm, kolom search_vector (tsvector, generated)
+  dan dua index GIN (dibuat CONCURRENTLY)
+- SQLite: tabel FTS5 case_fts beserta trigger sinkronisasinya
+
+Aman dijalankan berulang kali. Di PostgreSQL penambahan kolom search_vector
+menulis ulang tabel case satu kali; jalankan di luar jam kerja.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from search import install_search, search_backend
+
+def add_search_index():
+    """Create the full-text search structures for the configured database"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                install_search(conn)
+                conn.commit()
+            print(f"✓ Search backend: {search_backend(db.session)}")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+
+if __name__ == '__main__':
+    add_search_index()
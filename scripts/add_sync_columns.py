@@ -0,0 +1,60 @@
+"""
+Script untuk menyiapkan database pusat bagi sinkronisasi mode offline (desktop)
+
+- Menambahkan kolom version dan updated_at ke tabel case
+- Mengisi updated_at untuk data lama dari created_at
+- Membuat tabel case_tombstone (id perkara yang dihapus)
+- Membuat index ix_case_updated_at_id
+
+Aman dijalankan berulang kali.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from models import CaseTombstone
+from scripts.add_case_indexes import add_case_indexes
+
+def add_sync_columns():
+    """Add version/updated_at to case and create case_tombstone"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            columns = [col['name'] for col in inspector.get_columns('case')]
+            is_postgres = db.engine.dialect.name == 'postgresql'
+
+            with db.engine.begin() as conn:
+                if 'version' in columns:
+                    print("✓ Column 'version' already exists")
+                else:
+                    conn.execute(db.text('ALTER TABLE "case" ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+                    print("✓ Successfully added 'version' column")
+
+                if 'updated_at' in columns:
+                    print("✓ Column 'updated_at' already exists")
+                else:
+                    # SQLite only accepts constant defaults in ADD COLUMN
+                    default = ' DEFAULT now()' if is_postgres else ''
+                    conn.execute(db.text(f'ALTER TABLE "case" ADD COLUMN updated_at TIMESTAMP{default}'))
+                    result = conn.execute(db.text(
+                        'UPDATE "case" SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)'
+                    ))
+                    print(f"✓ Successfully added 'updated_at' column ({result.rowcount} rows backfilled)")
+
+            if inspector.has_table(CaseTombstone.__tablename__):
+                print(f"✓ Table '{CaseTombstone.__tablename__}' already exists")
+            else:
+                CaseTombstone.__table__.create(db.engine)
+                print(f"✓ Created table '{CaseTombstone.__tablename__}'")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            return
+
+    add_case_indexes()
+
+if __name__ == '__main__':
+    add_sync_columns()
@@ -0,0 +1,37 @@
+"""
+Script untuk membuat tabel table_version (dipakai ETag /api/cases)
+
+Jalankan sekali sebelum deploy fitur ini: setelah model dimuat, setiap commit
+yang menulis ke tabel case juga menaikkan versi di tabel ini.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, db
+from models import Case, TableVersion
+
+def add_table_version():
+    """Create table_version and seed the row for the case table"""
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            if inspector.has_table(TableVersion.__tablename__):
+                print(f"✓ Table '{TableVersion.__tablename__}' already exists")
+            else:
+                TableVersion.__table__.create(db.engine)
+                print(f"✓ Created table '{TableVersion.__tablename__}'")
+
+            if db.session.get(TableVersion, Case.__tablename__) is None:
+                db.session.add(TableVersion(name=Case.__tablename__, version=1))
+                db.session.commit()
+                print(f"✓ Seeded version for '{Case.__tablename__}'")
+
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            db.session.rollback()
+
+if __name__ == '__main__':
+    add_table_version()
@@ -0,0 +1,131 @@
+"""
+Script untuk menambahkan kolom tanggal bertipe (DateTime) di tabel Case
+dan mengisinya dari kolom String yang sudah ada.
+
+Kolom dibuat jika belum ada, lalu data diproses per batch (keyset berdasarkan
+id) dengan commit di setiap batch, sehingga aplikasi tetap bisa dipakai selama
+backfill berjalan. Nilai yang tidak bisa di-parse dilaporkan di akhir.
+
+Usage:
+    python scripts/backfill_date_columns.py [--batch-size 1000] [--report unparsable.csv]
+"""
+import sys
+import os
+import csv
+import time
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, update
+from app import app, db
+from models import Case, DATE_SHADOW_COLUMNS
+from deadlines import parse_date
+
+def add_date_columns():
+    """Add any missing shadow column to the case table"""
+    inspector = db.inspect(db.engine)
+    columns = {col['name'] for col in inspector.get_columns('case')}
+
+    for shadow in DATE_SHADOW_COLUMNS.values():
+        if shadow in columns:
+            print(f"✓ Column '{shadow}' already exists")
+            continue
+        column_type = Case.__table__.c[shadow].type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as conn:
+            conn.execute(db.text(f'ALTER TABLE "case" ADD COLUMN {shadow} {column_type}'))
+        print(f"✓ Added column '{shadow}'")
+
+def backfill_date_columns(batch_size=1000):
+    """
+    Parse every String stage date into its shadow column.
+
+    Returns:
+        list: (case id, column, value) for every non-empty value that could
+        not be parsed
+    """
+    sources = [getattr(Case, name) for name in DATE_SHADOW_COLUMNS]
+    shadows = [getattr(Case, name) for name in DATE_SHADOW_COLUMNS.values()]
+    unparsable = []
+    last_id = 0
+    scanned = updated = 0
+    started = time.monotonic()
+
+    while True:
+        stmt = (
+            select(Case.id, *sources, *shadows)
+            .where(Case.id > last_id)
+            .order_by(Case.id)
+            .limit(batch_size)
+            .execution_options(yield_per=batch_size)
+        )
+        changes = []
+        batch_rows = 0
+        for row in db.session.execute(stmt):
+            batch_rows += 1
+            last_id = row.id
+            change = {}
+            for source, shadow in DATE_SHADOW_COLUMNS.items():
+                value = getattr(row, source)
+                parsed = parse_date(value)
+                if value and value.strip() and parsed is None:
+                    unparsable.append((row.id, source, value))
+                if getattr(row, shadow) != parsed:
+                    change[shadow] = parsed
+            if change:
+                change['id'] = row.id
+                changes.append(change)
+
+        if not batch_rows:
+            break
+
+        if changes:
+            # ORM bulk UPDATE by primary key: one executemany per batch
+            db.session.execute(update(Case), changes)
+        db.session.commit()
+
+        scanned += batch_rows
+        updated += len(changes)
+        rate = scanned / max(time.monotonic() - started, 1e-6)
+        print(f"  ... {scanned} baris diproses, {updated} diperbarui (id <= {last_id}, {rate:.0f} baris/detik)")
+
+    print(f"✓ Backfill selesai: {scanned} baris diproses, {updated} diperbarui")
+    return unparsable
+
+def write_report(unparsable, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['case_id', 'column', 'value'])
+        writer.writerows(unparsable)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--batch-size', type=int, default=1000)
+    arg_parser.add_argument('--report', help='Tulis nilai yang tidak bisa di-parse ke file CSV ini')
+    args = arg_parser.parse_args()
+
+    with app.app_context():
+        try:
+            add_date_columns()
+            unparsable = backfill_date_columns(args.batch_size)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            db.session.rollback()
+            return 1
+
+    if unparsable:
+        print(f"⚠️  {len(unparsable)} nilai tidak bisa di-parse (kolom tanggal dibiarkan kosong):")
+        for case_id, column, value in unparsable[:20]:
+            print(f"   - id={case_id} {column}: {value!r}")
+        if len(unparsable) > 20:
+            print(f"   ... dan {len(unparsable) - 20} lainnya")
+        if args.report:
+            write_report(unparsable, args.report)
+            print(f"✓ Laporan lengkap ditulis ke {args.report}")
+    else:
+        print("✓ Semua nilai tanggal berhasil di-parse")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
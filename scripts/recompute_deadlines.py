@@ -0,0 +1,99 @@
+"""
+Script untuk menghitung ulang kolom current_stage, next_deadline dan first_deadline di tabel Case
+
+Jalankan setelah deploy pertama fitur ini (kolom dan index dibuat jika belum
+ada) dan setiap kali batas waktu di deadlines.STAGE_LIMITS diubah. Data
+diproses per batch dengan commit di setiap batch.
+
+Usage:
+    python scripts/recompute_deadlines.py [--batch-size 1000]
+"""
+import sys
+import os
+import time
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, update
+from app import app, db, invalidate_case_caches
+from models import Case
+from deadlines import STAGE_FIELDS, compute_deadline
+from add_case_indexes import add_case_indexes
+
+DEADLINE_COLUMNS = ('current_stage', 'next_deadline', 'first_deadline')
+
+def add_deadline_columns():
+    """Add the DEADLINE_COLUMNS to the case table if missing"""
+    inspector = db.inspect(db.engine)
+    columns = {col['name'] for col in inspector.get_columns('case')}
+
+    for name in DEADLINE_COLUMNS:
+        if name in columns:
+            print(f"✓ Column '{name}' already exists")
+            continue
+        column_type = Case.__table__.c[name].type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as conn:
+            conn.execute(db.text(f'ALTER TABLE "case" ADD COLUMN {name} {column_type}'))
+        print(f"✓ Added column '{name}'")
+
+def recompute_deadlines(batch_size=1000):
+    """Recompute the deadline columns of every case, writing only changed rows"""
+    stage_columns = [getattr(Case, field) for field in STAGE_FIELDS.values()]
+    last_id = 0
+    scanned = updated = 0
+    started = time.monotonic()
+
+    while True:
+        stmt = (
+            select(Case.id, Case.kategori_umur, *(getattr(Case, name) for name in DEADLINE_COLUMNS), *stage_columns)
+            .where(Case.id > last_id)
+            .order_by(Case.id)
+            .limit(batch_size)
+            .execution_options(yield_per=batch_size)
+        )
+        changes = []
+        batch_rows = 0
+        for row in db.session.execute(stmt):
+            batch_rows += 1
+            last_id = row.id
+            values = dict(zip(DEADLINE_COLUMNS, compute_deadline(row)))
+            if any(values[name] != getattr(row, name) for name in DEADLINE_COLUMNS):
+                changes.append({'id': row.id, **values})
+
+        if not batch_rows:
+            break
+
+        if changes:
+            db.session.execute(update(Case), changes)
+        db.session.commit()
+
+        scanned += batch_rows
+        updated += len(changes)
+        rate = scanned / max(time.monotonic() - started, 1e-6)
+        print(f"  ... {scanned} baris diproses, {updated} diperbarui ({rate:.0f} baris/detik)")
+
+    invalidate_case_caches()
+    print(f"✓ Selesai: {scanned} baris diproses, {updated} diperbarui")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--batch-size', type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    with app.app_context():
+        try:
+            add_deadline_columns()
+            recompute_deadlines(args.batch_size)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            db.session.rollback()
+            return 1
+
+    # Build the indexes after the backfill, it is cheaper than maintaining them row by row
+    add_case_indexes()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
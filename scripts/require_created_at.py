@@ -0,0 +1,54 @@
+"""
+Script untuk mengisi created_at yang kosong di tabel Case dan menjadikannya NOT NULL
+
+Dashboard dan /api/cases memakai (created_at, id) sebagai kunci kursor;
+baris tanpa created_at tidak bisa dijadikan kursor sehingga halaman
+berikutnya kembali ke halaman 1. Data lama tanpa created_at diisi dengan
+LEGACY_CREATED_AT (tampil paling akhir di urutan terbaru dulu).
+
+Di PostgreSQL kolom lalu diubah menjadi NOT NULL. SQLite tidak bisa
+mengubah constraint kolom; database baru sudah dibuat NOT NULL oleh model.
+
+Aman dijalankan berulang kali.
+"""
+import sys
+import os
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import update
+from app import app, db
+from models import Case
+
+# Stand-in creation time of rows that never had one
+LEGACY_CREATED_AT = datetime(1970, 1, 1)
+
+def backfill_created_at(conn):
+    """
+    Give every case without created_at the LEGACY_CREATED_AT.
+
+    Returns:
+        int: Rows backfilled
+    """
+    return conn.execute(
+        update(Case.__table__)
+        .where(Case.__table__.c.created_at.is_(None))
+        .values(created_at=LEGACY_CREATED_AT)
+    ).rowcount
+
+def require_created_at():
+    """Backfill created_at, then make it NOT NULL where the database allows"""
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                print(f"✓ {backfill_created_at(conn)} rows backfilled")
+                if db.engine.dialect.name == 'postgresql':
+                    conn.execute(db.text('ALTER TABLE "case" ALTER COLUMN created_at SET NOT NULL'))
+                    print("✓ Column 'created_at' is NOT NULL")
+        except Exception as e:
+            print(f"✗ Error: {e}")
+
+if __name__ == '__main__':
+    require_created_at()
@@ -0,0 +1,202 @@
+"""
+Full-text search over the case register (dashboard ?q=).
+
+Two indexed backends answer the same query:
+
+- PostgreSQL: a stored, generated `search_vector` tsvector column with a GIN
+  index (ranked with ts_rank_cd), plus a pg_trgm GIN index on the same text
+  so infix fragments ("udi" in "Budi", parts of SPDP numbers) still match.
+- SQLite (desktop replica, tests): an FTS5 table kept in sync by triggers,
+  ranked with bm25.
+
+Both are created by `install_search()` (scripts/add_search_index.py on
+Postgres, init_db on SQLite). Until they exist, searches fall back to an
+unranked ILIKE scan so the feature degrades instead of failing.
+
+The 'simple' text configuration is used on purpose: the register mixes
+Indonesian names, article numbers and document numbers, none of which
+benefit from (English) stemming.
+"""
+import re
+from sqlalchemy import (MetaData, Table, Column, Integer, Float, and_, or_, func, literal_column,
+                        select, text)
+from models import Case
+
+# Columns searched by ?q=
+SEARCH_FIELDS = ('nama_tersangka', 'pasal', 'jpu', 'keterangan', 'spdp_ket_terima', 'spdp_ket_polisi')
+
+# Longer queries are truncated; every term is one index probe
+MAX_SEARCH_TERMS = 8
+
+FTS_TABLE = 'case_fts'
+TEXT_CONFIG = 'simple'
+
+# Lightweight handle on the FTS5 table (not part of db.metadata, so
+# create_all never tries to create it as a regular table)
+case_fts = Table(FTS_TABLE, MetaData(), Column('rowid', Integer), Column('rank', Float))
+
+# Backend per database URL: 'postgresql', 'fts5' or 'like'
+_backends = {}
+
+
+def search_terms(q):
+    """
+    Split a user query into lower-cased word terms.
+
+    Returns:
+        list: At most MAX_SEARCH_TERMS terms (empty for a blank query)
+    """
+    return re.findall(r'\w+', (q or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def _document_sql():
+    # Plain || of coalesced columns: unlike concat_ws it is IMMUTABLE, which
+    # generated columns and expression indexes require
+    return " || ' ' || ".join(f"coalesce({field}, '')" for field in SEARCH_FIELDS)
+
+
+def _document():
+    return literal_column(f"({_document_sql()})")
+
+
+def _fts_columns():
+    return ', '.join(SEARCH_FIELDS)
+
+
+def install_search(connection):
+    """
+    Create the search structures for the connection's database.
+
+    Idempotent. On Postgres, adding the generated column rewrites the table
+    once; run it off-hours on a large register.
+
+    Args:
+        connection: SQLAlchemy connection inside a transaction (Postgres
+            index creation runs in its own AUTOCOMMIT connection)
+    """
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        connection.execute(text(
+            'ALTER TABLE "case" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+            f"GENERATED ALWAYS AS (to_tsvector('{TEXT_CONFIG}', {_document_sql()})) STORED"
+        ))
+        connection.commit()
+        # CONCURRENTLY cannot run inside a transaction block
+        with connection.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as autocommit:
+            autocommit.execute(text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_case_search_vector '
+                'ON "case" USING gin (search_vector)'
+            ))
+            autocommit.execute(text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_case_search_trgm '
+                f'ON "case" USING gin (({_document_sql()}) gin_trgm_ops)'
+            ))
+    elif dialect == 'sqlite':
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).first()
+        if not exists:
+            columns = _fts_columns()
+            new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+            old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+            # External content: the text lives only in "case", FTS5 keeps the index
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, content='case', "
+                "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            ))
+            connection.execute(text(
+                f'CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON "case" BEGIN '
+                f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+            ))
+            connection.execute(text(
+                f'CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON "case" BEGIN '
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+            ))
+            # id included: the offline replica renumbers cases once they are pushed
+            connection.execute(text(
+                f'CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF id, {columns} ON "case" BEGIN '
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                f'INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+            ))
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    _backends.pop(str(connection.engine.url), None)
+
+
+def search_backend(session):
+    """
+    Search backend available in the session's database (checked once per process).
+
+    Returns:
+        str: 'postgresql', 'fts5' or 'like'
+    """
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _backends:
+        dialect = bind.dialect.name
+        backend = 'like'
+        if dialect == 'postgresql':
+            found = session.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'case' AND column_name = 'search_vector'"
+            )).first()
+            backend = 'postgresql' if found else 'like'
+        elif dialect == 'sqlite':
+            found = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+            ).first()
+            backend = 'fts5' if found else 'like'
+        _backends[key] = backend
+    return _backends[key]
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def apply_search(query, q, session):
+    """
+    Restrict a Case query to rows matching `q`.
+
+    Every term must match (as a word prefix on the indexed backends).
+
+    Args:
+        query: Case query to filter
+        q: Raw search text from the user
+        session: Session whose database decides the backend
+
+    Returns:
+        tuple: (query, rank) where rank is an ORDER BY clause putting the
+        best matches first, or None when the backend cannot rank
+    """
+    terms = search_terms(q)
+    if not terms:
+        return query, None
+
+    backend = search_backend(session)
+    if backend == 'postgresql':
+        tsquery = func.to_tsquery(literal_column(f"'{TEXT_CONFIG}'::regconfig"),
+                                  ' & '.join(f'{term}:*' for term in terms))
+        vector = literal_column('"case".search_vector')
+        condition = vector.op('@@')(tsquery)
+        if all(len(term) >= 3 for term in terms):
+            # Infix matches through the trigram index (Postgres ORs both
+            # bitmaps); shorter terms have no trigrams and would scan the table
+            infix = and_(*(_document().ilike(_like_pattern(term), escape='\\') for term in terms))
+            condition = or_(condition, infix)
+        return query.filter(condition), func.ts_rank_cd(vector, tsquery).desc()
+
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        hits = (select(case_fts.c.rowid, case_fts.c.rank)
+                .where(literal_column(FTS_TABLE).op('MATCH')(match))
+                .subquery())
+        query = query.join(hits, hits.c.rowid == Case.id)
+        # FTS5 rank is bm25, where lower means more relevant
+        return query, hits.c.rank.asc()
+
+    return query.filter(and_(*(
+        or_(*(getattr(Case, field).ilike(_like_pattern(term), escape='\\') for field in SEARCH_FIELDS))
+        for term in terms
+    ))), None
@@ -1,6 +1,7 @@
 document.addEventListener('DOMContentLoaded', function() {
-    const editableCells = document.querySelectorAll('.editable');
-    const dateCells = document.querySelectorAll('.date-cell');
+    // Rows are replaced in place after edits, so handlers are delegated
+    // from the table body instead of bound to each cell
+    const caseTable = document.querySelector('.data-table-container tbody');
     const dateModal = document.getElementById('dateModal');
     const modalInput = document.getElementById('modalDateInput');
     const saveBtn = document.getElementById('saveDateBtn');
@@ -11,7 +12,6 @@ document.addEventListener('DOMContentLoaded', function() {
     const deleteMessage = document.getElementById('deleteMessage');
     const confirmDeleteBtn = document.getElementById('confirmDeleteBtn');
     const cancelDeleteBtn = document.getElementById('cancelDeleteBtn');
-    const deleteButtons = document.querySelectorAll('.btn-delete');
     
     // Pagination Elements
     const perPageSelect = document.getElementById('perPageSelect');
@@ -25,28 +25,62 @@ document.addEventListener('DOMContentLoaded', function() {
             const urlParams = new URLSearchParams(window.location.search);
             urlParams.set('per_page', this.value);
             urlParams.set('page', '1'); // Reset to first page
+            ['after', 'before', 'start'].forEach(key => urlParams.delete(key));
             window.location.search = urlParams.toString();
         });
     }
 
+    // Handle Status / Sort Filters
+    document.querySelectorAll('select[data-param]').forEach(select => {
+        select.addEventListener('change', function() {
+            const urlParams = new URLSearchParams(window.location.search);
+            if (this.value) {
+                urlParams.set(this.dataset.param, this.value);
+            } else {
+                urlParams.delete(this.dataset.param);
+            }
+            urlParams.set('page', '1'); // Reset to first page
+            ['after', 'before', 'start'].forEach(key => urlParams.delete(key));
+            window.location.search = urlParams.toString();
+        });
+    });
+
     // Handle ContentEditable (Text areas)
-    editableCells.forEach(cell => {
-        let originalContent = cell.innerText;
-        cell.addEventListener('focus', function() { originalContent = cell.innerText; });
-        cell.addEventListener('blur', function() {
+    const originalContent = new WeakMap();
+    if (caseTable) {
+        caseTable.addEventListener('focusin', function(e) {
+            const cell = e.target.closest('.editable');
+            // Compared trimmed: the cell's own whitespace is no edit
+            if (cell) originalContent.set(cell, cell.innerText.trim());
+        });
+        caseTable.addEventListener('focusout', function(e) {
+            const cell = e.target.closest('.editable');
+            if (!cell) return;
             const newContent = cell.innerText.trim();
-            if (newContent !== originalContent) {
+            if (newContent !== originalContent.get(cell)) {
                 saveData(cell.dataset.id, cell.dataset.field, newContent);
             }
         });
-        cell.addEventListener('keydown', function(e) {
-            if (e.key === 'Enter') { e.preventDefault(); cell.blur(); }
+        caseTable.addEventListener('keydown', function(e) {
+            const cell = e.target.closest('.editable');
+            if (cell && e.key === 'Enter') { e.preventDefault(); cell.blur(); }
         });
-    });
 
-    // Handle Date Cells - Open Modal
-    dateCells.forEach(cell => {
-        cell.addEventListener('click', function() {
+        caseTable.addEventListener('click', function(e) {
+            // Handle Delete Buttons
+            const deleteBtn = e.target.closest('.btn-delete');
+            if (deleteBtn) {
+                e.stopPropagation();
+                currentDeleteId = deleteBtn.dataset.id;
+                const caseName = deleteBtn.dataset.name;
+                deleteMessage.textContent = `Apakah Anda yakin ingin menghapus data "${caseName}"?`;
+                deleteModal.style.display = 'flex';
+                return;
+            }
+
+            // Handle Date Cells - Open Modal
+            const cell = e.target.closest('.date-cell');
+            if (!cell) return;
             currentCell = cell;
             const currentVal = cell.dataset.value;
             
@@ -61,7 +95,32 @@ document.addEventListener('DOMContentLoaded', function() {
             modalInput.value = isoValue;
             dateModal.style.display = 'flex';
         });
-    });
+    }
+
+    // Swap a row for the server-rendered one, keeping its row number
+    function replaceRow(id, html) {
+        const row = caseTable && caseTable.querySelector(`tr[data-case-id="${id}"]`);
+        // Leave a row alone while the user is typing in it; its next save refreshes it
+        if (!row || row.contains(document.activeElement)) return;
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        const newRow = template.content.firstElementChild;
+        newRow.querySelector('.row-number').textContent = row.querySelector('.row-number').textContent;
+        row.replaceWith(newRow);
+    }
+
+    function removeRow(id) {
+        const row = caseTable && caseTable.querySelector(`tr[data-case-id="${id}"]`);
+        if (!row) return;
+        // Renumber the rows below so the page stays consecutive
+        let next = row.nextElementSibling;
+        while (next) {
+            const number = next.querySelector('.row-number');
+            if (number && number.textContent) number.textContent = parseInt(number.textContent, 10) - 1;
+            next = next.nextElementSibling;
+        }
+        row.remove();
+    }
 
     // Modal Actions
     cancelBtn.addEventListener('click', function() {
@@ -77,21 +136,11 @@ document.addEventListener('DOMContentLoaded', function() {
         // Or better: convert T back to space
         const displayValue = newValue.replace('T', ' ');
         
-        // Save to backend
+        // Save to backend; the response carries the re-rendered row
         saveData(currentCell.dataset.id, currentCell.dataset.field, displayValue, true);
         
         dateModal.style.display = 'none';
-    });
-
-    // Handle Delete Buttons
-    deleteButtons.forEach(btn => {
-        btn.addEventListener('click', function(e) {
-            e.stopPropagation();
-            currentDeleteId = this.dataset.id;
-            const caseName = this.dataset.name;
-            deleteMessage.textContent = `Apakah Anda yakin ingin menghapus data "${caseName}"?`;
-            deleteModal.style.display = 'flex';
-        });
+        currentCell = null;
     });
 
     // Delete Modal Actions
@@ -111,7 +160,8 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
             if (data.success) {
                 deleteModal.style.display = 'none';
-                window.location.reload();
+                removeRow(data.removed);
+                currentDeleteId = null;
             } else {
                 alert('Gagal menghapus: ' + data.error);
             }
@@ -122,22 +172,41 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    function saveData(id, field, value, reload = false) {
-        fetch('/update_cell', {
+    // Pending cell edits, coalesced per cell and sent together to /update_cells
+    const SAVE_DELAY_MS = 400;
+    const pendingEdits = new Map();
+    let flushTimer = null;
+
+    function saveData(id, field, value, immediate = false) {
+        pendingEdits.set(`${id}:${field}`, { id: id, field: field, value: value });
+        clearTimeout(flushTimer);
+        if (immediate) {
+            flushEdits();
+        } else {
+            flushTimer = setTimeout(flushEdits, SAVE_DELAY_MS);
+        }
+    }
+
+    function flushEdits(keepalive = false) {
+        clearTimeout(flushTimer);
+        if (pendingEdits.size === 0) return;
+        const edits = Array.from(pendingEdits.values());
+        pendingEdits.clear();
+
+        fetch('/update_cells', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ id: id, field: field, value: value })
+            body: JSON.stringify({ edits: edits, render: !keepalive }),
+            keepalive: keepalive
         })
         .then(response => response.json())
         .then(data => {
-            if (data.success) {
-                if (reload) {
-                    window.location.reload();
-                } else if (!reload) {
-                    // Update UI manually if not reloading
-                    // currentCell.innerText = value; // simple update
-                }
-            } else {
+            // Fresh overdue/complete classes for every updated row
+            Object.entries(data.rows || {}).forEach(([id, html]) => replaceRow(id, html));
+            const failed = (data.results || []).filter(result => !result.success);
+            if (failed.length) {
+                alert('Gagal menyimpan: ' + failed.map(result => result.error).join(', '));
+            } else if (!data.success) {
                 alert('Gagal menyimpan: ' + data.error);
             }
         })
@@ -146,4 +215,60 @@ document.addEventListener('DOMContentLoaded', function() {
             alert('Kesalahan koneksi');
         });
     }
+
+    // Live updates: colleagues' edits arrive over /events (Server-Sent
+    // Events) and only the affected rows on this page are re-fetched
+    let newCases = 0;
+
+    function visibleIds(ids) {
+        return ids.filter(id => caseTable.querySelector(`tr[data-case-id="${id}"]`));
+    }
+
+    function refreshRows(ids) {
+        if (ids.length === 0) return;
+        fetch(`/rows?ids=${ids.join(',')}`)
+        .then(response => response.json())
+        .then(data => {
+            Object.entries(data.rows || {}).forEach(([id, html]) => replaceRow(id, html));
+            (data.missing || []).forEach(id => removeRow(id));
+        })
+        .catch(error => console.error('Error:', error));
+    }
+
+    function showNewCases(count) {
+        newCases += count;
+        let notice = document.getElementById('liveNotice');
+        if (!notice) {
+            notice = document.createElement('div');
+            notice.id = 'liveNotice';
+            notice.className = 'live-notice';
+            notice.addEventListener('click', () => window.location.reload());
+            document.querySelector('.data-table-container').before(notice);
+        }
+        notice.textContent = `${newCases} data baru ditambahkan. Klik untuk memuat ulang.`;
+    }
+
+    if (caseTable && window.EventSource) {
+        const feed = new EventSource('/events');
+        feed.addEventListener('case', function(e) {
+            const change = JSON.parse(e.data);
+            if (change.type === 'update') {
+                refreshRows(visibleIds(change.ids));
+            } else if (change.type === 'delete') {
+                change.ids.forEach(id => removeRow(id));
+            } else if (change.type === 'insert') {
+                showNewCases(change.ids.length);
+            } else if (change.type === 'resync') {
+                const ids = Array.from(caseTable.querySelectorAll('tr[data-case-id]'), row => row.dataset.caseId);
+                refreshRows(ids);
+            }
+        });
+        // Stop the stream before navigating, so it does not hold a connection
+        window.addEventListener('pagehide', () => feed.close());
+    }
+
+    // Don't lose edits still waiting for the debounce when leaving the page
+    window.addEventListener('pagehide', function() {
+        flushEdits(true);
+    });
 });
@@ -0,0 +1,93 @@
+"""
+Aggregate statistics of the case register (/stats and the dashboard card).
+
+Everything is answered by two GROUP BY queries over the materialized
+current_stage / next_deadline / first_deadline columns, so no Case row is loaded into Python
+and no stage date is re-parsed.
+"""
+from datetime import timedelta
+from sqlalchemy import select, func, case as sql_case
+from models import Case
+from deadlines import STAGE_FIELDS, STAGE_COMPLETE, DUE_SOON_DAYS
+
+# Bucket for cases with no stage date filled in yet
+STAGE_NONE = 'none'
+# Largest number of prosecutors listed in by_jpu (busiest first)
+MAX_JPU_ROWS = 100
+
+
+def _flag(condition):
+    return func.coalesce(func.sum(sql_case((condition, 1), else_=0)), 0)
+
+
+def case_statistics(session, today):
+    """
+    Counts per stage, per age category, per JPU and per deadline state.
+
+    Args:
+        session: Session to query with
+        today: Date the overdue/due-soon windows are relative to
+
+    Returns:
+        dict: {
+            'total': int,
+            'by_stage': {stage: count} in workflow order, then 'complete'
+                and 'none',
+            'by_kategori': {'Dewasa': count, 'Anak': count},
+            'deadline': {'overdue', 'due_soon', 'on_time', 'complete',
+                'no_deadline': count}; overdue counts cases with any stage
+                past its limit (like status=overdue), due_soon those whose
+                open stage is due within DUE_SOON_DAYS (like status=due_soon),
+                overdue or not,
+            'by_jpu': [{'jpu', 'total', 'overdue', 'complete'}] busiest first
+        }
+    """
+    overdue = Case.first_deadline < today
+    due_soon = Case.next_deadline.between(today, today + timedelta(days=DUE_SOON_DAYS))
+
+    rows = session.execute(
+        select(
+            Case.current_stage,
+            Case.kategori_umur,
+            func.count(),
+            _flag(overdue),
+            _flag(due_soon),
+            _flag(Case.first_deadline.isnot(None)),
+        ).group_by(Case.current_stage, Case.kategori_umur)
+    ).all()
+
+    by_stage = dict.fromkeys([*STAGE_FIELDS, STAGE_COMPLETE, STAGE_NONE], 0)
+    by_kategori = {'Dewasa': 0, 'Anak': 0}
+    deadline = dict.fromkeys(['overdue', 'due_soon', 'on_time', 'complete', 'no_deadline'], 0)
+    total = 0
+    for stage, kategori, count, overdue_count, due_soon_count, with_deadline in rows:
+        total += count
+        by_stage[stage or STAGE_NONE] = by_stage.get(stage or STAGE_NONE, 0) + count
+        # Deadline rules treat anything but 'Anak' as an adult
+        by_kategori['Anak' if kategori == 'Anak' else 'Dewasa'] += count
+        deadline['overdue'] += overdue_count
+        deadline['due_soon'] += due_soon_count
+        deadline['on_time'] += with_deadline - overdue_count
+        if stage == STAGE_COMPLETE:
+            deadline['complete'] += count
+        else:
+            deadline['no_deadline'] += count - with_deadline
+
+    total_by_jpu = func.count().label('total')
+    by_jpu = [
+        {'jpu': jpu, 'total': count, 'overdue': overdue_count, 'complete': complete_count}
+        for jpu, count, overdue_count, complete_count in session.execute(
+            select(Case.jpu, total_by_jpu, _flag(overdue), _flag(Case.current_stage == STAGE_COMPLETE))
+            .group_by(Case.jpu)
+            .order_by(total_by_jpu.desc(), Case.jpu)
+            .limit(MAX_JPU_ROWS)
+        )
+    ]
+
+    return {
+        'total': total,
+        'by_stage': by_stage,
+        'by_kategori': by_kategori,
+        'deadline': deadline,
+        'by_jpu': by_jpu,
+    }
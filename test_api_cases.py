@@ -0,0 +1,105 @@
+"""
+Tests for the read-only /api/cases endpoint
+"""
+import unittest
+from sqlalchemy import event
+from app import app, db
+from models import Case, get_table_version
+
+
+class ApiCasesTests(unittest.TestCase):
+    """Test suite for projection, cursor paging, filters and ETags"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        for i in range(5):
+            db.session.add(Case(nama_tersangka=f'Api Test {i}', pasal=f'Pasal {i}',
+                                kategori_umur='Anak' if i % 2 else 'Dewasa', jpu='Api JPU'))
+            db.session.commit()
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Api Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def get(self, query_string, **kwargs):
+        return self.client.get('/api/cases?' + query_string, **kwargs)
+
+    def test_projection(self):
+        """Test that ?fields= limits the keys of every case"""
+        data = self.get('jpu=Api+JPU&fields=id,nama_tersangka').get_json()
+        self.assertEqual(len(data['cases']), 5)
+        self.assertEqual(set(data['cases'][0]), {'id', 'nama_tersangka'})
+        self.assertEqual(data['cases'][0]['nama_tersangka'], 'Api Test 4')
+
+        full = self.get('jpu=Api+JPU').get_json()['cases'][0]
+        self.assertEqual(full, Case.query.get(full['id']).to_dict())
+
+        self.assertEqual(self.get('fields=id,password').status_code, 400)
+
+    def test_cursor_pagination(self):
+        """Test that following next_cursor walks every case exactly once"""
+        names, cursor = [], None
+        while True:
+            query = 'jpu=Api+JPU&fields=nama_tersangka&per_page=2'
+            data = self.get(query + (f'&after={cursor}' if cursor else '')).get_json()
+            names += [case['nama_tersangka'] for case in data['cases']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(names, [f'Api Test {i}' for i in range(4, -1, -1)])
+
+    def test_filters(self):
+        data = self.get('jpu=Api+JPU&kategori_umur=Anak&fields=nama_tersangka').get_json()
+        self.assertEqual([c['nama_tersangka'] for c in data['cases']], ['Api Test 3', 'Api Test 1'])
+
+    def test_not_modified_skips_case_query(self):
+        """Test that a matching If-None-Match answers 304 without reading cases"""
+        response = self.get('jpu=Api+JPU')
+        etag = response.headers['ETag']
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.get('jpu=Api+JPU', headers={'If-None-Match': etag})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([s for s in statements if 'FROM "case"' in s or 'FROM case' in s])
+
+        # A different query gets a different tag
+        self.assertNotEqual(self.get('jpu=Api+JPU&per_page=2').headers['ETag'], etag)
+
+    def test_writes_change_etag(self):
+        """Test that every write path bumps the case table version"""
+        etag = self.get('jpu=Api+JPU').headers['ETag']
+        version = get_table_version('case')
+
+        case = Case.query.filter_by(nama_tersangka='Api Test 0').first()
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'pasal', 'value': 'Pasal baru'})
+        self.assertGreater(get_table_version('case'), version)
+
+        response = self.get('jpu=Api+JPU', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        version = get_table_version('case')
+        self.client.delete(f'/delete_case/{case.id}')
+        self.assertGreater(get_table_version('case'), version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the hashed, precompressed static assets and HTML gzip
+"""
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask, render_template_string
+from assets import build_assets, load_manifest, init_assets, IMMUTABLE_CACHE_CONTROL
+from app import app
+
+STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+
+class AssetTests(unittest.TestCase):
+    """Test suite for assets.build_assets / init_assets"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.static = os.path.join(self.root, 'static')
+        shutil.copytree(STATIC, self.static, ignore=shutil.ignore_patterns('dist'))
+        self.manifest = build_assets(self.static)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_app(self, **options):
+        test_app = Flask(__name__, static_folder=self.static)
+        init_assets(test_app, **options)
+
+        @test_app.route('/page')
+        def page():
+            return render_template_string(
+                "<link href=\"{{ url_for('static', filename='css/style.css') }}\">" + 'x' * 1000)
+
+        return test_app
+
+    def test_build_writes_hashed_and_compressed_copies(self):
+        self.assertEqual(set(self.manifest), {'css/style.css', 'js/script.js'})
+        hashed = self.manifest['css/style.css']
+        self.assertRegex(hashed, r'^dist/css/style\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.static, hashed)
+        with open(path, 'rb') as f, open(path + '.gz', 'rb') as gz:
+            self.assertEqual(gzip.decompress(gz.read()), f.read())
+        # Same content, same names
+        self.assertEqual(build_assets(self.static), self.manifest)
+
+    def test_url_for_points_at_hashed_file(self):
+        client = self.make_app().test_client()
+        body = client.get('/page').get_data(as_text=True)
+        self.assertIn(f"/static/{self.manifest['css/style.css']}", body)
+
+    def test_hashed_file_is_immutable_and_precompressed(self):
+        client = self.make_app().test_client()
+        url = f"/static/{self.manifest['css/style.css']}"
+        response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        with open(os.path.join(STATIC, 'css', 'style.css'), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.get_data()), f.read())
+        response.close()
+
+        response = client.get(url)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response.close()
+
+    def test_original_names_still_served(self):
+        client = self.make_app().test_client()
+        response = client.get('/static/css/style.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+    def test_source_edited_after_build_is_not_served_stale(self):
+        with open(os.path.join(self.static, 'js', 'script.js'), 'a', encoding='utf-8') as f:
+            f.write('\n// edited\n')
+        manifest = load_manifest(self.static)
+        self.assertNotIn('js/script.js', manifest)
+        self.assertIn('css/style.css', manifest)
+
+    def test_without_build_nothing_changes(self):
+        shutil.rmtree(os.path.join(self.static, 'dist'))
+        client = self.make_app().test_client()
+        self.assertIn('/static/css/style.css', client.get('/page').get_data(as_text=True))
+
+    def test_serverless_skips_the_manifest(self):
+        client = self.make_app(hashed=False).test_client()
+        self.assertIn('/static/css/style.css', client.get('/page').get_data(as_text=True))
+        response = client.get('/static/' + self.manifest['css/style.css'])
+        self.assertNotEqual(response.headers.get('Cache-Control'), IMMUTABLE_CACHE_CONTROL)
+        response.close()
+
+
+class HtmlGzipTests(unittest.TestCase):
+    """Test suite for gzip of dynamic HTML responses"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def test_html_is_gzipped_when_accepted(self):
+        client = self.app.test_client()
+        response = client.get('/login', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn(b'password', gzip.decompress(response.get_data()).lower())
+
+        response = client.get('/login')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_redirects_left_alone(self):
+        client = self.app.test_client()
+        response = client.get('/dashboard', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
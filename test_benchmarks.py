@@ -0,0 +1,76 @@
+"""
+Tests for the benchmark generator, timer and baseline comparison
+"""
+import unittest
+from datetime import date
+from benchmarks.generator import generate_cases, seed_cases, CHUNK_ROWS
+from benchmarks.runner import measure
+from benchmarks.compare import compare
+from app import app, init_db
+from extensions import db
+from models import Case
+
+ANCHOR = date(2001, 3, 10)
+
+
+class GeneratorTests(unittest.TestCase):
+    """Test suite for benchmarks.generator"""
+
+    def test_rows_do_not_depend_on_where_a_run_starts(self):
+        whole = list(generate_cases(0, CHUNK_ROWS + 500, seed=3, anchor=ANCHOR))
+        tail = list(generate_cases(CHUNK_ROWS - 200, 700, seed=3, anchor=ANCHOR))
+        self.assertEqual(tail, whole[CHUNK_ROWS - 200:])
+        self.assertNotEqual(list(generate_cases(0, 10, seed=4, anchor=ANCHOR)), whole[:10])
+
+    def test_distribution_is_plausible(self):
+        rows = list(generate_cases(0, 2000, seed=1, anchor=ANCHOR))
+        anak = sum(row['kategori_umur'] == 'Anak' for row in rows) / len(rows)
+        self.assertTrue(0.08 < anak < 0.25, anak)
+        self.assertTrue(all(row['created_at'].date() <= ANCHOR for row in rows))
+        self.assertTrue(all(row['nama_tersangka'] for row in rows))
+        self.assertGreater(len({row['pasal'] for row in rows}), 5)
+
+    def test_seed_cases_grows_table(self):
+        app.config['TESTING'] = True
+        with app.app_context():
+            init_db()
+            Case.query.delete()
+            db.session.commit()
+            try:
+                self.assertEqual(seed_cases(db.session, 30, anchor=ANCHOR, batch_size=7), 30)
+                self.assertEqual(seed_cases(db.session, 45, anchor=ANCHOR), 15)
+                self.assertEqual(seed_cases(db.session, 10, anchor=ANCHOR), 0)
+                self.assertEqual(Case.query.count(), 45)
+            finally:
+                Case.query.delete()
+                db.session.commit()
+
+
+class MeasureCompareTests(unittest.TestCase):
+    """Test suite for benchmarks.runner.measure and benchmarks.compare"""
+
+    def test_measure_runs_warmup_and_repeats(self):
+        calls = []
+        result = measure(lambda: calls.append(1), repeat=3, warmup=2)
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(result['runs'], 3)
+        self.assertLessEqual(result['min_ms'], result['median_ms'])
+        self.assertLessEqual(result['median_ms'], result['max_ms'])
+
+    def test_compare_flags_slowdowns_over_threshold(self):
+        baseline = {'results': {'1000': {'dashboard': {'median_ms': 40.0}, 'export_csv': {'median_ms': 30.0},
+                                         'update_cell': {'median_ms': 0.2}, 'seed_s': 1.0}}}
+        current = {'results': {'1000': {'dashboard': {'median_ms': 60.0}, 'export_csv': {'median_ms': 33.0},
+                                        'update_cell': {'median_ms': 0.4}, 'import_xlsx': {'median_ms': 9.0},
+                                        'seed_s': 2.0}}}
+        rows = {row['scenario']: row for row in compare(current, baseline, threshold=0.25)}
+        self.assertEqual(set(rows), {'dashboard', 'export_csv', 'update_cell'})
+        self.assertTrue(rows['dashboard']['regressed'])
+        self.assertAlmostEqual(rows['dashboard']['change'], 0.5)
+        self.assertFalse(rows['export_csv']['regressed'])
+        # Doubling a sub-millisecond timing is noise
+        self.assertFalse(rows['update_cell']['regressed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests for the cached dashboard total count
+"""
+import unittest
+from unittest import mock
+from app import app, db, get_case_total, case_count_cache, invalidate_case_caches
+from models import Case
+
+
+class CaseCountCacheTests(unittest.TestCase):
+    """Test suite for the count cache behind "dari N data" """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        invalidate_case_caches()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Count Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_case_caches()
+        self.ctx.pop()
+
+    def test_total_is_cached(self):
+        """Test that the total is computed once and then served from cache"""
+        total, approximate = get_case_total()
+        self.assertEqual(total, Case.query.count())
+        self.assertFalse(approximate)
+
+        # A direct insert is not seen until the cache is invalidated
+        db.session.add(Case(nama_tersangka='Count Test Direct'))
+        db.session.commit()
+        self.assertEqual(get_case_total(), (total, False))
+
+        invalidate_case_caches()
+        self.assertEqual(get_case_total(), (total + 1, False))
+
+    def test_compute_false_never_queries(self):
+        """Test that compute=False only peeks at the cache"""
+        self.assertEqual(get_case_total(compute=False), (None, False))
+
+    def test_add_and_delete_invalidate(self):
+        """Test that add_case and delete_case refresh the cached total"""
+        before, _ = get_case_total()
+        self.client.post('/add_case', data={'nama_tersangka': 'Count Test Add'})
+        self.assertEqual(len(case_count_cache), 0)
+        self.assertEqual(get_case_total()[0], before + 1)
+
+        case = Case.query.filter_by(nama_tersangka='Count Test Add').first()
+        self.client.delete(f'/delete_case/{case.id}')
+        self.assertEqual(len(case_count_cache), 0)
+        self.assertEqual(get_case_total()[0], before)
+
+    def test_dashboard_shows_approximate_total(self):
+        """Test that an estimated total is labelled as approximate"""
+        db.session.add(Case(nama_tersangka='Count Test Estimate'))
+        db.session.commit()
+        case_count_cache.set('total', (1234567, True))
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'dari sekitar 1234567 data', response.data)
+
+    def test_dashboard_renders_without_total(self):
+        """Test that a failing count does not break the dashboard"""
+        db.session.add(Case(nama_tersangka='Count Test Missing'))
+        db.session.commit()
+        with mock.patch('app.get_case_total', return_value=(None, False)):
+            response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'dari', response.data.split(b'pagination-info')[1][:300])
+
+    def test_dashboard_counts_after_the_response(self):
+        """Test that a count-cache miss never runs COUNT(*) inside the page request"""
+        db.session.add(Case(nama_tersangka='Count Test Deferred'))
+        db.session.commit()
+        total = Case.query.count()
+        response = self.client.get('/dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'dari', response.data.split(b'pagination-info')[1][:300])
+        response.close()
+        self.assertEqual(get_case_total(compute=False), (total, False))
+        response = self.client.get('/dashboard')
+        self.assertIn(f'dari {total} data'.encode(), response.data)
+
+    def test_estimate_mode_falls_back_to_exact_on_sqlite(self):
+        """Test that estimate mode uses COUNT(*) where reltuples is unavailable"""
+        with mock.patch.dict(self.app.config, {'CASE_COUNT_MODE': 'estimate'}):
+            total, approximate = get_case_total()
+        self.assertEqual(total, Case.query.count())
+        self.assertFalse(approximate)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Tests for the write-behind case history (audit log) and its view
+"""
+import os
+import unittest
+from datetime import datetime
+from unittest import mock
+from app import app, db, record_history
+import app as app_module
+from models import Case, CaseHistory
+from history import HistoryWriter, history_entry, case_history_page
+
+
+class CaseHistoryTests(unittest.TestCase):
+    """Test suite for history.HistoryWriter and /case/<id>/history"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        case = Case(nama_tersangka='History Test', jpu='History JPU', p21='2024-01-01')
+        case.refresh_derived()
+        db.session.add(case)
+        db.session.commit()
+        self.case_id = case.id
+
+    def tearDown(self):
+        db.session.rollback()
+        CaseHistory.query.filter(CaseHistory.case_id == self.case_id).delete()
+        Case.query.filter(Case.nama_tersangka.like('History Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def entries(self):
+        if app_module.history_writer is not None:
+            app_module.history_writer.flush()
+        db.session.expire_all()
+        return CaseHistory.query.filter_by(case_id=self.case_id).order_by(CaseHistory.id).all()
+
+    def test_edits_are_logged_with_user_and_old_value(self):
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'p21', 'value': '2024-02-01'})
+        self.client.post('/update_cells', json={'edits': [
+            {'id': self.case_id, 'field': 'jpu', 'value': 'History JPU 2'},
+            {'id': self.case_id, 'field': 'umur_tersangka', 'value': '17'},
+        ]})
+        entries = self.entries()
+        self.assertEqual([(e.field, e.old_value, e.new_value) for e in entries], [
+            ('p21', '2024-01-01', '2024-02-01'),
+            ('jpu', 'History JPU', 'History JPU 2'),
+            ('umur_tersangka', None, '17'),
+        ])
+        self.assertEqual({e.username for e in entries}, {'admin'})
+        self.assertIsInstance(entries[0].changed_at, datetime)
+
+    def test_unchanged_and_rejected_edits_are_not_logged(self):
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'jpu', 'value': 'History JPU'})
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'password_hash', 'value': 'x'})
+        self.assertEqual(self.entries(), [])
+
+    def test_serverless_writes_history_with_the_edit(self):
+        with mock.patch.dict(os.environ, {'VERCEL': '1'}), \
+                mock.patch.object(HistoryWriter, 'record') as queued:
+            self.client.post('/update_cell', json={'id': self.case_id, 'field': 'jpu', 'value': 'History JPU 2'})
+        queued.assert_not_called()
+        db.session.expire_all()
+        entries = CaseHistory.query.filter_by(case_id=self.case_id).all()
+        self.assertEqual([(e.field, e.new_value) for e in entries], [('jpu', 'History JPU 2')])
+
+    def test_stopped_writer_is_bypassed(self):
+        writer = HistoryWriter(self.app)
+        writer.start()
+        writer.stop()
+        with mock.patch.object(app_module, 'history_writer', writer):
+            self.client.post('/update_cell', json={'id': self.case_id, 'field': 'jpu', 'value': 'History JPU 2'})
+        self.assertEqual(writer.queue.qsize(), 0)
+        self.assertEqual(len(self.entries()), 1)
+
+    def test_full_queue_writes_inline_and_stop_drains(self):
+        writer = HistoryWriter(self.app, max_queue=2)  # never started
+        now = datetime.now()
+        writer.record([history_entry(self.case_id, 'pasal', None, str(i), None, now) for i in range(5)])
+        self.assertEqual((writer.written, writer.overflowed), (3, 3))
+        writer.stop()
+        self.assertEqual(writer.written, 5)
+        self.assertEqual(len(self.entries()), 5)
+
+    def test_background_thread_batches(self):
+        writer = HistoryWriter(self.app, batch_size=2, flush_seconds=0.05)
+        writer.start()
+        try:
+            now = datetime.now()
+            writer.record([history_entry(self.case_id, 'pasal', None, str(i), None, now) for i in range(5)])
+            writer.flush()
+            self.assertEqual(writer.written, 5)
+            self.assertEqual(writer.overflowed, 0)
+        finally:
+            writer.stop()
+        self.assertFalse(writer.is_alive())
+
+    def test_history_pages_newest_first(self):
+        now = datetime.now()
+        record_history([history_entry(self.case_id, 'keterangan', None, f'v{i}', None, now) for i in range(5)])
+        self.entries()
+        page, before = case_history_page(db.session, self.case_id, limit=2)
+        self.assertEqual([e.new_value for e in page], ['v4', 'v3'])
+        page, before = case_history_page(db.session, self.case_id, before=before, limit=2)
+        self.assertEqual([e.new_value for e in page], ['v2', 'v1'])
+        page, before = case_history_page(db.session, self.case_id, before=before, limit=2)
+        self.assertEqual(([e.new_value for e in page], before), (['v0'], None))
+
+    def test_history_view(self):
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'p21', 'value': '2024-02-01'})
+        self.entries()
+        body = self.client.get(f'/case/{self.case_id}/history').get_data(as_text=True)
+        self.assertIn('Riwayat Perubahan: History Test', body)
+        self.assertIn('P-21', body)
+        self.assertIn('2024-02-01', body)
+        self.assertIn('admin', body)
+
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'p21', 'value': '2024-03-01'})
+        self.entries()
+        # The dashboard links each row to its history
+        self.assertIn(f'/case/{self.case_id}/history', self.client.get('/dashboard?jpu=History JPU').get_data(as_text=True))
+
+        self.client.delete(f'/delete_case/{self.case_id}')
+        body = self.client.get(f'/case/{self.case_id}/history').get_data(as_text=True)
+        self.assertIn('sudah dihapus', body)
+        self.assertIn('2024-03-01', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
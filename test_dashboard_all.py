@@ -0,0 +1,89 @@
+"""
+Tests for the streamed "all rows" dashboard (?per_page=all)
+"""
+import gzip
+import re
+import unittest
+from datetime import date
+from app import app, db, invalidate_case_caches, row_cache, buffered, STREAM_BATCH_SIZE
+from models import Case
+from benchmarks.generator import seed_cases
+
+# More than two fetch batches
+ROWS = 2 * STREAM_BATCH_SIZE + 37
+ROW_ID = re.compile(rb'<tr data-case-id="(\d+)"')
+
+
+class StreamedDashboardTests(unittest.TestCase):
+    """Test suite for the dashboard's show-everything mode"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+        with cls.app.app_context():
+            db.create_all()
+            Case.query.delete()
+            db.session.commit()
+            seed_cases(db.session, ROWS, anchor=date(2001, 3, 10))
+            cls.anak = Case.query.filter_by(kategori_umur='Anak').count()
+        invalidate_case_caches()
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            Case.query.delete()
+            db.session.commit()
+        invalidate_case_caches()
+        row_cache.clear()
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        row_cache.clear()
+
+    def test_every_row_is_streamed_in_chunks(self):
+        # The first view counts after its response; the next one shows the total
+        self.client.get('/dashboard?per_page=all').close()
+        response = self.client.get('/dashboard?per_page=all', buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        chunks = list(response.iter_encoded())
+        self.assertGreater(len(chunks), 2)
+        # The page header is sent before the last rows are rendered
+        self.assertIn(b'<thead>', chunks[0])
+        body = b''.join(chunks)
+        self.assertEqual(len(ROW_ID.findall(body)), ROWS)
+        self.assertIn(f'Menampilkan semua {ROWS} data'.encode(), body)
+        self.assertIn(b'<option value="all" selected>', body)
+        self.assertTrue(body.rstrip().endswith(b'</html>'))
+
+    def test_filters_apply(self):
+        body = self.client.get('/dashboard?per_page=all&kategori_umur=Anak').get_data()
+        self.assertEqual(len(ROW_ID.findall(body)), self.anak)
+
+    def test_rows_follow_the_dashboard_order(self):
+        body = self.client.get('/dashboard?per_page=all').get_data()
+        ids = [int(i) for i in ROW_ID.findall(body)]
+        with self.app.app_context():
+            # Default order: newest first
+            expected = [case.id for case in Case.query.order_by(Case.created_at.desc(), Case.id.desc())]
+        self.assertEqual(ids, expected)
+
+    def test_row_cache_is_not_filled(self):
+        self.client.get('/dashboard?per_page=all').get_data()
+        self.assertEqual(len(row_cache), 0)
+
+    def test_gzipped_stream(self):
+        response = self.client.get('/dashboard?per_page=all', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        body = gzip.decompress(response.get_data())
+        self.assertEqual(len(ROW_ID.findall(body)), ROWS)
+
+    def test_buffered_joins_small_pieces(self):
+        self.assertEqual(list(buffered(['ab', 'cd', 'e'], size=3)), ['abcd', 'e'])
+        self.assertEqual(list(buffered([], size=3)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
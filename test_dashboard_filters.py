@@ -0,0 +1,127 @@
+"""
+Tests for the dashboard column filters and column sorts
+"""
+import re
+import unittest
+from datetime import datetime
+from app import app, db, invalidate_case_caches, case_listing, SORTABLE_COLUMNS, order_clauses
+from models import Case
+
+
+class DashboardFilterTests(unittest.TestCase):
+    """Test suite for ?jpu=, ?kategori_umur=, ?pasal=, ?created_from/_to= and ?sort=<column>"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        invalidate_case_caches()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.cases = [
+            Case(nama_tersangka='Filter Test C', umur_tersangka=40, kategori_umur='Dewasa', pasal='Pasal 362',
+                 jpu='Filter JPU A', p21='2024-03-01', created_at=datetime(2024, 1, 10, 9)),
+            Case(nama_tersangka='Filter Test A', umur_tersangka=15, kategori_umur='Anak', pasal='Pasal 362',
+                 jpu='Filter JPU B', created_at=datetime(2024, 2, 10, 9)),
+            Case(nama_tersangka='Filter Test B', umur_tersangka=30, kategori_umur='Dewasa', pasal='Pasal 378',
+                 jpu='Filter JPU A', p21='2024-01-05', created_at=datetime(2024, 3, 10, 23, 59)),
+        ]
+        for case in self.cases:
+            case.refresh_derived()
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Filter Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_case_caches()
+        self.ctx.pop()
+
+    def listed(self, query_string):
+        body = self.client.get(f'/dashboard?per_page=100&{query_string}').get_data(as_text=True)
+        ids = [int(i) for i in re.findall(r'<tr data-case-id="(-?\d+)">', body)]
+        return [i for i in ids if i in self.ids], body
+
+    def test_column_filters(self):
+        self.assertEqual(self.listed('jpu=Filter JPU A')[0], [self.ids[2], self.ids[0]])
+        self.assertEqual(self.listed('jpu=Filter JPU A&pasal=Pasal 362')[0], [self.ids[0]])
+        self.assertEqual(self.listed('kategori_umur=Anak&jpu=Filter JPU B')[0], [self.ids[1]])
+
+    def test_created_date_range_is_inclusive(self):
+        ids, _ = self.listed('jpu=Filter JPU A&created_from=2024-03-10&created_to=2024-03-10')
+        self.assertEqual(ids, [self.ids[2]])
+        ids, _ = self.listed('created_from=2024-01-01&created_to=2024-02-10&q=filter')
+        self.assertEqual(sorted(ids), [self.ids[0], self.ids[1]])
+        # Invalid dates are ignored rather than failing the page
+        ids, _ = self.listed('created_from=10-01-2024&jpu=Filter JPU B')
+        self.assertEqual(ids, [self.ids[1]])
+
+    def test_sort_by_column(self):
+        """Test that any displayed column sorts both ways"""
+        ids, body = self.listed('sort=nama_tersangka&q=filter')
+        self.assertEqual(ids, [self.ids[1], self.ids[2], self.ids[0]])
+        self.assertIn('dir=desc', body)  # header link flips the direction
+        ids, _ = self.listed('sort=nama_tersangka&dir=desc&q=filter')
+        self.assertEqual(ids, [self.ids[0], self.ids[2], self.ids[1]])
+        ids, _ = self.listed('sort=umur_tersangka&q=filter')
+        self.assertEqual(ids, [self.ids[1], self.ids[2], self.ids[0]])
+        # Stage dates sort chronologically by their typed shadow column
+        ids, _ = self.listed('sort=p21&jpu=Filter JPU A')
+        self.assertEqual(ids, [self.ids[2], self.ids[0]])
+
+    def test_column_sort_pages_by_number(self):
+        db.session.add_all([Case(nama_tersangka=f'Filter Test Z{i:02d}', jpu='Filter JPU Z') for i in range(12)])
+        db.session.commit()
+        body = self.client.get('/dashboard?per_page=10&sort=nama_tersangka&jpu=Filter JPU Z').get_data(as_text=True)
+        self.assertNotIn('after=', body)
+        self.assertIn('page=2', body)
+        body = self.client.get('/dashboard?per_page=10&sort=nama_tersangka&jpu=Filter JPU Z&page=2').get_data(as_text=True)
+        self.assertEqual(re.findall(r'>Filter Test (Z\d+)<', body), ['Z10', 'Z11'])
+        # A stray cursor is ignored for column sorts
+        response = self.client.get('/dashboard?sort=nama_tersangka&after=bogus')
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_sort_falls_back_to_newest_first(self):
+        ids, _ = self.listed('sort=password_hash&dir=sideways&jpu=Filter JPU A')
+        self.assertEqual(ids, [self.ids[2], self.ids[0]])
+
+    def test_export_honours_filters_and_sort(self):
+        export = self.client.get('/export.csv?jpu=Filter JPU A&sort=nama_tersangka').get_data(as_text=True)
+        self.assertLess(export.index('Filter Test B'), export.index('Filter Test C'))
+        self.assertNotIn('Filter Test A', export)
+        body = self.listed('jpu=Filter JPU A&sort=nama_tersangka')[1]
+        self.assertIn('/export.csv?sort=nama_tersangka&amp;jpu=Filter+JPU+A', body)
+
+    def test_filter_suggestions(self):
+        body = self.listed('')[1]
+        self.assertIn('<option value="Filter JPU B">', body)
+        self.assertIn('<option value="Pasal 378">', body)
+
+    def test_every_sort_has_a_matching_index(self):
+        """Test that each sort key (plus id) is the leading part of an index"""
+        indexes = [[column.key for column in index.columns] for index in Case.__table__.indexes]
+        for field, columns in SORTABLE_COLUMNS.items():
+            keys = [column.key for column in columns]
+            self.assertTrue(any(index[:len(keys)] == keys and 'id' in index for index in indexes), field)
+
+    def test_sort_reads_index_in_order(self):
+        """Test that SQLite walks the composite index instead of sorting the table"""
+        if db.engine.dialect.name != 'sqlite':
+            self.skipTest('query plan check is SQLite specific')
+        for args in ({'sort': 'nama_tersangka'}, {'sort': 'p21', 'dir': 'desc'}, {'jpu': 'Filter JPU A'}):
+            query, order, _, _ = case_listing(args, datetime.now().date())
+            statement = query.order_by(*order_clauses(order)).limit(10).statement
+            sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+            plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+            self.assertIn('USING INDEX', plan, args)
+            self.assertNotIn('TEMP B-TREE', plan, args)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Tests for the typed shadow date columns on Case
+"""
+import unittest
+from datetime import datetime
+from app import app, db
+from models import Case
+
+
+class DateShadowColumnTests(unittest.TestCase):
+    """Test suite for keeping String and DateTime stage columns in sync"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Shadow Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def test_add_case_fills_shadow(self):
+        """Test that add_case parses the SPDP date into its shadow column"""
+        self.client.post('/add_case', data={
+            'nama_tersangka': 'Shadow Test Add',
+            'spdp_tgl_terima': '2024-01-15',
+        })
+        case = Case.query.filter_by(nama_tersangka='Shadow Test Add').first()
+        self.assertEqual(case.spdp_tgl_terima_dt, datetime(2024, 1, 15))
+        self.assertIsNone(case.berkas_tahap_1_dt)
+
+    def test_update_cell_keeps_shadow_in_sync(self):
+        """Test that update_cell refreshes or clears the shadow column"""
+        case = Case(nama_tersangka='Shadow Test Update')
+        db.session.add(case)
+        db.session.commit()
+
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'p21', 'value': '20-01-2024'})
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, case.id).p21_dt, datetime(2024, 1, 20))
+
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'p21', 'value': 'belum ada'})
+        db.session.expire_all()
+        updated = db.session.get(Case, case.id)
+        self.assertEqual(updated.p21, 'belum ada')
+        self.assertIsNone(updated.p21_dt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Tests for the precompiled deadline engine
+
+The engine must produce exactly the classes the per-cell `check_overdue`
+filter used to produce in dashboard.html.
+"""
+import unittest
+from datetime import datetime, timedelta
+from app import app, db, check_overdue, invalidate_case_caches
+from models import Case
+from deadlines import (parse_date, is_date_overdue, evaluate_cases, compute_deadline,
+                       STAGE_FIELDS, STAGE_COMPLETE)
+
+
+def legacy_cell_class(case, stage):
+    """The template expression dashboard.html used before the engine"""
+    if case.is_complete:
+        return 'text-success-bold'
+    kategori_umur = case.kategori_umur or 'Dewasa'
+    date_obj = parse_date(getattr(case, STAGE_FIELDS[stage]))
+    if not date_obj:
+        return ''
+    limits_dewasa = {'spdp': 25, 'berkas_tahap_1': 6, 'p18_p19': 10, 'p21': 12, 'tahap_2': 7}
+    limits_anak = {'spdp': 25, 'berkas_tahap_1': 3, 'p18_p19': 7, 'p21': 10, 'tahap_2': 5}
+    limits = limits_anak if kategori_umur == 'Anak' else limits_dewasa
+    limit = limits.get(stage)
+    if limit and is_date_overdue(date_obj, limit):
+        return 'overdue-cell'
+    return ''
+
+
+class DeadlineEngineTests(unittest.TestCase):
+    """Test suite for deadlines.evaluate_cases"""
+
+    def make_case(self, case_id, kategori, **fields):
+        return Case(id=case_id, kategori_umur=kategori, **fields)
+
+    def test_matches_legacy_filter(self):
+        """Test that every stage class matches the old per-cell filter"""
+        now = datetime.now()
+        formats = [
+            lambda d: d.strftime('%Y-%m-%d'),
+            lambda d: d.strftime('%Y-%m-%d %H:%M'),
+            lambda d: d.strftime('%d-%m-%Y'),
+            lambda d: d.strftime('%d/%m/%Y'),
+        ]
+        cases = []
+        case_id = 1
+        for kategori in ['Dewasa', 'Anak', None, 'dewasa']:
+            for offset in range(0, 40):
+                for fmt in formats:
+                    value = fmt(now - timedelta(days=offset))
+                    for stage, field in STAGE_FIELDS.items():
+                        cases.append(self.make_case(case_id, kategori, **{field: value}))
+                        case_id += 1
+                    # Partially and fully filled rows
+                    cases.append(self.make_case(case_id, kategori, spdp_tgl_terima=value,
+                                                berkas_tahap_1=value, p21='bukan tanggal'))
+                    case_id += 1
+                    cases.append(self.make_case(case_id, kategori, **dict.fromkeys(STAGE_FIELDS.values(), value)))
+                    case_id += 1
+
+        results = evaluate_cases(cases)
+        for case in cases:
+            for stage in STAGE_FIELDS:
+                self.assertEqual(results[case.id][stage], legacy_cell_class(case, stage),
+                                 f'{stage} {case.kategori_umur} {getattr(case, STAGE_FIELDS[stage])}')
+
+    def test_deadline_boundary(self):
+        """Test the exact last allowed day for each kategori"""
+        today = datetime(2025, 3, 10).date()
+        on_time = self.make_case(1, 'Anak', berkas_tahap_1='2025-03-08')    # day 3 of 3
+        late = self.make_case(2, 'Anak', berkas_tahap_1='2025-03-07')       # day 4 of 3
+        dewasa = self.make_case(3, 'Dewasa', berkas_tahap_1='2025-03-07')   # day 4 of 6
+        results = evaluate_cases([on_time, late, dewasa], today=today)
+        self.assertEqual(results[1]['berkas_tahap_1'], '')
+        self.assertEqual(results[2]['berkas_tahap_1'], 'overdue-cell')
+        self.assertEqual(results[3]['berkas_tahap_1'], '')
+
+    def test_parse_date_picker_value(self):
+        """Test that date picker values parse exactly as dateutil would"""
+        # dayfirst=True reads the middle group as the day when it can
+        self.assertEqual(parse_date('2025-07-09 10:30'), datetime(2025, 9, 7, 10, 30))
+        self.assertEqual(parse_date('2025-07-21T08:00'), datetime(2025, 7, 21, 8, 0))
+        self.assertIsNone(parse_date('2025-31-31 10:30'))
+
+    def test_check_overdue_filter_still_available(self):
+        """Test that the template filter keeps its old signature"""
+        past = (datetime.now() - timedelta(days=8)).strftime('%Y-%m-%d')
+        self.assertEqual(check_overdue(past, 'p18_p19', 'Anak'), 'overdue-cell')
+        self.assertEqual(check_overdue(past, 'p18_p19', 'Dewasa'), '')
+        self.assertIn('check_overdue', app.jinja_env.filters)
+
+    def test_first_deadline_matches_rendered_overdue(self):
+        """Test that first_deadline < today exactly when a cell renders overdue"""
+        today = datetime.now().date()
+        cases = []
+        for i, offset in enumerate(range(0, 30)):
+            value = (datetime.now() - timedelta(days=offset)).strftime('%Y-%m-%d')
+            for kategori in ['Dewasa', 'Anak']:
+                cases.append(self.make_case(len(cases) + 1, kategori, berkas_tahap_1=value))
+                cases.append(self.make_case(len(cases) + 1, kategori, spdp_tgl_terima=value, p21=value))
+        results = evaluate_cases(cases, today=today)
+        for case in cases:
+            _, _, first_deadline = compute_deadline(case)
+            rendered_overdue = 'overdue-cell' in results[case.id].values()
+            self.assertEqual(first_deadline is not None and first_deadline < today, rendered_overdue)
+
+    def test_current_stage(self):
+        """Test that current_stage is the last filled stage, or complete"""
+        self.assertEqual(compute_deadline(self.make_case(1, 'Dewasa')), (None, None, None))
+        stage, _, _ = compute_deadline(self.make_case(2, 'Dewasa', spdp_tgl_terima='2025-01-01',
+                                                      p18_p19='2025-02-01'))
+        self.assertEqual(stage, 'p18_p19')
+        full = self.make_case(3, 'Anak', **dict.fromkeys(STAGE_FIELDS.values(), '2025-01-01'))
+        self.assertEqual(compute_deadline(full), (STAGE_COMPLETE, None, None))
+
+    def test_mixed_stages(self):
+        """Test that next_deadline follows the open stage, first_deadline the earliest one"""
+        case = self.make_case(1, 'Dewasa', spdp_tgl_terima='2025-01-01', berkas_tahap_1='2025-02-06')
+        self.assertEqual(compute_deadline(case),
+                         ('berkas_tahap_1', datetime(2025, 2, 11).date(), datetime(2025, 1, 25).date()))
+        # The open stage has no parseable date: nothing is due next, the SPDP still overdue
+        case = self.make_case(2, 'Dewasa', spdp_tgl_terima='2025-01-01', berkas_tahap_1='bukan tanggal')
+        self.assertEqual(compute_deadline(case), ('berkas_tahap_1', None, datetime(2025, 1, 25).date()))
+
+
+class DashboardStatusFilterTests(unittest.TestCase):
+    """Test suite for ?status= and ?sort=urgency on the dashboard"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+        def days_ago(n):
+            return (datetime.now() - timedelta(days=n)).strftime('%Y-%m-%d')
+
+        for name, fields in [
+            ('Status Test Late', {'berkas_tahap_1': days_ago(20)}),
+            ('Status Test Soon', {'berkas_tahap_1': days_ago(4)}),     # due in 1 day
+            ('Status Test Fresh', {'spdp_tgl_terima': days_ago(1)}),  # due in 23 days
+            ('Status Test Done', dict.fromkeys(STAGE_FIELDS.values(), days_ago(40))),
+        ]:
+            self.client.post('/add_case', data={'nama_tersangka': name})
+            case = Case.query.filter_by(nama_tersangka=name).first()
+            for field, value in fields.items():
+                self.client.post('/update_cell', json={'id': case.id, 'field': field, 'value': value})
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Status Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_case_caches()
+        self.ctx.pop()
+
+    def names(self, query_string):
+        response = self.client.get('/dashboard?' + query_string)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        return [n for n in ['Late', 'Soon', 'Fresh', 'Done', 'Mixed'] if f'Status Test {n}<' in body]
+
+    def test_status_filters(self):
+        """Test overdue, due_soon and complete filters"""
+        self.assertEqual(self.names('status=overdue'), ['Late'])
+        self.assertEqual(self.names('status=due_soon'), ['Soon'])
+        self.assertEqual(self.names('status=complete'), ['Done'])
+        self.assertEqual(self.names('status=bogus'), ['Late', 'Soon', 'Fresh', 'Done'])
+
+    def test_mixed_stages_are_overdue_and_due_soon(self):
+        """Test that a missed early stage does not hide the open stage's deadline"""
+        self.client.post('/add_case', data={'nama_tersangka': 'Status Test Mixed'})
+        case = Case.query.filter_by(nama_tersangka='Status Test Mixed').first()
+        for field, days in [('spdp_tgl_terima', 40), ('berkas_tahap_1', 4)]:  # berkas due in 1 day
+            value = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+            self.client.post('/update_cell', json={'id': case.id, 'field': field, 'value': value})
+
+        self.assertEqual(self.names('status=overdue'), ['Late', 'Mixed'])
+        self.assertEqual(self.names('status=due_soon'), ['Soon', 'Mixed'])
+        # Ranked by the open stage: next to Soon, ahead of Fresh
+        body = self.client.get('/dashboard?sort=urgency&per_page=100').get_data(as_text=True)
+        positions = [body.index(f'Status Test {n}<') for n in ['Late', 'Mixed', 'Fresh']]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_urgency_sort(self):
+        """Test that sort=urgency lists the nearest deadline first"""
+        body = self.client.get('/dashboard?sort=urgency&per_page=100').get_data(as_text=True)
+        positions = [body.index(f'Status Test {n}<') for n in ['Late', 'Soon', 'Fresh']]
+        self.assertEqual(positions, sorted(positions))
+        self.assertNotIn('Status Test Done<', body)
+
+    def test_edit_moves_case_between_filters(self):
+        """Test that update_cell recomputes the deadline and filtered counts"""
+        self.assertEqual(self.names('status=overdue'), ['Late'])
+        case = Case.query.filter_by(nama_tersangka='Status Test Late').first()
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'kategori_umur', 'value': 'Anak'})
+        self.client.post('/update_cell', json={'id': case.id, 'field': 'berkas_tahap_1',
+                                               'value': datetime.now().strftime('%Y-%m-%d')})
+        self.assertEqual(self.names('status=overdue'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Tests for the live change feed (/events) and the /rows follow-up
+"""
+import os
+import queue
+import unittest
+from unittest import mock
+from app import app, db
+from models import Case
+import events
+from events import ChangeBroker, notify_change
+
+
+class ChangeBrokerTests(unittest.TestCase):
+    """Test suite for events.ChangeBroker"""
+
+    def test_fan_out_and_replay(self):
+        broker = ChangeBroker()
+        first, _ = broker.subscribe()
+        second, _ = broker.subscribe()
+        event_id = broker.publish({'type': 'update', 'ids': [1]})
+        self.assertEqual(first.get_nowait(), (event_id, {'type': 'update', 'ids': [1]}))
+        self.assertEqual(second.get_nowait()[0], event_id)
+
+        later_id = broker.publish({'type': 'delete', 'ids': [2]})
+        _, missed = broker.subscribe(last_event_id=event_id)
+        self.assertEqual(missed, [(later_id, {'type': 'delete', 'ids': [2]})])
+        # Ids from another process (or evicted) cannot be replayed
+        self.assertIsNone(broker.subscribe(last_event_id='123.456-7')[1])
+
+    def test_slow_subscriber_is_dropped(self):
+        broker = ChangeBroker(queue_size=2)
+        subscriber, _ = broker.subscribe()
+        for i in range(3):
+            broker.publish({'type': 'update', 'ids': [i]})
+        self.assertEqual(broker.subscriber_count, 0)
+        items = [subscriber.get_nowait() for _ in range(3)]
+        self.assertIsNone(items[-1])
+
+    def test_subscriber_limit(self):
+        broker = ChangeBroker()
+        first, _ = broker.subscribe(limit=1)
+        self.assertEqual(broker.subscribe(limit=1), (None, None))
+        broker.unsubscribe(first)
+        self.assertIsNotNone(broker.subscribe(limit=1)[0])
+
+    def test_huge_batches_become_a_resync(self):
+        self.assertEqual(events.change_payload('update', range(events.MAX_EVENT_IDS + 1)), {'type': 'resync'})
+        with self.assertRaises(ValueError):
+            events.change_payload('truncate', [1])
+
+
+class ChangeFeedTests(unittest.TestCase):
+    """Test suite for the events published by the write routes"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.case = Case(nama_tersangka='Events Test 1', jpu='Events JPU')
+        self.case.refresh_derived()
+        db.session.add(self.case)
+        db.session.commit()
+        self.case_id = self.case.id
+        self.subscriber, _ = events.broker.subscribe()
+
+    def tearDown(self):
+        events.broker.unsubscribe(self.subscriber)
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Events Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def received(self):
+        items = []
+        while True:
+            try:
+                items.append(self.subscriber.get_nowait()[1])
+            except queue.Empty:
+                return items
+
+    def test_published_only_on_commit(self):
+        self.received()
+        notify_change(db.session, 'update', [self.case_id])
+        self.assertEqual(self.received(), [])
+        db.session.rollback()
+        db.session.commit()
+        self.assertEqual(self.received(), [])
+
+        notify_change(db.session, 'update', [self.case_id])
+        db.session.commit()
+        self.assertEqual(self.received(), [{'type': 'update', 'ids': [self.case_id]}])
+
+    def test_write_routes_publish(self):
+        self.received()
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'jpu', 'value': 'Events JPU 2'})
+        self.assertEqual(self.received(), [{'type': 'update', 'ids': [self.case_id]}])
+
+        self.client.post('/add_case', data={'nama_tersangka': 'Events Test 2', 'kategori_umur': 'Dewasa'})
+        added_id = Case.query.filter_by(nama_tersangka='Events Test 2').one().id
+        self.assertEqual(self.received(), [{'type': 'insert', 'ids': [added_id]}])
+
+        self.client.delete(f'/delete_case/{added_id}')
+        self.assertEqual(self.received(), [{'type': 'delete', 'ids': [added_id]}])
+
+        # Failed edits announce nothing
+        self.client.post('/update_cell', json={'id': self.case_id, 'field': 'password_hash', 'value': 'x'})
+        self.assertEqual(self.received(), [])
+
+    def test_event_stream(self):
+        response = self.client.get('/events')
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        stream = iter(response.response)
+        self.assertEqual(next(stream), b'retry: 5000\n\n')
+        event_id = events.broker.publish({'type': 'update', 'ids': [self.case_id]})
+        message = next(stream).decode()
+        self.assertEqual(message, f'id: {event_id}\nevent: case\ndata: {{"type": "update", "ids": [{self.case_id}]}}\n\n')
+        response.close()
+
+    def test_reconnect_with_unknown_id_resyncs(self):
+        response = self.client.get('/events', headers={'Last-Event-ID': 'gone-1'})
+        stream = iter(response.response)
+        next(stream)
+        self.assertIn(b'"resync"', next(stream))
+        response.close()
+
+    def test_streams_are_capped_per_worker(self):
+        # The test's own subscriber already fills one slot
+        with mock.patch.dict(app.config, {'EVENTS_MAX_SUBSCRIBERS': 2}):
+            response = self.client.get('/events')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.get('/events').status_code, 204)
+            # Closing a stream, even unread, frees its slot
+            response.close()
+            self.assertEqual(events.broker.subscriber_count, 1)
+            self.client.get('/events').close()
+
+    def test_serverless_declines_the_stream(self):
+        with mock.patch.dict(os.environ, {'VERCEL': '1'}):
+            self.assertEqual(self.client.get('/events').status_code, 204)
+
+    def test_rows_endpoint(self):
+        response = self.client.get(f'/rows?ids={self.case_id},999999999')
+        data = response.get_json()
+        self.assertIn('Events Test 1', data['rows'][str(self.case_id)])
+        self.assertEqual(data['missing'], [999999999])
+        self.assertEqual(self.client.get('/rows?ids=abc').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Tests for the CSV / Excel export endpoints
+"""
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from openpyxl import load_workbook
+from app import app, db, invalidate_case_caches
+from models import Case
+from export_data import EXPORT_HEADERS, escape_formula, iter_csv
+from import_data import import_excel
+
+
+class ExportTests(unittest.TestCase):
+    """Test suite for /export.csv and /export.xlsx"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        # Work on an export of only our rows
+        Case.query.delete()
+        db.session.commit()
+
+        late = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        for name, fields in [
+            ('Export Test A', {'pasal': 'Pasal 362', 'jpu': 'Budi', 'berkas_tahap_1': late}),
+            ('Export Test B', {'pasal': '=1+1', 'kategori_umur': 'Anak', 'umur_tersangka': 15}),
+            ('', {'pasal': 'Tanpa nama', 'keterangan': 'baris ketiga'}),
+        ]:
+            case = Case(nama_tersangka=name, **fields)
+            case.refresh_derived()
+            db.session.add(case)
+            db.session.commit()
+        invalidate_case_caches()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.delete()
+        db.session.commit()
+        invalidate_case_caches()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_requires_login(self):
+        self.client.get('/logout')
+        self.assertEqual(self.client.get('/export.csv').status_code, 302)
+
+    def test_csv_layout(self):
+        """Test the header, oldest-first order and attachment headers"""
+        response = self.client.get('/export.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename="perkara_', response.headers['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+        self.assertEqual(rows[0], EXPORT_HEADERS)
+        self.assertEqual([row[1] for row in rows[1:]], ['Export Test A', 'Export Test B', ''])
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '2', '3'])
+
+    def test_csv_is_chunked(self):
+        """Test that the CSV generator yields per batch instead of one blob"""
+        chunks = list(iter_csv(Case.query.order_by(Case.id), batch_size=1))
+        self.assertEqual(len(chunks), 4)
+
+    def test_status_filter(self):
+        """Test that the export honours ?status="""
+        body = self.client.get('/export.csv?status=overdue').get_data(as_text=True)
+        self.assertIn('Export Test A', body)
+        self.assertNotIn('Export Test B', body)
+
+    def test_escape_formula(self):
+        """Test that every formula trigger is escaped and other values are not"""
+        for text in ('=1+1', '+62 812', '-2+3', '@SUM(A1)', '\tcmd', '\rcmd'):
+            with self.subTest(text=text):
+                self.assertEqual(escape_formula(text), "'" + text)
+        for value in ('Pasal 362', "'quoted", '', None, -5, 15):
+            with self.subTest(value=value):
+                self.assertEqual(escape_formula(value), value)
+
+    def test_formula_text_round_trip(self):
+        """Test that formula-like text is escaped in both formats and re-imports unchanged"""
+        # No '\r' here: XML parsers read it back from the .xlsx as '\n'
+        triggers = ['=HYPERLINK("http://x")', '+1+1', '-1+1', '@SUM(A1)', '\t=1']
+        Case.query.delete()
+        for text in triggers:
+            case = Case(nama_tersangka='Formula', pasal=text)
+            case.refresh_derived()
+            db.session.add(case)
+        db.session.commit()
+        invalidate_case_caches()
+        pasal_column = EXPORT_HEADERS.index('PASAL YANG DISANGKAKAN') + 1
+
+        body = self.client.get('/export.csv').get_data(as_text=True).lstrip('\ufeff')
+        rows = list(csv.reader(io.StringIO(body)))[1:]
+        self.assertEqual([row[pasal_column - 1] for row in rows], ["'" + t for t in triggers])
+
+        response = self.client.get('/export.xlsx')
+        xlsx = os.path.join(self.tmpdir, 'export.xlsx')
+        with open(xlsx, 'wb') as f:
+            f.write(response.data)
+        response.close()
+        sheet = load_workbook(xlsx).active
+        self.assertEqual([sheet.cell(row=i, column=pasal_column).value for i in range(2, 7)],
+                         ["'" + t for t in triggers])
+
+        csv_path = os.path.join(self.tmpdir, 'export.csv')
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(body)
+        for path in (xlsx, csv_path):
+            with self.subTest(path=os.path.basename(path)):
+                Case.query.delete()
+                db.session.commit()
+                with redirect_stdout(io.StringIO()):
+                    import_excel(path, mode='append')
+                self.assertEqual([c.pasal for c in Case.query.order_by(Case.id)], triggers)
+
+    def test_xlsx_round_trip(self):
+        """Test that the Excel export re-imports to the same data"""
+        response = self.client.get('/export.xlsx')
+        self.assertEqual(response.status_code, 200)
+        path = os.path.join(self.tmpdir, 'export.xlsx')
+        with open(path, 'wb') as f:
+            f.write(response.data)
+        response.close()
+
+        sheet = load_workbook(path).active
+        self.assertEqual([c.value for c in sheet[1]], EXPORT_HEADERS)
+        # Text that looks like a formula is escaped and stays text
+        self.assertEqual(sheet.cell(row=3, column=3).value, "'=1+1")
+        self.assertEqual(sheet.cell(row=3, column=3).data_type, 's')
+
+        before = [(c.nama_tersangka, c.pasal, c.jpu, c.kategori_umur, c.umur_tersangka,
+                   c.berkas_tahap_1, c.keterangan, c.next_deadline)
+                  for c in Case.query.order_by(Case.id)]
+        Case.query.delete()
+        db.session.commit()
+        with redirect_stdout(io.StringIO()):
+            inserted, _ = import_excel(path, mode='append')
+        self.assertEqual(inserted, 3)
+        after = [(c.nama_tersangka or '', c.pasal, c.jpu or None, c.kategori_umur, c.umur_tersangka,
+                  c.berkas_tahap_1 or None, c.keterangan or None, c.next_deadline)
+                 for c in Case.query.order_by(Case.id)]
+        self.assertEqual(after, before)
+
+    def test_csv_round_trip(self):
+        """Test that the CSV export can be imported back"""
+        path = os.path.join(self.tmpdir, 'export.csv')
+        with open(path, 'wb') as f:
+            f.write(self.client.get('/export.csv').data)
+        Case.query.delete()
+        db.session.commit()
+        with redirect_stdout(io.StringIO()):
+            inserted, _ = import_excel(path, mode='append')
+        self.assertEqual(inserted, 3)
+        self.assertEqual(Case.query.filter_by(pasal='Tanpa nama').count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
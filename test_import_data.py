@@ -0,0 +1,141 @@
+"""
+Tests for the batched Excel import
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from openpyxl import Workbook
+from app import app, db
+from models import Case
+from import_data import import_excel, copy_line, EXCEL_COLUMNS
+
+HEADERS = [name for name, _ in EXCEL_COLUMNS[:10]]
+
+
+class ImportExcelTests(unittest.TestCase):
+    """Test suite for import_data.import_excel"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Import Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def write_workbook(self, rows, headers=HEADERS):
+        path = os.path.join(self.tmpdir, 'import.xlsx')
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(headers)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+        return path
+
+    def run_import(self, path, mode, **kwargs):
+        with redirect_stdout(StringIO()):
+            return import_excel(path, mode=mode, **kwargs)
+
+    def test_append_in_batches(self):
+        """Test that every row lands, across several batches, with derived columns"""
+        rows = [[i, f'Import Test {i}', '362 KUHP', '', datetime(2025, 1, 2), '', '', '', '', '']
+                for i in range(1, 8)]
+        inserted, updated = self.run_import(self.write_workbook(rows), 'append', batch_size=3)
+        self.assertEqual((inserted, updated), (7, 0))
+
+        case = Case.query.filter_by(nama_tersangka='Import Test 1').first()
+        self.assertEqual(case.berkas_tahap_1, '2025-01-02')
+        self.assertEqual(case.berkas_tahap_1_dt, datetime(2025, 1, 2))
+        self.assertEqual(case.current_stage, 'berkas_tahap_1')
+        self.assertEqual(case.next_deadline, datetime(2025, 1, 7).date())
+        self.assertEqual(case.kategori_umur, 'Dewasa')
+        self.assertIsNotNone(case.created_at)
+
+    def test_continuation_rows_are_merged(self):
+        """Test that rows without a name extend the case above them"""
+        rows = [
+            [1, 'Import Test Merge', 'Pasal 362', 'SPDP/1', '', '', '', '', '', 'catatan'],
+            [None, None, 'Jo. Pasal 55', 'tgl 01-02-2025', None, None, None, None, None, None],
+            [2, 'Import Test Next', 'Pasal 378', '', '', '', '', '', '', ''],
+        ]
+        inserted, _ = self.run_import(self.write_workbook(rows), 'append')
+        self.assertEqual(inserted, 2)
+        case = Case.query.filter_by(nama_tersangka='Import Test Merge').first()
+        self.assertEqual(case.pasal, 'Pasal 362 Jo. Pasal 55')
+        self.assertEqual(case.spdp, 'SPDP/1 tgl 01-02-2025')
+        self.assertEqual(case.keterangan, 'catatan')
+
+    def test_upsert_updates_matching_cases(self):
+        """Test that upsert fills in existing cases without blanking them"""
+        db.session.add(Case(nama_tersangka='Import Test Upsert', pasal='Pasal 1',
+                            keterangan='lama', p21='2025-01-01'))
+        db.session.commit()
+
+        rows = [
+            [1, 'Import Test Upsert', 'Pasal 1', '', '', '', '', '2025-02-01', '', ''],
+            [2, 'Import Test Fresh', 'Pasal 2', '', '', '', '', '', '', 'baru'],
+        ]
+        inserted, updated = self.run_import(self.write_workbook(rows), 'upsert')
+        self.assertEqual((inserted, updated), (1, 1))
+
+        cases = Case.query.filter_by(nama_tersangka='Import Test Upsert').all()
+        self.assertEqual(len(cases), 1)
+        self.assertEqual(cases[0].tahap_2, '2025-02-01')
+        self.assertEqual(cases[0].tahap_2_dt, datetime(2025, 2, 1))
+        self.assertEqual(cases[0].p21, '2025-01-01')
+        self.assertEqual(cases[0].keterangan, 'lama')
+
+    def test_upsert_writes_a_repeated_new_key_once(self):
+        """Test that a key appearing twice in one batch is inserted once, last row winning"""
+        rows = [
+            [1, 'Import Test Twice', 'Pasal 3', '', '', '', '', '', '', 'pertama'],
+            [2, 'Import Test Twice', 'Pasal 3', '', '', '', '', '', '', 'kedua'],
+        ]
+        inserted, updated = self.run_import(self.write_workbook(rows), 'upsert')
+        self.assertEqual((inserted, updated), (1, 0))
+        cases = Case.query.filter_by(nama_tersangka='Import Test Twice').all()
+        self.assertEqual([case.keterangan for case in cases], ['kedua'])
+
+    def test_copy_line_escapes_text_format(self):
+        """Test that COPY input keeps backslashes, tabs and newlines literal"""
+        line = copy_line(['a\\N', None, '\\N', 'x\ty\nz', 3])
+        self.assertEqual(line, 'a\\\\N\t\\N\t\\\\N\tx\\ty\\nz\t3\n')
+
+    def test_optional_columns(self):
+        """Test the extra columns written by the export"""
+        headers = HEADERS + ['UMUR', 'KATEGORI UMUR', 'JPU', 'SPDP TGL TERIMA']
+        rows = [[1, 'Import Test Extra', '', '', '', '', '', '', '', '', 15, 'Anak', 'Budi', '2025-03-01']]
+        self.run_import(self.write_workbook(rows, headers), 'append')
+        case = Case.query.filter_by(nama_tersangka='Import Test Extra').first()
+        self.assertEqual((case.umur_tersangka, case.kategori_umur, case.jpu), (15, 'Anak', 'Budi'))
+        self.assertEqual(case.current_stage, 'spdp')
+
+    def test_skip_mode_leaves_populated_db_alone(self):
+        """Test that the default mode does nothing once the table has data"""
+        db.session.add(Case(nama_tersangka='Import Test Existing'))
+        db.session.commit()
+        rows = [[1, 'Import Test Skipped', '', '', '', '', '', '', '', '']]
+        self.assertEqual(self.run_import(self.write_workbook(rows), 'skip'), (0, 0))
+        self.assertIsNone(Case.query.filter_by(nama_tersangka='Import Test Skipped').first())
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            import_excel('missing.xlsx', mode='merge')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the Prometheus /metrics endpoint and its collectors
+"""
+import unittest
+from app import app, init_db
+from extensions import db
+from models import User
+import metrics
+from metrics import Counter, Histogram, Registry
+
+
+class MetricTypeTests(unittest.TestCase):
+    """Test suite for metrics.Counter / Histogram exposition"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.register(Histogram('t_seconds', 'Test.', ('endpoint',), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(('a',), value)
+        text = registry.render()
+        self.assertIn('# TYPE t_seconds histogram', text)
+        self.assertIn('t_seconds_bucket{endpoint="a",le="0.1"} 2', text)
+        self.assertIn('t_seconds_bucket{endpoint="a",le="1.0"} 3', text)
+        self.assertIn('t_seconds_bucket{endpoint="a",le="+Inf"} 4', text)
+        self.assertIn('t_seconds_sum{endpoint="a"} 3.65', text)
+        self.assertIn('t_seconds_count{endpoint="a"} 4', text)
+
+    def test_label_values_are_escaped(self):
+        registry = Registry()
+        counter = registry.register(Counter('t_total', 'Test.', ('template',)))
+        counter.inc(('a"b\\c\nd',), 2)
+        self.assertIn('t_total{template="a\\"b\\\\c\\nd"} 2', registry.render())
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    """Test suite for /metrics"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+        with cls.app.app_context():
+            init_db()
+
+    def tearDown(self):
+        self.app.config['METRICS_TOKEN'] = None
+
+    def login(self, client):
+        client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def test_requires_login_or_token(self):
+        client = self.app.test_client()
+        self.assertEqual(client.get('/metrics').status_code, 401)
+
+        self.app.config['METRICS_TOKEN'] = 's3cret'
+        self.assertEqual(client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 401)
+        response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, metrics.CONTENT_TYPE)
+
+        self.app.config['METRICS_TOKEN'] = None
+        self.login(client)
+        self.assertEqual(client.get('/metrics').status_code, 200)
+
+    def test_requests_sql_and_templates_are_recorded(self):
+        client = self.app.test_client()
+        self.login(client)
+        requests_before = metrics.requests_total.value(('dashboard', 'GET', '200'))
+        sql_before = metrics.sql_statements_total.value(('dashboard',))
+        renders_before = metrics.template_seconds.count(('dashboard.html',))
+
+        self.assertEqual(client.get('/dashboard').status_code, 200)
+
+        self.assertEqual(metrics.requests_total.value(('dashboard', 'GET', '200')), requests_before + 1)
+        self.assertGreater(metrics.sql_statements_total.value(('dashboard',)), sql_before)
+        self.assertEqual(metrics.template_seconds.count(('dashboard.html',)), renders_before + 1)
+        text = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('ekejaksaan_http_request_duration_seconds_count{endpoint="dashboard"}', text)
+        self.assertIn('ekejaksaan_sql_statement_duration_seconds_sum{endpoint="dashboard"}', text)
+        self.assertIn('ekejaksaan_template_render_duration_seconds_count{template="dashboard.html"}', text)
+
+    def test_statements_outside_requests_are_labelled_none(self):
+        before = metrics.sql_statements_total.value((metrics.NO_ENDPOINT,))
+        with self.app.app_context():
+            User.query.first()
+            self.assertGreaterEqual(metrics.request_sql_statements(), 1)
+        self.assertGreater(metrics.sql_statements_total.value((metrics.NO_ENDPOINT,)), before)
+
+    def test_failed_statement_does_not_skew_timing(self):
+        with self.app.app_context():
+            with self.assertRaises(Exception):
+                db.session.execute(db.text('SELECT * FROM no_such_table'))
+            db.session.rollback()
+            connection = db.session.connection()
+            self.assertFalse(connection.info.get('metrics_started'))
+
+
+if __name__ == '__main__':
+    unittest.main()
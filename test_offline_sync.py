@@ -0,0 +1,222 @@
+"""
+Tests for the offline replica and its sync with the remote database
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import create_engine, select, insert, update, delete
+from extensions import db
+from models import Case, CaseHistory, User, CaseTombstone, TableVersion
+import offline_sync
+from offline_sync import (sync_outbox, sync_conflict, init_local, next_local_id, record_insert,
+                          record_update, record_delete, record_local_history, push, pull, sync_once)
+import history
+
+
+class OfflineSyncTests(unittest.TestCase):
+    """Test suite for push/pull between two SQLite files"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.remote = create_engine(f"sqlite:///{os.path.join(self.tmp, 'remote.db')}")
+        db.metadata.create_all(self.remote)
+        with self.remote.begin() as conn:
+            conn.execute(insert(User.__table__).values(id=7, username='admin', password_hash='x'))
+
+        self.local_app = Flask(__name__)
+        self.local_app.config['SQLALCHEMY_DATABASE_URI'] = offline_sync.local_database_url(
+            os.path.join(self.tmp, 'replica', 'replica.db'))
+        db.init_app(self.local_app)
+        self.ctx = self.local_app.app_context()
+        self.ctx.push()
+        offline_sync.enable_wal(db.engine)
+        db.create_all()
+        init_local(db.engine)
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.ctx.pop()
+        self.remote.dispose()
+        shutil.rmtree(self.tmp)
+
+    def add_local_case(self, name):
+        case = Case(id=next_local_id(db.session), nama_tersangka=name, kategori_umur='Dewasa')
+        case.refresh_derived()
+        db.session.add(case)
+        db.session.flush()
+        record_insert(db.session, case)
+        db.session.commit()
+        return case.id
+
+    def edit_local_case(self, case_id, **values):
+        version = db.session.execute(select(Case.version).where(Case.id == case_id)).scalar()
+        db.session.execute(update(Case), [{'id': case_id, **values}])
+        record_update(db.session, case_id, values, version)
+        db.session.commit()
+
+    def remote_rows(self):
+        with self.remote.connect() as conn:
+            return {row.id: row for row in conn.execute(select(Case.__table__))}
+
+    def test_replica_uses_wal(self):
+        mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        self.assertEqual(mode.lower(), 'wal')
+
+    def test_offline_insert_gets_remote_id(self):
+        """Test that a case created offline is pushed and takes the remote id"""
+        temp_id = self.add_local_case('Offline A')
+        self.assertLess(temp_id, 0)
+        self.edit_local_case(temp_id, jpu='Budi')
+
+        self.assertEqual(push(self.remote), (2, 0))
+        remote = self.remote_rows()
+        self.assertEqual(len(remote), 1)
+        (remote_id, row), = remote.items()
+        self.assertGreater(remote_id, 0)
+        self.assertEqual((row.nama_tersangka, row.jpu, row.version), ('Offline A', 'Budi', 2))
+
+        local = db.session.get(Case, remote_id)
+        self.assertEqual((local.jpu, local.version), ('Budi', 2))
+        self.assertIsNone(db.session.get(Case, temp_id))
+        self.assertEqual(db.session.execute(select(sync_outbox)).all(), [])
+
+    def remote_table_version(self):
+        with self.remote.connect() as conn:
+            return conn.execute(select(TableVersion.version)
+                                .where(TableVersion.name == Case.__tablename__)).scalar() or 0
+
+    def test_push_bumps_remote_table_version(self):
+        """Test that pushed changes invalidate the web app's version-keyed caches"""
+        temp_id = self.add_local_case('Offline Version')
+        self.edit_local_case(temp_id, jpu='Budi')
+        self.assertEqual(push(self.remote), (2, 0))
+        self.assertEqual(self.remote_table_version(), 2)
+
+        # A conflicting (not applied) update leaves it alone
+        (remote_id,) = self.remote_rows()
+        with self.remote.begin() as conn:
+            conn.execute(update(Case.__table__).where(Case.id == remote_id).values(version=9))
+        self.edit_local_case(remote_id, jpu='Sari')
+        self.assertEqual(push(self.remote), (0, 1))
+        self.assertEqual(self.remote_table_version(), 2)
+
+    def test_pull_copies_remote_changes_and_users(self):
+        with self.remote.begin() as conn:
+            conn.execute(insert(Case.__table__), [{'nama_tersangka': f'Remote {i}'} for i in range(3)])
+        self.assertEqual(pull(self.remote), 3)
+        self.assertEqual(db.session.scalars(select(User.username)).all(), ['admin'])
+
+        with self.remote.begin() as conn:
+            conn.execute(update(Case.__table__).where(Case.id == 2).values(jpu='Sari'))
+        # Unchanged rows inside the overlap window are not rewritten
+        self.assertEqual(pull(self.remote), 1)
+        self.assertEqual(db.session.get(Case, 2).jpu, 'Sari')
+
+    def test_conflicting_edit_keeps_remote_and_logs_local(self):
+        """Test that a stale local edit loses to the remote and is recorded"""
+        with self.remote.begin() as conn:
+            conn.execute(insert(Case.__table__).values(id=1, nama_tersangka='Shared'))
+        pull(self.remote)
+        self.edit_local_case(1, keterangan='local')
+        with self.remote.begin() as conn:
+            conn.execute(update(Case.__table__).where(Case.id == 1).values(keterangan='remote'))
+
+        # The pending local edit shields the row from being pulled over
+        pull(self.remote)
+        self.assertEqual(db.session.get(Case, 1).keterangan, 'local')
+
+        self.assertEqual(push(self.remote), (0, 1))
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Case, 1).keterangan, 'remote')
+        self.assertEqual(self.remote_rows()[1].keterangan, 'remote')
+        conflict = db.session.execute(select(sync_conflict)).one()
+        self.assertEqual(conflict.kind, 'changed_remotely')
+        self.assertIn('local', conflict.local)
+
+    def test_deletes_travel_both_ways(self):
+        with self.remote.begin() as conn:
+            conn.execute(insert(Case.__table__), [{'id': 1, 'nama_tersangka': 'A'},
+                                                  {'id': 2, 'nama_tersangka': 'B'}])
+        pull(self.remote)
+
+        # Local delete -> remote row removed and tombstoned
+        record_delete(db.session, 1, db.session.get(Case, 1).version)
+        db.session.execute(delete(Case.__table__).where(Case.id == 1))
+        db.session.commit()
+        # Remote delete -> local row removed on the next pull
+        with self.remote.begin() as conn:
+            conn.execute(delete(Case.__table__).where(Case.id == 2))
+            conn.execute(insert(CaseTombstone.__table__).values(case_id=2))
+
+        sync_once(self.remote)
+        self.assertEqual(self.remote_rows(), {})
+        self.assertIsNone(db.session.get(Case, 2))
+        with self.remote.connect() as conn:
+            self.assertEqual(sorted(conn.scalars(select(CaseTombstone.case_id))), [1, 2])
+
+    def test_unpushed_case_deleted_locally_never_reaches_remote(self):
+        temp_id = self.add_local_case('Offline B')
+        record_delete(db.session, temp_id, 1)
+        db.session.execute(delete(Case.__table__).where(Case.id == temp_id))
+        db.session.commit()
+        self.assertEqual(sync_once(self.remote), 0)
+        self.assertEqual(self.remote_rows(), {})
+
+    def test_history_of_offline_case_follows_its_new_id(self):
+        """Test that case_history written under the temporary id is renumbered by push"""
+        temp_id = self.add_local_case('Offline D')
+        entries = [history.history_entry(case_id, 'jpu', None, 'Budi', None, datetime(2024, 1, 1))
+                   for case_id in (temp_id, 5)]
+        self.assertEqual([e['case_id'] for e in record_local_history(db.session, entries)], [5])
+        db.session.commit()
+
+        push(self.remote)
+        (remote_id,) = self.remote_rows()
+        self.assertEqual(db.session.scalars(select(CaseHistory.case_id)).all(), [remote_id])
+
+    def test_local_id_skips_history_of_deleted_offline_case(self):
+        temp_id = self.add_local_case('Offline E')
+        record_local_history(db.session, [history.history_entry(temp_id, 'jpu', None, 'Budi', None,
+                                                                datetime(2024, 1, 1))])
+        record_delete(db.session, temp_id, 1)
+        db.session.execute(delete(Case.__table__).where(Case.id == temp_id))
+        db.session.commit()
+        self.assertLess(next_local_id(db.session), temp_id)
+
+    def test_unreachable_remote_leaves_outbox_intact(self):
+        self.add_local_case('Offline C')
+        dead = create_engine(f"sqlite:///{os.path.join(self.tmp, 'missing', 'remote.db')}")
+        with self.assertRaises(Exception):
+            sync_once(dead)
+        self.assertEqual(len(db.session.execute(select(sync_outbox)).all()), 1)
+
+
+
+class DesktopBuildTests(unittest.TestCase):
+    """Test suite for the desktop launcher written by build_exe.py"""
+
+    def test_embedded_launcher_runs_offline(self):
+        import build_exe
+        tmp = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        try:
+            os.chdir(tmp)
+            build_exe.create_desktop_embedded()
+            with open('desktop_embedded.py', encoding='utf-8') as f:
+                source = f.read()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp)
+        compile(source, 'desktop_embedded.py', 'exec')
+        self.assertLess(source.index("os.environ.setdefault('OFFLINE_MODE', '1')"),
+                        source.index('from app_embedded import app, init_db, start_sync_worker'))
+        self.assertLess(source.index('init_db()'), source.index('t.start()'))
+        self.assertLess(source.index('start_sync_worker()'), source.index('t.start()'))
+
+
+if __name__ == '__main__':
+    unittest.main()
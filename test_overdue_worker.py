@@ -0,0 +1,190 @@
+"""
+Tests for the overdue scanner and the per-JPU digests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+from app import app, db
+from models import Case, JobState, OverdueNotice
+from deadlines import STAGE_FIELDS
+import overdue_worker
+from overdue_worker import FileSender, job_lock, run_once, scan_overdue, JOB_NAME
+
+# Far in the past, so no other case in the database falls inside the scan
+TODAY = date(2001, 3, 10)
+
+
+class FailingSender:
+    def send(self, digest):
+        raise OSError('mail server down')
+
+
+class OverdueWorkerTests(unittest.TestCase):
+    """Test suite for overdue_worker.scan_overdue / deliver_digests / job_lock"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.directory = tempfile.mkdtemp()
+        self.sender = FileSender(self.directory)
+        # SPDP received 40 days before, so each deadline (30 days) has passed
+        self.cases = [
+            Case(nama_tersangka=f'Overdue Test {i}', kategori_umur='Dewasa', jpu=jpu,
+                 spdp_tgl_terima=(TODAY - timedelta(days=40 + i)).strftime('%Y-%m-%d'))
+            for i, jpu in enumerate(['Overdue JPU A', 'Overdue JPU A', 'Overdue JPU B'])
+        ]
+        for case in self.cases:
+            case.refresh_derived()
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+        self.since = TODAY - timedelta(days=60)
+
+    def tearDown(self):
+        db.session.rollback()
+        OverdueNotice.query.delete()
+        JobState.query.filter_by(name=JOB_NAME).delete()
+        Case.query.filter(Case.nama_tersangka.like('Overdue Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        shutil.rmtree(self.directory)
+        self.ctx.pop()
+
+    def test_scan_queues_one_notice_per_deadline(self):
+        self.assertEqual(scan_overdue(db.session, TODAY, since=self.since), 3)
+        self.assertEqual(sorted(n.case_id for n in OverdueNotice.query), sorted(self.ids))
+        # Re-running the same window creates nothing new
+        self.assertEqual(scan_overdue(db.session, TODAY, since=self.since), 0)
+        self.assertEqual(db.session.get(JobState, JOB_NAME).watermark, TODAY.isoformat())
+
+    def add_case(self, **stages):
+        case = Case(nama_tersangka='Overdue Test stages', kategori_umur='Dewasa', jpu='Overdue JPU C',
+                    **{field: (TODAY - timedelta(days=days)).strftime('%Y-%m-%d') for field, days in stages.items()})
+        case.refresh_derived()
+        db.session.add(case)
+        db.session.commit()
+        return case.id
+
+    def notices(self, case_id):
+        return [(n.stage, n.deadline) for n in
+                OverdueNotice.query.filter_by(case_id=case_id).order_by(OverdueNotice.deadline)]
+
+    def test_each_missed_stage_gets_its_own_notice(self):
+        case_id = self.add_case(spdp_tgl_terima=40, berkas_tahap_1=10)
+        scan_overdue(db.session, TODAY, since=self.since)
+        self.assertEqual(self.notices(case_id), [('spdp', TODAY - timedelta(days=16)),
+                                                 ('berkas_tahap_1', TODAY - timedelta(days=5))])
+
+        run_once(db.session, self.sender, today=TODAY)
+        with open(os.path.join(self.directory, 'digest_20010310_overdue_jpu_c.txt'), encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn(f"tahap SPDP, batas {TODAY - timedelta(days=16):%d-%m-%Y}", text)
+        self.assertIn(f"tahap Berkas Tahap I, batas {TODAY - timedelta(days=5):%d-%m-%Y}", text)
+
+    def test_later_stage_passing_is_noticed(self):
+        # Berkas filled 2 days ago, due in 3 days
+        case_id = self.add_case(spdp_tgl_terima=40, berkas_tahap_1=2)
+        scan_overdue(db.session, TODAY, since=self.since)
+        self.assertEqual([stage for stage, _ in self.notices(case_id)], ['spdp'])
+        for day in range(1, 6):
+            scan_overdue(db.session, TODAY + timedelta(days=day))
+        self.assertEqual(self.notices(case_id)[-1], ('berkas_tahap_1', TODAY + timedelta(days=3)))
+        self.assertEqual(len(self.notices(case_id)), 2)
+
+    def test_complete_case_is_not_noticed(self):
+        case_id = self.add_case(**{field: 40 for field in STAGE_FIELDS.values()})
+        self.assertEqual(scan_overdue(db.session, TODAY, since=self.since), 3)
+        self.assertEqual(self.notices(case_id), [])
+
+    def test_watermark_limits_the_next_scan(self):
+        scan_overdue(db.session, TODAY, since=self.since)
+        # A case whose deadline passed before the watermark is not picked up...
+        late = Case(nama_tersangka='Overdue Test late', jpu='Overdue JPU A',
+                    spdp_tgl_terima=(TODAY - timedelta(days=45)).strftime('%Y-%m-%d'))
+        late.refresh_derived()
+        db.session.add(late)
+        db.session.commit()
+        self.assertEqual(scan_overdue(db.session, TODAY + timedelta(days=1)), 0)
+        # ...unless the window is re-scanned explicitly
+        self.assertEqual(scan_overdue(db.session, TODAY + timedelta(days=1), since=self.since), 1)
+
+    def test_interrupted_scan_resumes_from_cursor(self):
+        state = overdue_worker._job_state(db.session, JOB_NAME)
+        state.watermark = self.since.isoformat()
+        db.session.commit()
+
+        original = OverdueNotice.__init__
+        calls = []
+
+        def fail_on_third(notice, **kwargs):
+            calls.append(kwargs['case_id'])
+            if len(calls) == 3:
+                raise RuntimeError('worker killed')
+            original(notice, **kwargs)
+
+        with mock.patch.object(OverdueNotice, '__init__', fail_on_third):
+            with self.assertRaises(RuntimeError):
+                scan_overdue(db.session, TODAY, chunk_size=1)
+        db.session.rollback()
+        self.assertEqual(OverdueNotice.query.count(), 2)
+        self.assertIsNotNone(db.session.get(JobState, JOB_NAME).cursor)
+
+        self.assertEqual(scan_overdue(db.session, TODAY, chunk_size=1), 1)
+        self.assertEqual(OverdueNotice.query.count(), 3)
+        self.assertIsNone(db.session.get(JobState, JOB_NAME).cursor)
+
+    def test_digest_per_jpu(self):
+        result = run_once(db.session, self.sender, today=TODAY, since=self.since)
+        self.assertEqual(result, {'notices': 3, 'sent': 2, 'failed': 0})
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(files, ['digest_20010310_overdue_jpu_a.txt', 'digest_20010310_overdue_jpu_b.txt'])
+        with open(os.path.join(self.directory, files[0]), encoding='utf-8') as f:
+            text = f.read()
+        self.assertIn('2 perkara terlambat', text)
+        self.assertIn('Overdue Test 1', text)
+        self.assertIn('tahap SPDP', text)
+        self.assertEqual(OverdueNotice.query.filter(OverdueNotice.sent_at.is_(None)).count(), 0)
+
+        # Nothing left to send on the next run
+        self.assertEqual(run_once(db.session, self.sender, today=TODAY, since=self.since)['sent'], 0)
+
+    def test_failed_delivery_stays_queued(self):
+        result = run_once(db.session, FailingSender(), today=TODAY, since=self.since)
+        self.assertEqual(result, {'notices': 3, 'sent': 0, 'failed': 2})
+        self.assertEqual(OverdueNotice.query.filter(OverdueNotice.sent_at.is_(None)).count(), 3)
+
+        self.assertEqual(run_once(db.session, self.sender, today=TODAY)['sent'], 2)
+
+    def test_lease_admits_one_runner(self):
+        with job_lock(db.session) as first:
+            self.assertTrue(first)
+            with job_lock(db.session) as second:
+                self.assertFalse(second)
+            self.assertIsNone(run_once(db.session, self.sender, today=TODAY))
+        # Released afterwards
+        with job_lock(db.session) as again:
+            self.assertTrue(again)
+
+    def test_expired_lease_is_taken_over(self):
+        overdue_worker._job_state(db.session, JOB_NAME).locked_until = datetime.now() - timedelta(seconds=1)
+        db.session.commit()
+        with job_lock(db.session) as acquired:
+            self.assertTrue(acquired)
+
+    def test_digest_due_after_digest_time(self):
+        with mock.patch.dict(os.environ, {'DIGEST_TIME': '07:00'}):
+            self.assertFalse(overdue_worker.digest_due(db.session, datetime(2001, 3, 10, 6, 59)))
+            self.assertTrue(overdue_worker.digest_due(db.session, datetime(2001, 3, 10, 7, 0)))
+            scan_overdue(db.session, TODAY, since=self.since)
+            self.assertFalse(overdue_worker.digest_due(db.session, datetime(2001, 3, 10, 8, 0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
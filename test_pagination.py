@@ -0,0 +1,156 @@
+"""
+Tests for keyset (cursor) pagination on the dashboard
+"""
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, create_engine, insert, select
+from sqlalchemy.exc import IntegrityError
+from app import app, db, CASE_ORDER, invalidate_case_caches
+from models import Case
+from pagination import keyset_paginate, encode_cursor, decode_cursor, cursor_for
+from scripts.require_created_at import backfill_created_at, LEGACY_CREATED_AT
+
+
+class KeysetPaginationTests(unittest.TestCase):
+    """Test suite for cursor-based pagination"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+        # 23 cases; two share a created_at so the id tie-breaker is exercised
+        base = datetime(2020, 1, 1, 8, 0, 0)
+        self.cases = []
+        for i in range(23):
+            created = base + timedelta(minutes=i if i != 5 else 4)
+            self.cases.append(Case(nama_tersangka=f'Keyset Test {i}', created_at=created))
+        db.session.add_all(self.cases)
+        db.session.commit()
+        # Rows were inserted behind add_case's back, so drop the cached total
+        invalidate_case_caches()
+        self.query = Case.query.filter(Case.nama_tersangka.like('Keyset Test %'))
+
+    def tearDown(self):
+        db.session.rollback()
+        for case in self.cases:
+            db.session.delete(case)
+        db.session.commit()
+        invalidate_case_caches()
+        self.ctx.pop()
+
+    def expected_order(self):
+        return [c.id for c in sorted(self.cases, key=lambda c: (c.created_at, c.id), reverse=True)]
+
+    def login(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def test_cursor_roundtrip(self):
+        """Test that cursors decode back to typed values"""
+        created = datetime(2024, 1, 15, 10, 30, 0, 123456)
+        token = encode_cursor([created, 42])
+        self.assertEqual(decode_cursor(token, [Case.created_at, Case.id]), [created, 42])
+
+    def test_invalid_cursor_is_ignored(self):
+        """Test that a garbled cursor falls back to the first page"""
+        self.assertIsNone(decode_cursor('not-a-cursor', [Case.created_at, Case.id]))
+        page = keyset_paginate(self.query, CASE_ORDER, 10, after='garbage')
+        self.assertEqual([c.id for c in page.items], self.expected_order()[:10])
+        self.assertFalse(page.has_prev)
+
+    def test_forward_walk_covers_every_row_once(self):
+        """Test that following next cursors visits all rows in order"""
+        seen = []
+        page = keyset_paginate(self.query, CASE_ORDER, 10)
+        seen.extend(c.id for c in page.items)
+        while page.has_next:
+            page = keyset_paginate(self.query, CASE_ORDER, 10,
+                                   after=page.next_cursor, start=page.start + len(page.items))
+            seen.extend(c.id for c in page.items)
+        self.assertEqual(seen, self.expected_order())
+        self.assertEqual(page.start, 21)
+
+    def test_backward_walk(self):
+        """Test that prev cursors return the previous page in display order"""
+        order = self.expected_order()
+        second = keyset_paginate(self.query, CASE_ORDER, 10,
+                                 after=cursor_for(db.session.get(Case, order[9]), CASE_ORDER), start=11)
+        third = keyset_paginate(self.query, CASE_ORDER, 10,
+                                after=second.next_cursor, start=21)
+        back = keyset_paginate(self.query, CASE_ORDER, 10, before=third.prev_cursor, start=11)
+        self.assertEqual([c.id for c in back.items], order[10:20])
+        self.assertTrue(back.has_prev)
+        self.assertTrue(back.has_next)
+
+    def test_backward_walk_to_start_returns_full_first_page(self):
+        """Test that going back past the beginning yields a full first page"""
+        order = self.expected_order()
+        page = keyset_paginate(self.query, CASE_ORDER, 10,
+                               before=cursor_for(db.session.get(Case, order[3]), CASE_ORDER), start=4)
+        self.assertEqual([c.id for c in page.items], order[:10])
+        self.assertFalse(page.has_prev)
+        self.assertEqual(page.start, 1)
+
+    def test_dashboard_cursor_links(self):
+        """Test that dashboard serves both page-number and cursor URLs"""
+        self.login()
+        response = self.client.get('/dashboard?page=1&per_page=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'?after=', response.data)
+
+        token = encode_cursor([datetime(2020, 1, 1, 8, 15), 0])
+        response = self.client.get(f'/dashboard?after={token}&per_page=10&start=11')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Keyset Test 14', response.data)
+        self.assertNotIn(b'Keyset Test 15<', response.data)
+
+    def test_dashboard_cursor_links_with_cached_total(self):
+        """Test that the Next link stays a cursor once the total is cached"""
+        self.login()
+        # The first view counts after its response is closed
+        self.client.get('/dashboard?page=1&per_page=10').close()
+        response = self.client.get('/dashboard?page=1&per_page=10')
+        self.assertIn(b'?after=', response.data)
+
+
+class CreatedAtTests(unittest.TestCase):
+    """Test suite for the created_at cursor key never being NULL"""
+
+    def test_null_created_at_is_rejected(self):
+        with app.app_context():
+            with self.assertRaises(IntegrityError):
+                db.session.execute(insert(Case.__table__).values(nama_tersangka='Null Created', created_at=None))
+            db.session.rollback()
+
+    def test_backfilled_legacy_rows_page_by_cursor(self):
+        # A database from before the NOT NULL, with a row lacking created_at
+        metadata = MetaData()
+        table = Case.__table__.to_metadata(metadata)
+        table.c.created_at.nullable = True
+        engine = create_engine('sqlite://')
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(table), [
+                {'id': 1, 'nama_tersangka': 'Legacy', 'created_at': None},
+                {'id': 2, 'nama_tersangka': 'Recent', 'created_at': datetime(2024, 1, 1)},
+            ])
+            self.assertEqual(backfill_created_at(conn), 1)
+            self.assertEqual(backfill_created_at(conn), 0)
+            rows = conn.execute(select(table).order_by(table.c.created_at.desc(), table.c.id.desc())).all()
+        engine.dispose()
+
+        self.assertEqual([row.nama_tersangka for row in rows], ['Recent', 'Legacy'])
+        self.assertEqual(rows[1].created_at, LEGACY_CREATED_AT)
+        for row in rows:
+            token = cursor_for(row, CASE_ORDER)
+            self.assertEqual(decode_cursor(token, [column for column, _ in CASE_ORDER]),
+                             [row.created_at, row.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
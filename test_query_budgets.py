@@ -0,0 +1,127 @@
+"""
+SQL statement budgets of the app's routes (see query_budget.py)
+
+Budgets hold at every page size, so a per-row query (N+1) fails them.
+Steady-state budgets are checked after one warm-up request, with the
+in-process caches (user, counts, filter choices, statistics) filled but
+the row cache emptied, so every row is rendered.
+"""
+import unittest
+from datetime import date
+from app import app, init_db, invalidate_case_caches, user_cache, row_cache, stats_cache
+from extensions import db
+from models import Case
+from benchmarks.generator import seed_cases
+from query_budget import query_budget, QueryBudgetExceeded
+
+# Enough rows for the largest page size below
+SEED_ROWS = 250
+PAGE_SIZES = (10, 50, 100, 200)
+
+# (label, method, url, request kwargs, budget) with warm caches
+READ_BUDGETS = (
+    ('dashboard', 'get', '/dashboard', {}, 3),
+    ('dashboard overdue', 'get', '/dashboard?status=overdue&kategori_umur=Anak', {}, 3),
+    ('dashboard search', 'get', '/dashboard?q=saputra', {}, 3),
+    ('dashboard sorted', 'get', '/dashboard?sort=nama_tersangka', {}, 3),
+    ('api cases', 'get', '/api/cases', {}, 2),
+    ('stats', 'get', '/stats', {}, 2),
+    ('rows', 'get', '/rows?ids=' + ','.join(str(i) for i in range(1, 51)), {}, 1),
+    ('history', 'get', '/case/1/history', {}, 2),
+    ('export csv', 'get', '/export.csv', {}, 1),
+    ('export xlsx', 'get', '/export.xlsx', {}, 1),
+    ('cache stats', 'get', '/cache/stats', {}, 0),
+    ('metrics', 'get', '/metrics', {}, 0),
+)
+
+
+class QueryBudgetTests(unittest.TestCase):
+    """Test suite for per-route SQL statement budgets"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+        with cls.app.app_context():
+            init_db()
+            Case.query.delete()
+            db.session.commit()
+            seed_cases(db.session, SEED_ROWS, anchor=date(2001, 3, 10))
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.app.app_context():
+            Case.query.delete()
+            db.session.commit()
+        invalidate_case_caches()
+        row_cache.clear()
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+
+    def request(self, method, url, **kwargs):
+        response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, url)
+        response.get_data()
+        return response
+
+    def test_read_routes(self):
+        for label, method, url, kwargs, budget in READ_BUDGETS:
+            separator = '&' if '?' in url else '?'
+            for per_page in PAGE_SIZES:
+                page_url = f"{url}{separator}per_page={per_page}"
+                with self.subTest(label, per_page=per_page):
+                    self.request(method, page_url, **kwargs)
+                    # Render every row again, so queries made in the templates count
+                    row_cache.clear()
+                    with query_budget(budget, label):
+                        self.request(method, page_url, **kwargs)
+
+    def test_cold_dashboard(self):
+        # Count, statistics and filter choices are filled on the first view
+        for per_page in PAGE_SIZES:
+            with self.subTest(per_page=per_page):
+                invalidate_case_caches()
+                stats_cache.clear()
+                user_cache.clear()
+                row_cache.clear()
+                with query_budget(8, 'dashboard (cold)'):
+                    self.request('get', f'/dashboard?per_page={per_page}')
+
+    def test_write_routes(self):
+        self.request('get', '/dashboard')
+        # Read the row, update it, bump table_version (cache invalidation).
+        # One over the 2 first asked for: the bump is a statement of its own
+        # and is counted like any other
+        with query_budget(3, 'update_cell'):
+            self.request('post', '/update_cell', json={'id': 3, 'field': 'keterangan', 'value': 'budget'})
+        with query_budget(3, 'update_cell date'):
+            self.request('post', '/update_cell', json={'id': 3, 'field': 'p21', 'value': '01/02/2001'})
+        # One SELECT for all rows, one executemany UPDATE, the table_version
+        # bump; rendering the updated rows adds nothing, at any batch size
+        for size in (1, 10, 50):
+            edits = [{'id': case_id, 'field': 'keterangan', 'value': f'batch {size}'}
+                     for case_id in range(10, 10 + size)]
+            with self.subTest(edits=size), query_budget(3, 'update_cells'):
+                response = self.request('post', '/update_cells', json={'edits': edits, 'render': True})
+                self.assertEqual(len(response.get_json()['rows']), size)
+        with query_budget(2, 'add_case'):
+            self.request('post', '/add_case', data={'nama_tersangka': 'Budget', 'umur_tersangka': '30'})
+        with query_budget(3, 'delete_case'):
+            self.request('delete', '/delete_case/4')
+
+    def test_violation_lists_statements(self):
+        self.request('get', '/stats')
+        stats_cache.clear()
+        with self.assertRaises(QueryBudgetExceeded) as caught:
+            with query_budget(0, 'stats'):
+                self.request('get', '/stats')
+        message = str(caught.exception)
+        self.assertIn('stats: ', message)
+        self.assertIn('budget 0', message)
+        self.assertIn('1. [stats] SELECT', message)
+
+
+if __name__ == '__main__':
+    unittest.main()
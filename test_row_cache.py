@@ -0,0 +1,123 @@
+"""
+Tests for the dashboard row fragment cache
+"""
+import re
+import unittest
+from cache import SizedLRUCache
+from app import app, db, row_cache, invalidate_case_caches
+from models import Case
+
+
+class SizedLRUCacheTests(unittest.TestCase):
+    """Test suite for cache.SizedLRUCache"""
+
+    def test_evicts_least_recently_used_past_the_byte_cap(self):
+        cache = SizedLRUCache(max_bytes=10, sizeof=len)
+        cache.set('a', 'xxxx')
+        cache.set('b', 'xxxx')
+        cache.get('a')
+        cache.set('c', 'xxxx')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'xxxx')
+        self.assertEqual(cache.bytes, 8)
+
+        cache.set('big', 'x' * 11)  # larger than the whole cache: not stored
+        self.assertIsNone(cache.get('big'))
+        self.assertEqual(len(cache), 2)
+
+    def test_stamp_mismatch_is_a_miss(self):
+        cache = SizedLRUCache(max_bytes=100, sizeof=len)
+        cache.set(1, 'row v1', stamp=1)
+        self.assertEqual(cache.get(1, stamp=1), 'row v1')
+        self.assertIsNone(cache.get(1, stamp=2))
+        self.assertEqual((len(cache), cache.bytes), (0, 0))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_replacing_and_popping_keep_the_byte_count(self):
+        cache = SizedLRUCache(max_bytes=100, sizeof=len)
+        cache.set(1, 'xxxx')
+        cache.set(1, 'xx')
+        self.assertEqual(cache.bytes, 2)
+        cache.pop(1)
+        cache.pop(1)
+        self.assertEqual(cache.bytes, 0)
+
+
+class DashboardRowCacheTests(unittest.TestCase):
+    """Test suite for app.case_cells on the dashboard"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        invalidate_case_caches()
+        row_cache.clear()
+        row_cache.hits = row_cache.misses = 0
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.cases = [Case(nama_tersangka=f'Row Cache Test {i}', jpu='Row Cache JPU',
+                           spdp_tgl_terima='2024-01-01') for i in range(3)]
+        for case in self.cases:
+            case.refresh_derived()
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Row Cache Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_case_caches()
+        row_cache.clear()
+        self.ctx.pop()
+
+    def dashboard(self):
+        return self.client.get('/dashboard?jpu=Row Cache JPU').get_data(as_text=True)
+
+    def test_second_render_is_served_from_cache(self):
+        first = self.dashboard()
+        self.assertEqual(row_cache.stats()['misses'], 3)
+        second = self.dashboard()
+        self.assertEqual(row_cache.stats()['hits'], 3)
+        self.assertEqual(first, second)
+        self.assertIn('Row Cache Test 2', second)
+        self.assertIn('overdue-cell', second)
+
+    def test_row_numbers_stay_outside_the_cache(self):
+        self.dashboard()
+        body = self.client.get('/dashboard?jpu=Row Cache JPU&sort=nama_tersangka&dir=desc').get_data(as_text=True)
+        numbers = re.findall(r'<td class="row-number">(\d+)</td>', body)
+        self.assertEqual(numbers, ['1', '2', '3'])
+        self.assertEqual(row_cache.stats()['hits'], 3)
+
+    def test_cell_edit_invalidates_the_row(self):
+        self.dashboard()
+        response = self.client.post('/update_cell?render=1', json={
+            'id': self.ids[0], 'field': 'nama_tersangka', 'value': 'Row Cache Test Renamed'})
+        self.assertIn('Row Cache Test Renamed', response.get_json()['row'])
+        body = self.dashboard()
+        self.assertIn('Row Cache Test Renamed', body)
+        self.assertNotIn('Row Cache Test 0', body)
+        self.assertEqual(row_cache.stats()['hits'], 2)
+
+    def test_write_from_elsewhere_bumps_the_stamp(self):
+        """Test that a change this process never saw is still picked up"""
+        self.dashboard()
+        db.session.execute(db.update(Case).where(Case.id == self.ids[1]).values(pasal='Pasal 999'))
+        db.session.commit()
+        db.session.expire_all()
+        self.assertIn('Pasal 999', self.dashboard())
+
+    def test_deleted_case_is_dropped(self):
+        self.dashboard()
+        self.client.delete(f'/delete_case/{self.ids[2]}')
+        self.assertEqual(len(row_cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Tests for the dashboard full-text search (?q=)
+"""
+import unittest
+from unittest import mock
+from sqlalchemy.dialects import postgresql
+from app import app, db, invalidate_case_caches
+from models import Case
+import search
+from search import apply_search, search_backend, search_terms
+
+
+class SearchTests(unittest.TestCase):
+    """Test suite for search.apply_search and the dashboard ?q= parameter"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        invalidate_case_caches()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.cases = [
+            Case(nama_tersangka='Search Test Budiman', pasal='Pasal 362 KUHP', jpu='Sari'),
+            Case(nama_tersangka='Search Test Rahmat', pasal='Pasal 378 KUHP', jpu='Budiman',
+                 keterangan='penipuan online'),
+            Case(nama_tersangka='Search Test Wati', pasal='Pasal 351 KUHP', jpu='Sari',
+                 spdp_ket_polisi='B/123/IV/2024/Reskrim'),
+        ]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Search Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        invalidate_case_caches()
+        self.ctx.pop()
+
+    def search(self, q):
+        query, rank = apply_search(Case.query, q, db.session)
+        if rank is not None:
+            query = query.order_by(rank, Case.id)
+        return [case.id for case in query if case.id in self.ids]
+
+    def test_terms(self):
+        self.assertEqual(search_terms('  Budi, "362"  KUHP!'), ['budi', '362', 'kuhp'])
+        self.assertEqual(search_terms(''), [])
+        self.assertEqual(len(search_terms('a ' * 50)), search.MAX_SEARCH_TERMS)
+
+    def test_uses_fts5_on_sqlite(self):
+        self.assertEqual(search_backend(db.session), 'fts5')
+
+    def test_matches_every_searched_field(self):
+        """Test that name, article, prosecutor, notes and SPDP number are searched"""
+        self.assertEqual(self.search('rahmat'), [self.ids[1]])
+        self.assertEqual(self.search('378'), [self.ids[1]])
+        self.assertEqual(self.search('penipu'), [self.ids[1]])    # word prefix
+        self.assertEqual(self.search('reskrim 2024'), [self.ids[2]])
+        self.assertEqual(sorted(self.search('sari')), [self.ids[0], self.ids[2]])
+        self.assertEqual(self.search('sari 351'), [self.ids[2]])  # every term must match
+        self.assertEqual(self.search('tidakada'), [])
+
+    def test_results_are_ranked(self):
+        """Test that a case matching in more places ranks first"""
+        self.assertEqual(sorted(self.search('budiman')), [self.ids[0], self.ids[1]])
+        db.session.get(Case, self.ids[1]).keterangan = 'budiman budiman budiman'
+        db.session.commit()
+        self.assertEqual(self.search('budiman')[0], self.ids[1])
+
+    def test_index_follows_edits_and_deletes(self):
+        case = db.session.get(Case, self.ids[0])
+        case.nama_tersangka = 'Search Test Gunawan'
+        db.session.commit()
+        self.assertEqual(self.search('gunawan'), [self.ids[0]])
+        self.assertNotIn(self.ids[0], self.search('budiman'))
+
+        Case.query.filter_by(id=self.ids[0]).delete()
+        db.session.commit()
+        self.assertEqual(self.search('gunawan'), [])
+
+    def test_like_fallback(self):
+        """Test the unranked fallback used before the index is installed"""
+        with mock.patch.object(search, 'search_backend', return_value='like'):
+            query, rank = apply_search(Case.query, 'rahmat 100%', db.session)
+            self.assertIsNone(rank)
+            self.assertEqual([c.id for c in query if c.id in self.ids], [])
+            query, _ = apply_search(Case.query, 'RAHMAT', db.session)
+            self.assertEqual([c.id for c in query if c.id in self.ids], [self.ids[1]])
+
+    def test_postgres_query_uses_indexed_expressions(self):
+        with mock.patch.object(search, 'search_backend', return_value='postgresql'):
+            query, rank = apply_search(Case.query, 'budi 362', db.session)
+            sql = str(query.order_by(rank).statement.compile(dialect=postgresql.dialect()))
+        self.assertIn('"case".search_vector @@ to_tsquery(\'simple\'::regconfig', sql)
+        self.assertIn('ts_rank_cd', sql)
+        # Every term has trigrams, so infix matches are OR-ed in
+        self.assertIn('ILIKE', sql)
+
+        with mock.patch.object(search, 'search_backend', return_value='postgresql'):
+            query, _ = apply_search(Case.query, 'budi 36', db.session)
+            self.assertNotIn('ILIKE', str(query.statement.compile(dialect=postgresql.dialect())))
+
+    def test_dashboard_search(self):
+        body = self.client.get('/dashboard?q=rahmat').get_data(as_text=True)
+        self.assertIn(f'data-case-id="{self.ids[1]}"', body)
+        self.assertNotIn(f'data-case-id="{self.ids[0]}"', body)
+        self.assertIn('value="rahmat"', body)
+        self.assertIn('dari 1 data', body)
+        self.assertIn('q=rahmat', body)  # kept in the export links
+
+        export = self.client.get('/export.csv?q=wati').get_data(as_text=True)
+        self.assertIn('Search Test Wati', export)
+        self.assertNotIn('Search Test Rahmat', export)
+
+    def test_dashboard_search_pages_by_number(self):
+        db.session.add_all([Case(nama_tersangka=f'Search Test Extra {i}', jpu='Sari') for i in range(12)])
+        db.session.commit()
+        body = self.client.get('/dashboard?q=sari&per_page=10').get_data(as_text=True)
+        self.assertIn('page=2', body)
+        self.assertNotIn('after=', body)
+        body = self.client.get('/dashboard?q=sari&per_page=10&page=2').get_data(as_text=True)
+        self.assertEqual(body.count('data-case-id='), 4)
+
+    def test_broad_search_lists_newest_first(self):
+        """Test that searches past SEARCH_RANK_LIMIT skip relevance scoring"""
+        db.session.get(Case, self.ids[0]).keterangan = 'sari sari sari'
+        db.session.commit()
+
+        def position(body, index):
+            return body.index(f'data-case-id="{self.ids[index]}"')
+
+        body = self.client.get('/dashboard?q=sari').get_data(as_text=True)
+        self.assertLess(position(body, 0), position(body, 2))
+        with mock.patch('app.SEARCH_RANK_LIMIT', 1):
+            body = self.client.get('/dashboard?q=sari&per_page=30').get_data(as_text=True)
+        self.assertLess(position(body, 2), position(body, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
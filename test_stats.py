@@ -0,0 +1,133 @@
+"""
+Tests for the aggregated statistics (/stats and the dashboard summary card)
+"""
+import unittest
+from collections import Counter
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import app, db, stats_cache, get_case_statistics
+from models import Case
+from stats import case_statistics, STAGE_NONE
+
+
+class StatsTests(unittest.TestCase):
+    """Test suite for stats.case_statistics and its cache"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        stats_cache.clear()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        today = date.today()
+        days_ago = lambda n: (today - timedelta(days=n)).strftime('%Y-%m-%d')
+        self.cases = [
+            # Overdue adult at SPDP
+            Case(nama_tersangka='Stats Test 1', kategori_umur='Dewasa', jpu='Stats JPU', spdp_tgl_terima=days_ago(40)),
+            # On time, due soon (child, Berkas Tahap I limit 3 days)
+            Case(nama_tersangka='Stats Test 2', kategori_umur='Anak', jpu='Stats JPU',
+                 spdp_tgl_terima=days_ago(1), berkas_tahap_1=days_ago(1)),
+            # Complete
+            Case(nama_tersangka='Stats Test 3', kategori_umur='Dewasa', jpu='Stats JPU 2',
+                 spdp_tgl_terima=days_ago(9), berkas_tahap_1=days_ago(8), p18_p19=days_ago(7),
+                 p21=days_ago(6), tahap_2=days_ago(5)),
+            # No dates at all
+            Case(nama_tersangka='Stats Test 4', kategori_umur=None),
+        ]
+        for case in self.cases:
+            case.refresh_derived()
+        db.session.add_all(self.cases)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Stats Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        stats_cache.clear()
+        self.ctx.pop()
+
+    def expected(self, today):
+        """The same figures computed row by row in Python"""
+        cases = Case.query.all()
+        deadline = Counter()
+        for case in cases:
+            if case.first_deadline is not None:
+                deadline['overdue' if case.first_deadline < today else 'on_time'] += 1
+                if case.next_deadline is not None and today <= case.next_deadline <= today + timedelta(days=3):
+                    deadline['due_soon'] += 1
+            elif case.current_stage == 'complete':
+                deadline['complete'] += 1
+            else:
+                deadline['no_deadline'] += 1
+        return {
+            'total': len(cases),
+            'by_stage': Counter(case.current_stage or STAGE_NONE for case in cases),
+            'by_kategori': Counter('Anak' if case.kategori_umur == 'Anak' else 'Dewasa' for case in cases),
+            'deadline': deadline,
+            'jpu': Counter(case.jpu for case in cases),
+        }
+
+    def test_matches_row_by_row_evaluation(self):
+        today = date.today()
+        stats = case_statistics(db.session, today)
+        expected = self.expected(today)
+        self.assertEqual(stats['total'], expected['total'])
+        self.assertEqual(+Counter(stats['by_stage']), expected['by_stage'])
+        self.assertEqual(+Counter(stats['by_kategori']), expected['by_kategori'])
+        self.assertEqual(+Counter(stats['deadline']), expected['deadline'])
+        by_jpu = {row['jpu']: row for row in stats['by_jpu']}
+        self.assertEqual(by_jpu['Stats JPU'], {'jpu': 'Stats JPU', 'total': 2, 'overdue': 1, 'complete': 0})
+        self.assertEqual(by_jpu['Stats JPU 2']['complete'], 1)
+        self.assertEqual(list(stats['by_stage'])[:6],
+                         ['spdp', 'berkas_tahap_1', 'p18_p19', 'p21', 'tahap_2', 'complete'])
+
+    def test_two_group_by_queries_then_cached(self):
+        """Test that a cache miss costs two queries and a hit only the version lookup"""
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            get_case_statistics()
+            misses = len(statements)
+            statements.clear()
+            get_case_statistics()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len([s for s in statements if 'GROUP BY' in s]), 0)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(misses, 3)
+
+    def test_writes_invalidate(self):
+        before = get_case_statistics()['total']
+        db.session.add(Case(nama_tersangka='Stats Test 5'))
+        db.session.commit()
+        self.assertEqual(get_case_statistics()['total'], before + 1)
+
+    def test_endpoint_revalidates(self):
+        response = self.client.get('/stats')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['date'], date.today().isoformat())
+        self.assertIn('overdue', data['deadline'])
+        etag = response.headers['ETag']
+
+        self.assertEqual(self.client.get('/stats', headers={'If-None-Match': etag}).status_code, 304)
+        self.client.post('/update_cell', json={'id': self.cases[0].id, 'field': 'jpu', 'value': 'Stats JPU 3'})
+        self.assertEqual(self.client.get('/stats', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_dashboard_card(self):
+        body = self.client.get('/dashboard').get_data(as_text=True)
+        self.assertIn('Ringkasan Perkara', body)
+        self.assertIn('Stats JPU', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
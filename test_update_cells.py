@@ -0,0 +1,157 @@
+"""
+Tests for the batched /update_cells endpoint and the row fragments
+"""
+import re
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import app, db, MAX_CELL_EDITS
+from models import Case
+
+
+class UpdateCellsTests(unittest.TestCase):
+    """Test suite for applying many cell edits in one transaction"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.cases = [Case(nama_tersangka=f'Batch Test {i}', kategori_umur='Dewasa') for i in range(3)]
+        db.session.add_all(self.cases)
+        db.session.commit()
+        self.ids = [case.id for case in self.cases]
+
+    def tearDown(self):
+        db.session.rollback()
+        Case.query.filter(Case.nama_tersangka.like('Batch Test%')).delete(synchronize_session=False)
+        db.session.commit()
+        self.ctx.pop()
+
+    def fetch(self, case_id):
+        db.session.expire_all()
+        return db.session.get(Case, case_id)
+
+    def test_applies_all_edits(self):
+        """Test that edits to several cases land with derived columns refreshed"""
+        response = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'p21', 'value': '2024-01-20'},
+            {'id': self.ids[0], 'field': 'jpu', 'value': 'Budi'},
+            {'id': str(self.ids[1]), 'field': 'umur_tersangka', 'value': '15'},
+            {'id': self.ids[1], 'field': 'kategori_umur', 'value': 'Anak'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(len(data['results']), 4)
+
+        first = self.fetch(self.ids[0])
+        self.assertEqual((first.p21, first.jpu), ('2024-01-20', 'Budi'))
+        self.assertEqual(first.p21_dt, datetime(2024, 1, 20))
+        self.assertEqual(first.current_stage, 'p21')
+        second = self.fetch(self.ids[1])
+        self.assertEqual((second.umur_tersangka, second.kategori_umur), (15, 'Anak'))
+
+    def test_per_item_results(self):
+        """Test that bad edits are reported without blocking the good ones"""
+        response = self.client.post('/update_cells', json=[
+            {'id': self.ids[2], 'field': 'keterangan', 'value': 'ok'},
+            {'id': self.ids[2], 'field': 'created_at', 'value': '2024-01-01'},
+            {'id': 999999999, 'field': 'p21', 'value': '2024-01-01'},
+            {'field': 'p21', 'value': '2024-01-01'},
+            {'id': self.ids[2], 'field': 'umur_tersangka', 'value': 'dua puluh'},
+        ])
+        data = response.get_json()
+        self.assertFalse(data['success'])
+        self.assertEqual([r['success'] for r in data['results']], [True, False, False, False, False])
+        self.assertEqual([r.get('error') for r in data['results'][1:]],
+                         ['Field not editable', 'Case not found', 'Invalid data', 'Invalid value'])
+        self.assertEqual(self.fetch(self.ids[2]).keterangan, 'ok')
+
+    def test_last_edit_wins(self):
+        """Test that repeated edits of one cell keep the latest value"""
+        self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'pasal', 'value': 'Pasal 1'},
+            {'id': self.ids[0], 'field': 'pasal', 'value': 'Pasal 2'},
+        ]})
+        self.assertEqual(self.fetch(self.ids[0]).pasal, 'Pasal 2')
+
+    def test_single_select_and_update(self):
+        """Test that a batch costs one SELECT and one UPDATE statement"""
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(' '.join(statement.split()[:2]).upper().replace('"', ''))
+
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            self.client.post('/update_cells', json={'edits': [
+                {'id': case_id, 'field': 'limpah_pn', 'value': '2024-02-02'} for case_id in self.ids
+            ]})
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        # Login lookup aside, the batch is one read and one executemany write
+        self.assertEqual(statements.count('UPDATE CASE'), 1)
+        self.assertLessEqual(len([s for s in statements if s.startswith('SELECT')]), 2)
+        self.assertEqual([self.fetch(i).limpah_pn for i in self.ids], ['2024-02-02'] * 3)
+
+    def test_rejects_bad_payloads(self):
+        self.assertEqual(self.client.post('/update_cells', json={'edits': 'x'}).status_code, 400)
+        too_many = [{'id': self.ids[0], 'field': 'p21', 'value': ''}] * (MAX_CELL_EDITS + 1)
+        self.assertEqual(self.client.post('/update_cells', json=too_many).status_code, 400)
+
+    def test_update_cell_still_answers_with_status_codes(self):
+        """Test that the single-edit endpoint keeps its old responses"""
+        response = self.client.post('/update_cell', json={'id': 999999999, 'field': 'p21', 'value': 'x'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/update_cell', json={'id': self.ids[0], 'field': 'id', 'value': 1})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/update_cell', json={'field': 'p21'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rows_rendered_on_request(self):
+        """Test that render=true returns the updated <tr> with fresh classes"""
+        late = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        data = self.client.post('/update_cells', json={'render': True, 'edits': [
+            {'id': self.ids[0], 'field': 'berkas_tahap_1', 'value': late},
+        ]}).get_json()
+        row = data['rows'][str(self.ids[0])]
+        self.assertTrue(row.strip().startswith(f'<tr data-case-id="{self.ids[0]}">'))
+        self.assertIn('overdue-cell', row)
+        self.assertIn(late, row)
+
+        data = self.client.post('/update_cells', json={'edits': [
+            {'id': self.ids[0], 'field': 'p21', 'value': late},
+        ]}).get_json()
+        self.assertNotIn('rows', data)
+
+    def test_update_cell_row_matches_dashboard(self):
+        """Test that the fragment is the same markup the dashboard renders"""
+        case_id = self.ids[1]
+        data = self.client.post('/update_cell?render=1', json={
+            'id': case_id, 'field': 'keterangan', 'value': 'Batch Test fragment'
+        }).get_json()
+        fragment = data['row'].replace('<td class="row-number"></td>', '')
+
+        body = self.client.get('/dashboard?per_page=100').get_data(as_text=True)
+        start = body.index(f'<tr data-case-id="{case_id}">')
+        rendered = body[start:body.index('</tr>', start) + len('</tr>')]
+        rendered = re.sub(r'<td class="row-number">\d+</td>', '', rendered)
+        self.assertEqual(' '.join(fragment.split()), ' '.join(rendered.split()))
+
+    def test_delete_reports_removed_row(self):
+        """Test that delete_case answers with the id to drop, or 404"""
+        data = self.client.delete(f'/delete_case/{self.ids[2]}').get_json()
+        self.assertEqual(data['removed'], self.ids[2])
+        self.assertIsNone(self.fetch(self.ids[2]))
+        self.assertEqual(self.client.delete(f'/delete_case/{self.ids[2]}').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
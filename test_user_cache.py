@@ -0,0 +1,92 @@
+"""
+Tests for the in-process cache behind Flask-Login's user_loader
+"""
+import unittest
+from sqlalchemy import event, update
+from werkzeug.security import generate_password_hash
+from app import app, db, load_user, user_cache, SessionUser
+from models import User
+
+
+class UserCacheTests(unittest.TestCase):
+    """Test suite for load_user and user_cache"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = app
+        cls.app.config['TESTING'] = True
+
+    def setUp(self):
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        user_cache.clear()
+        self.user = User(username='cache-test', password_hash=generate_password_hash('secret'))
+        db.session.add(self.user)
+        db.session.commit()
+        self.user_id = self.user.id
+
+    def tearDown(self):
+        db.session.rollback()
+        User.query.filter(User.username.like('cache-test%')).delete(synchronize_session=False)
+        db.session.commit()
+        user_cache.clear()
+        self.ctx.pop()
+
+    def count_selects(self, func):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return result, len(statements)
+
+    def test_second_lookup_skips_database(self):
+        """Test that a cached identity costs no query"""
+        first, queries = self.count_selects(lambda: load_user(str(self.user_id)))
+        self.assertIsInstance(first, SessionUser)
+        self.assertEqual((first.id, first.username, first.get_id()), (self.user_id, 'cache-test', str(self.user_id)))
+        self.assertEqual(queries, 1)
+
+        second, queries = self.count_selects(lambda: load_user(str(self.user_id)))
+        self.assertIs(second, first)
+        self.assertEqual(queries, 0)
+        self.assertGreater(user_cache.hit_rate, 0)
+
+    def test_unknown_or_bad_ids(self):
+        self.assertIsNone(load_user('999999999'))
+        self.assertIsNone(load_user('abc'))
+        self.assertNotIn(999999999, user_cache._data)
+
+    def test_writes_invalidate(self):
+        """Test that renames and deletes are seen on the next request"""
+        load_user(str(self.user_id))
+        self.user.username = 'cache-test-renamed'
+        db.session.commit()
+        self.assertEqual(load_user(str(self.user_id)).username, 'cache-test-renamed')
+
+        db.session.execute(update(User).where(User.id == self.user_id).values(username='cache-test-bulk'))
+        db.session.commit()
+        self.assertEqual(load_user(str(self.user_id)).username, 'cache-test-bulk')
+
+        User.query.filter_by(id=self.user_id).delete()
+        db.session.commit()
+        self.assertIsNone(load_user(str(self.user_id)))
+
+    def test_stats_endpoint(self):
+        self.client.post('/login', data={'username': 'admin', 'password': '12345'})
+        self.client.get('/cache/stats')
+        stats = self.client.get('/cache/stats').get_json()
+        self.assertGreaterEqual(stats['user']['hits'], 1)
+        self.assertIn('hit_rate', stats['user'])
+        self.assertIn('case_count', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()